@@ -1,25 +1,37 @@
-import ee
-import geemap
 import os
+import gee_backend
 
 # --- 1. INISIALISASI ---
-try:
-    ee.Initialize()
-    print("Berhasil terhubung ke Google Earth Engine.")
-except Exception as e:
-    ee.Authenticate()
-    ee.Initialize()
-    print("Berhasil terhubung setelah autentikasi.")
+# Backend dari env TAMBAK_EE_BACKEND: 'earthengine' (default) atau 'fake' (uji alur offline)
+ee = gee_backend.load_ee()
+gee_backend.initialize(ee)
 
 # --- 2. CONFIG AREA & WAKTU ---
-area_geometry = ee.Geometry.Rectangle([114.368739,-8.263853,114.382801,-8.243553]) # Ganti dengan lokasi file Anda
+area_bounds = [114.368739,-8.263853,114.382801,-8.243553] # Ganti dengan lokasi file Anda
+area_geometry = ee.Geometry.Rectangle(area_bounds)
 start_date = '2024-01-01'
 end_date = '2024-12-31'
+dry_start, dry_end = '2024-08-01', '2024-10-31'
 proj_metric = ee.Projection('EPSG:32750')
 
 output_dir = "path/to/your/folder" # Ganti dengan lokasi file Anda
 if not os.path.exists(output_dir): os.makedirs(output_dir)
 
+# Cache komposit (ndwi_clean, s1_annual, s1_dry) sebagai asset GEE. None = tanpa cache.
+ASSET_ROOT = None # mis. 'projects/your-project/assets/tambak_cache'
+# True = tunggu ekspor cache selesai lalu pakai asset; False = run ini tetap pakai komposit lazy
+CACHE_WAIT = False
+
+# Ekspor hasil: 'drive' (SHP di Google Drive), 'asset', atau 'local' (geemap.ee_to_shp, lama & terbatas ukuran)
+EXPORT_TARGET = 'drive'
+EXPORT_FOLDER = 'tambak'
+EXPORT_NAME = 'nama_output_file' #Ganti nama output file
+# True = polling status task sampai selesai; False = task dibiarkan jalan di server
+WAIT_FOR_EXPORT = True
+POLL_SECONDS = 30
+# size().getInfo() memblokir sampai seluruh rantai dihitung -> default tidak dipanggil
+PRINT_COUNT = False
+
 # --- 3. FUNGSI ---
 def mask_clouds_scl(image):
     scl = image.select('SCL')
@@ -46,29 +58,32 @@ def calculate_shape_metrics(feature):
     rpoc = perimeter.divide(hull.perimeter(1, proj=proj_metric))
     return feature.set({'area_m2': area, 'LSI': lsi, 'RPOC': rpoc})
 
-def validate_with_dry_radar(feature, dry_radar_img):
-    """Cek apakah poligon ini basah saat kemarau?"""
-    val = dry_radar_img.reduceRegion(
-        reducer=ee.Reducer.median(), geometry=feature.geometry(), scale=10, maxPixels=1e9
-    ).get('VV')
-    return feature.set('dry_vv', val)
+def validate_with_dry_radar(collection, dry_radar_img):
+    """Cek apakah poligon basah saat kemarau? (1x reduceRegions untuk semua poligon)"""
+    return dry_radar_img.select('VV').reduceRegions(
+        collection=collection, reducer=ee.Reducer.median().setOutputs(['dry_vv']), scale=10)
 
-def calculate_crop_overlap(feature):
+def calculate_crop_overlap(collection):
+    """Fraksi piksel cropland (WorldCover 40) per poligon, 1x reduceRegions."""
     esa = ee.ImageCollection("ESA/WorldCover/v100").first()
-    crop_pct = esa.eq(40).reduceRegion(
-        reducer=ee.Reducer.mean(), geometry=feature.geometry(), scale=10, maxPixels=1e9
-    ).get('Map')
-    return feature.set('crop_pct', crop_pct)
+    return esa.eq(40).reduceRegions(
+        collection=collection, reducer=ee.Reducer.mean().setOutputs(['crop_pct']), scale=10)
 
 # --- 4. PRE-PROCESSING (DATA TAHUNAN & KEMARAU) ---
 
+cache = gee_backend.CompositeCache(ee, ASSET_ROOT, area_geometry, scale=10, crs='EPSG:32750',
+                                   wait=CACHE_WAIT, poll_seconds=POLL_SECONDS)
+# Konfigurasi ekspor dicek sebelum rantai proses dibangun (ASSET_ROOT wajib untuk target 'asset')
+if EXPORT_TARGET == 'asset': gee_backend.require_asset_root(ASSET_ROOT, "EXPORT_TARGET = 'asset'")
+
 print("1. Menyiapkan Sentinel-2 (Optik Tahunan)...")
 s2_col = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') 
         .filterBounds(area_geometry)
         .filterDate(start_date, end_date)
         .map(mask_clouds_scl)
         .map(add_indices))
-ndwi_clean = z_score_cleaning(s2_col, area_geometry)
+ndwi_clean = cache.image('ndwi_clean', lambda: z_score_cleaning(s2_col, area_geometry),
+                         {'area': area_bounds, 'start': start_date, 'end': end_date})
 
 print("2. Menyiapkan Sentinel-1 (Radar Tahunan & Kemarau)...")
 s1_col = (ee.ImageCollection('COPERNICUS/S1_GRD')
@@ -78,11 +93,15 @@ s1_col = (ee.ImageCollection('COPERNICUS/S1_GRD')
         .filter(ee.Filter.eq('instrumentMode', 'IW')))
 
 # A. Radar Tahunan (Untuk Seeding/Deteksi Awal)
-s1_annual = s1_col.select('VV').median().clip(area_geometry).focal_median(15, 'circle', 'meters')
+s1_annual = cache.image(
+    's1_annual', lambda: s1_col.select('VV').median().clip(area_geometry).focal_median(15, 'circle', 'meters'),
+    {'area': area_bounds, 'start': start_date, 'end': end_date, 'radius': 15})
 
 # B. Radar Kemarau (Agustus-Oktober) - UNTUK VALIDASI ANTI SAWAH
-s1_dry = (s1_col.filterDate('2024-08-01', '2024-10-31')
-        .select('VV').median().clip(area_geometry).focal_median(10, 'circle', 'meters'))
+s1_dry = cache.image(
+    's1_dry', lambda: (s1_col.filterDate(dry_start, dry_end)
+                       .select('VV').median().clip(area_geometry).focal_median(10, 'circle', 'meters')),
+    {'area': area_bounds, 'start': dry_start, 'end': dry_end, 'radius': 10})
 
 # --- 5. HYBRID SEEDING (MENANGKAP SEMUA POTENSI AIR) ---
 print("3. Membuat Masker Bibit (Optik + Radar Tahunan)...")
@@ -134,7 +153,7 @@ candidates = candidates.filter(ee.Filter.And(
 ))
 
 # B. Filter Validasi Kemarau (Rice Killer)
-candidates = candidates.map(lambda f: validate_with_dry_radar(f, s1_dry))
+candidates = validate_with_dry_radar(candidates, s1_dry)
 
 # LOGIKA KUNCI:
 # Poligon harus GELAP (< -13 dB) saat Musim Kemarau.
@@ -142,7 +161,7 @@ candidates = candidates.map(lambda f: validate_with_dry_radar(f, s1_dry))
 final_result = candidates.filter(ee.Filter.lte('dry_vv', -13))
 
 # C. Filter Cropland (Backup)
-final_result = final_result.map(calculate_crop_overlap).filter(ee.Filter.lt('crop_pct', 0.5))
+final_result = calculate_crop_overlap(final_result).filter(ee.Filter.lt('crop_pct', 0.5))
 
 # D. Filter Tetangga
 spatial_filter = ee.Filter.withinDistance(100, '.geo', None, '.geo')
@@ -153,28 +172,48 @@ final_result = obj_with_neighbors.map(lambda f: f.set('near_num', ee.List(f.get(
 # Buffer
 final_result = final_result.map(lambda f: f.buffer(2))
 
-print(f"SELESAI. Total Tambak Valid: {final_result.size().getInfo()}")
+if PRINT_COUNT:
+    print(f"SELESAI. Total Tambak Valid: {final_result.size().getInfo()}")
+else:
+    print("SELESAI. Rantai proses siap, dihitung di server saat ekspor.")
 
 # --- 8. VISUALISASI ---
-Map = geemap.Map()
-Map.centerObject(area_geometry, 14)
+Map = None
+if not gee_backend.is_fake(ee):
+    import geemap
+    Map = geemap.Map()
+    Map.centerObject(area_geometry, 14)
 
-# Layer 1: RGB
-Map.addLayer(s2_col.median().clip(area_geometry).visualize(min=0, max=0.3, bands=['B4','B3','B2']), {}, 'S2 RGB')
+    # Layer 1: RGB
+    Map.addLayer(s2_col.median().clip(area_geometry).visualize(min=0, max=0.3, bands=['B4','B3','B2']), {}, 'S2 RGB')
 
-# Layer 2: Radar Kemarau (Perhatikan Sawah Putih, Tambak Hitam)
-Map.addLayer(s1_dry, {'min':-25, 'max':0}, 'S1 Dry Season (Validator)')
+    # Layer 2: Radar Kemarau (Perhatikan Sawah Putih, Tambak Hitam)
+    Map.addLayer(s1_dry, {'min':-25, 'max':0}, 'S1 Dry Season (Validator)')
 
-# Layer 3: Hasil Deteksi
-Map.addLayer(final_result, {'color': 'red', 'width': 2}, 'Deteksi Tambak (Hybrid + AntiSawah)')
+    # Layer 3: Hasil Deteksi
+    Map.addLayer(final_result, {'color': 'red', 'width': 2}, 'Deteksi Tambak (Hybrid + AntiSawah)')
 
 # --- 9. EKSPOR ---
 try:
     print("Mengekspor...")
-    out_shp = os.path.join(output_dir, 'nama_output_file.shp') #Ganti nama output file
-    geemap.ee_to_shp(final_result.select(['area_m2', 'LSI', 'dry_vv']), filename=out_shp)
-    print(f"SHP Tersimpan: {out_shp}")
+    cols = ['area_m2', 'LSI', 'dry_vv']
+    if EXPORT_TARGET == 'local':
+        import geemap
+        out_shp = os.path.join(output_dir, EXPORT_NAME + '.shp')
+        geemap.ee_to_shp(final_result.select(cols), filename=out_shp)
+        print(f"SHP Tersimpan: {out_shp}")
+    else:
+        # Task server: hasil ditulis GEE langsung ke Drive/Asset, tanpa lewat klien
+        task = gee_backend.export_table(ee, final_result, EXPORT_NAME, cols, EXPORT_TARGET,
+                                        folder=EXPORT_FOLDER, asset_root=ASSET_ROOT)
+        print(f"Task ekspor dimulai: {EXPORT_NAME} ({EXPORT_TARGET})")
+        if WAIT_FOR_EXPORT:
+            gee_backend.wait_for_task(task, POLL_SECONDS)
+            print(f"Ekspor selesai: {EXPORT_NAME} ({EXPORT_TARGET})")
 except Exception as e:
     print(f"Error Ekspor: {e}")
 
+if gee_backend.is_fake(ee):
+    print(f"[OFFLINE] Panggilan ee: {dict(ee.call_counts())}")
+
 Map
\ No newline at end of file
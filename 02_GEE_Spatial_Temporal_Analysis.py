@@ -1,18 +1,14 @@
-import ee
-import geemap
 import os
+import gee_backend
 
 # --- 1. INISIALISASI ---
-try:
-    ee.Initialize()
-    print("Berhasil terhubung ke Google Earth Engine.")
-except Exception as e:
-    ee.Authenticate()
-    ee.Initialize()
-    print("Berhasil terhubung setelah autentikasi.")
+# Backend dari env TAMBAK_EE_BACKEND: 'earthengine' (default) atau 'fake' (uji alur offline)
+ee = gee_backend.load_ee()
+gee_backend.initialize(ee)
 
 # --- 2. CONFIG AREA & WAKTU ---
-area_geometry = ee.Geometry.Rectangle([114.368739,-8.263853,114.382801,-8.243553]) # Ganti dengan lokasi file Anda
+area_bounds = [114.368739,-8.263853,114.382801,-8.243553] # Ganti dengan lokasi file Anda
+area_geometry = ee.Geometry.Rectangle(area_bounds)
 start_date = '2024-01-01'
 end_date = '2024-12-31'
 
@@ -23,6 +19,21 @@ proj_metric = ee.Projection('EPSG:32750') # Ganti dengan lokasi file Anda
 output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
 if not os.path.exists(output_dir): os.makedirs(output_dir)
 
+# Cache komposit (ndwi_clean, s1_annual) sebagai asset GEE. None = tanpa cache.
+ASSET_ROOT = None # mis. 'projects/your-project/assets/tambak_cache'
+# True = tunggu ekspor cache selesai lalu pakai asset; False = run ini tetap pakai komposit lazy
+CACHE_WAIT = False
+
+# Ekspor hasil: 'drive' (SHP di Google Drive), 'asset', atau 'local' (geemap.ee_to_shp, lama & terbatas ukuran)
+EXPORT_TARGET = 'drive'
+EXPORT_FOLDER = 'tambak'
+EXPORT_NAME = 'nama_output_file' # Ganti nama file Anda
+# True = polling status task sampai selesai; False = task dibiarkan jalan di server
+WAIT_FOR_EXPORT = True
+POLL_SECONDS = 30
+# size().getInfo() memblokir sampai seluruh rantai dihitung -> default tidak dipanggil
+PRINT_COUNT = False
+
 # --- 3. FUNGSI
 
 def mask_clouds_scl(image):
@@ -57,31 +68,31 @@ def calculate_shape_metrics(feature):
     rpoc = perimeter.divide(perimeter_hull)
     return feature.set({'area_m2': area, 'LSI': lsi, 'RPOC': rpoc})
 
-def calculate_median_values(feature, ndwi_img, radar_img):
-    """Hitung rata-rata NDWI dan Radar di dalam poligon."""
-    # Hitung NDWI
-    ndwi_val = ndwi_img.reduceRegion(
-        reducer=ee.Reducer.median(), geometry=feature.geometry(), scale=10, maxPixels=1e9
-    ).get('NDWI')
-    
-    # Hitung Radar VV
-    radar_val = radar_img.reduceRegion(
-        reducer=ee.Reducer.median(), geometry=feature.geometry(), scale=10, maxPixels=1e9
-    ).get('VV')
-    
-    return feature.set({'median_ndwi': ndwi_val, 'median_vv': radar_val})
+def calculate_median_values(collection, ndwi_img, radar_img):
+    """Hitung median NDWI dan Radar di dalam poligon.
+
+    NDWI & VV ditumpuk jadi 1 image 2 band -> 1x reduceRegions untuk semua poligon
+    (bukan 2 reduceRegion per poligon). Properti hasil = nama band.
+    """
+    stack = ndwi_img.select('NDWI').rename('median_ndwi').addBands(
+        radar_img.select('VV').rename('median_vv'))
+    return stack.reduceRegions(
+        collection=collection, reducer=ee.Reducer.median().forEachBand(stack), scale=10)
 
-def calculate_crop_overlap(feature):
-    """Cek tumpang tindih dengan lahan pertanian (ESA WorldCover)."""
+def calculate_crop_overlap(collection):
+    """Cek tumpang tindih dengan lahan pertanian (ESA WorldCover), 1x reduceRegions."""
     esa = ee.ImageCollection("ESA/WorldCover/v100").first()
     is_crop = esa.eq(40) 
-    crop_pct = is_crop.reduceRegion(
-        reducer=ee.Reducer.mean(), geometry=feature.geometry(), scale=10, maxPixels=1e9
-    ).get('Map')
-    return feature.set('crop_pct', crop_pct)
+    return is_crop.reduceRegions(
+        collection=collection, reducer=ee.Reducer.mean().setOutputs(['crop_pct']), scale=10)
 
 # --- 4. PRE-PROCESSING DATA ---
 
+cache = gee_backend.CompositeCache(ee, ASSET_ROOT, area_geometry, scale=10, crs='EPSG:32750',
+                                   wait=CACHE_WAIT, poll_seconds=POLL_SECONDS)
+# Konfigurasi ekspor dicek sebelum rantai proses dibangun (ASSET_ROOT wajib untuk target 'asset')
+if EXPORT_TARGET == 'asset': gee_backend.require_asset_root(ASSET_ROOT, "EXPORT_TARGET = 'asset'")
+
 print("1. Menyiapkan Data Sentinel-2 (Optik)...")
 s2_col = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') 
         .filterBounds(area_geometry)
@@ -90,7 +101,8 @@ s2_col = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
         .map(add_ndwi))
 
 # NDWI Bersih (Z-Score)
-ndwi_clean = z_score_cleaning(s2_col, area_geometry)
+ndwi_clean = cache.image('ndwi_clean', lambda: z_score_cleaning(s2_col, area_geometry),
+                         {'area': area_bounds, 'start': start_date, 'end': end_date})
 
 print("2. Menyiapkan Data Sentinel-1 (Radar)...")
 s1_col = (ee.ImageCollection('COPERNICUS/S1_GRD')
@@ -99,9 +111,10 @@ s1_col = (ee.ImageCollection('COPERNICUS/S1_GRD')
         .filter(ee.Filter.listContains('transmitterReceiverPolarisation', 'VV'))
         .filter(ee.Filter.eq('instrumentMode', 'IW')))
 
-# Ambil Median Tahunan & Smoothing 
-s1_base = s1_col.select('VV').median().clip(area_geometry)
-s1_smooth = s1_base.focal_median(15, 'circle', 'meters')
+# Ambil Median Tahunan & Smoothing (= s1_annual script 01, asset cache yang sama)
+s1_smooth = cache.image(
+    's1_annual', lambda: s1_col.select('VV').median().clip(area_geometry).focal_median(15, 'circle', 'meters'),
+    {'area': area_bounds, 'start': start_date, 'end': end_date, 'radius': 15})
 
 # --- 5. HYBRID SEEDING (GABUNGAN OPTIK & RADAR) ---
 print("3. Membuat Masker Hybrid (Bibit Tambak)...")
@@ -166,7 +179,7 @@ obj = ee.FeatureCollection(valid_ponds_list).flatten()
 obj = obj.filter(ee.Filter.lte('area_m2', 500000)).filter(ee.Filter.gte('area_m2', 300))
 
 # B. Filter Nilai (Median NDWI & Radar) - INI KUNCINYA!
-obj = obj.map(lambda f: calculate_median_values(f, ndwi_clean, s1_smooth))
+obj = calculate_median_values(obj, ndwi_clean, s1_smooth)
 
 # LOGIKA BARU: 
 # Lolos jika (NDWI Jernih > 0.05) ATAU (Radar Gelap < -13)
@@ -177,7 +190,7 @@ obj = obj.filter(ee.Filter.Or(
 ))
 
 # C. Filter Cropland (Buang Sawah)
-obj = obj.map(calculate_crop_overlap)
+obj = calculate_crop_overlap(obj)
 obj = obj.filter(ee.Filter.lt('crop_pct', 0.5))
 
 # D. Filter Tetangga (Minimal 1 Teman)
@@ -189,33 +202,52 @@ final_result = obj_with_neighbors.map(lambda f: f.set('near_num', ee.List(f.get(
 # Buffer
 final_result = final_result.map(lambda f: f.buffer(2))
 
-print(f"SELESAI. Total Tambak Valid: {final_result.size().getInfo()}")
+if PRINT_COUNT:
+    print(f"SELESAI. Total Tambak Valid: {final_result.size().getInfo()}")
+else:
+    print("SELESAI. Rantai proses siap, dihitung di server saat ekspor.")
 
 # --- 8. VISUALISASI ---
-Map = geemap.Map()
-Map.centerObject(area_geometry, 14)
+Map = None
+if not gee_backend.is_fake(ee):
+    import geemap
+    Map = geemap.Map()
+    Map.centerObject(area_geometry, 14)
 
-# Visual RGB
-s2_vis = s2_col.median().clip(area_geometry).visualize(min=0, max=0.3, bands=['B4','B3','B2'])
-Map.addLayer(s2_vis, {}, 'Sentinel-2 RGB')
+    # Visual RGB
+    s2_vis = s2_col.median().clip(area_geometry).visualize(min=0, max=0.3, bands=['B4','B3','B2'])
+    Map.addLayer(s2_vis, {}, 'Sentinel-2 RGB')
 
-# Visual Radar
-Map.addLayer(s1_smooth, {'min':-25, 'max':0}, 'Sentinel-1 Smooth')
+    # Visual Radar
+    Map.addLayer(s1_smooth, {'min':-25, 'max':0}, 'Sentinel-1 Smooth')
 
-# Visual Binary Mask (Hybrid)
-Map.addLayer(hybrid_water_mask, {'palette':['cyan']}, 'Hybrid Water Mask')
+    # Visual Binary Mask (Hybrid)
+    Map.addLayer(hybrid_water_mask, {'palette':['cyan']}, 'Hybrid Water Mask')
 
-# Visual Hasil
-Map.addLayer(final_result, {'color': 'red', 'width': 2}, 'Deteksi Tambak (SOAP + Radar)')
+    # Visual Hasil
+    Map.addLayer(final_result, {'color': 'red', 'width': 2}, 'Deteksi Tambak (SOAP + Radar)')
 
 # --- 9. EKSPOR ---
 print("Mengekspor...")
 try:
-    out_shp = os.path.join(output_dir, 'nama_output_file.shp') # Ganti nama file Anda
     cols = ['area_m2', 'LSI', 'RPOC', 'median_ndwi', 'median_vv']
-    geemap.ee_to_shp(final_result.select(cols), filename=out_shp)
-    print(f"SHP Tersimpan: {out_shp}")
+    if EXPORT_TARGET == 'local':
+        import geemap
+        out_shp = os.path.join(output_dir, EXPORT_NAME + '.shp')
+        geemap.ee_to_shp(final_result.select(cols), filename=out_shp)
+        print(f"SHP Tersimpan: {out_shp}")
+    else:
+        # Task server: hasil ditulis GEE langsung ke Drive/Asset, tanpa lewat klien
+        task = gee_backend.export_table(ee, final_result, EXPORT_NAME, cols, EXPORT_TARGET,
+                                        folder=EXPORT_FOLDER, asset_root=ASSET_ROOT)
+        print(f"Task ekspor dimulai: {EXPORT_NAME} ({EXPORT_TARGET})")
+        if WAIT_FOR_EXPORT:
+            gee_backend.wait_for_task(task, POLL_SECONDS)
+            print(f"Ekspor selesai: {EXPORT_NAME} ({EXPORT_TARGET})")
 except Exception as e:
     print(f"Gagal Ekspor: {e}")
 
+if gee_backend.is_fake(ee):
+    print(f"[OFFLINE] Panggilan ee: {dict(ee.call_counts())}")
+
 Map
\ No newline at end of file
@@ -2,82 +2,1079 @@ import rasterio
 import cv2
 import numpy as np
 import geopandas as gpd
-from shapely.geometry import shape
+import shapely
+from shapely.strtree import STRtree
 import rasterio.features
+import rasterio.shutil
+from rasterio.windows import Window
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import queue
+import json
+import hashlib
+import shutil
+import contextlib
+import time
+import sys
 import os
 import math
 
+try:
+    import resource  # Puncak RSS (tidak ada di Windows)
+except ImportError:
+    resource = None
+
 # ==========================================
 # 1. KONFIGURASI FILE
 # ==========================================
 input_tif = r"T49LHL-55846db01-20251212T080403Z-3-001\T49LHL-55846db01\S2L2Ax10_T49LHL-55846db01-20240718_MS.tif"
 output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
-output_shp_name = f"S2DR3_Tambak.shp" # Nama File Baru
+output_name = "S2DR3_Tambak" # Nama File Baru (ekstensi mengikuti OUTPUT_FORMAT)
+
+# Format output: "parquet" (GeoParquet), "fgb" (FlatGeobuf), "shp" (Shapefile, legacy)
+# Hasil ditulis bertahap per tile, tidak dikumpulkan dulu di RAM.
+OUTPUT_FORMAT = "parquet"
 
 # ==========================================
 # 2. KONFIGURASI PARAMETER (EXTREME LOOSE)
 # ==========================================
 BAND_GREEN_IDX = 2
 BAND_RED_IDX   = 3
-BAND_NIR_IDX   = 4 
+BAND_NIR_IDX   = 4
 
 # [PERUBAHAN 1] NDWI SANGAT LONGGAR
 # Nilai -0.1 akan menangkap air yang sangat keruh/berlumpur.
 # Risiko: Sawah basah akan masuk (tapi nanti kita cek di Precision).
-THRESH_NDWI = -0.10 
+THRESH_NDWI = -0.10
 
 # [PERUBAHAN 2] NDVI LONGGAR
 # Naikkan ke 0.35. Banyak tambak produktif itu hijau pekat (full algae).
 # Jika diset 0.15 atau 0.25, tambak produktif ini dianggap tanaman.
-MAX_NDVI = 0.35     
+MAX_NDVI = 0.35
 
 # [PERUBAHAN 3] NIR LONGGAR
 # Naikkan ke 3500. Tambak yang sedang persiapan (tanah basah/dangkal) itu terang.
-MAX_NIR_VALUE = 3500 
+MAX_NIR_VALUE = 3500
 
 # [PERUBAHAN 4] GEOMETRI SANGAT LONGGAR
-MIN_LUAS = 300      
+MIN_LUAS = 300
 MAX_LUAS = 150000   # Naikkan dikit siapa tahu ada tambak raksasa
 # LSI 2.5 mengizinkan bentuk yang sangat kasar/bergerigi masuk.
-MAX_LSI  = 2.5      
-MAX_RPOC = 1.8      
+MAX_LSI  = 2.5
+MAX_RPOC = 1.8
+# Double Buffer Smoothing (+2m lalu -2m) & toleransi simplify (meter)
+BUFFER_SMOOTH = 2.0
+SIMPLIFY_TOL  = 0.5
+
+# [PERUBAHAN 5] TILING (HEMAT RAM)
+# Scene dibaca per window, bukan sekaligus. Peak RAM ~ TILE_SIZE^2, bukan ukuran scene.
+# None = baca seluruh scene sekaligus (perilaku lama).
+TILE_SIZE = 2048
+# Halo (overlap) per sisi tile. Open + Close 3x3 = 4 operasi radius 1,
+# jadi minimal 4 piksel agar hasil morfologi di tepi tile sama persis.
+TILE_HALO = 4
+MORPH_HALO = 4
+
+# [PERUBAHAN 6] PARALEL (MULTI-CORE)
+# Jumlah proses worker untuk memproses tile. None = semua core, 1 = serial.
+# Urutan hasil tetap sama dengan mode serial (deterministik).
+N_WORKERS = None
+
+# [PERUBAHAN 7] INDEX FUSED (HEMAT MEMORI)
+# Index & filter dihitung per strip ~MASK_CHUNK_PIXELS piksel (muat di cache CPU).
+MASK_CHUNK_PIXELS = 1 << 16
+
+# [PERUBAHAN 8] PRE-FILTER KOMPONEN (SEBELUM VEKTORISASI)
+# Komponen yang mustahil lolos MIN_LUAS/MAX_LUAS (sudah termasuk efek buffer
+# +-2m & simplify) dibuang di raster, tidak ikut divektorisasi.
+PREFILTER_COMPONENTS = True
+
+# [PERUBAHAN 9] CACHE DISK (CLEAN MASK)
+# Re-run dengan file & threshold spektral yang sama langsung lompat ke vektorisasi.
+# None = tanpa cache. Folder dibatasi CACHE_MAX_BYTES (entri terlama dihapus / LRU).
+CACHE_DIR = os.path.join(output_dir, "cache")
+CACHE_MAX_BYTES = 20 * 1024 ** 3
+CACHE_VERSION = 1
+
+# [PERUBAHAN 10] PROFILING (LAPORAN JSON)
+# Wall time, CPU time & kenaikan puncak RSS per tahap + counter (piksel per filter,
+# poligon ditolak per aturan) -> <output>_profile.json di samping file hasil.
+PROFILE_REPORT = True
+
+# [PERUBAHAN 11] COARSE-TO-FINE (SKRINING 10 M)
+# Scene diringkas jadi sel COARSE_FACTOR x COARSE_FACTOR piksel (10 m untuk 1 m) berisi
+# min/max band hijau, merah & NIR. Sel yang pasti tidak punya piksel lolos NDWI/NDVI/NIR
+# dilewati: tile tanpa sel "panas" tidak diproses, strip tanpa sel panas tidak dihitung
+# index-nya. Batasnya konservatif, jadi hasil identik dengan mode penuh (recall sama).
+# Ringkasan disimpan di cache.
+COARSE_SCREEN = True
+COARSE_FACTOR = 10
+
+# [PERUBAHAN 12] RASTER QA (CLOUD-OPTIMIZED GEOTIFF)
+# Raster antara disimpan sebagai COG (tiled 512, deflate, overview internal) di samping
+# file hasil: <output>_<nama>.tif. Bisa di-zoom langsung di QGIS tanpa run ulang.
+# Ditulis per window ke GeoTIFF sementara, lalu disalin ke layout COG + overview.
+# Pilihan: 'ndwi', 'ndvi' (float32), 'mask_ndwi', 'mask_ndvi', 'mask_nir' (lolos tiap
+# filter), 'water_mask' (gabungan sebelum cleaning), 'clean_mask'. () = nonaktif.
+# Selain 'clean_mask', skrining kasar & cache clean_mask dilewati (semua piksel dihitung).
+QA_RASTERS = ()
+
+# Konfigurasi yang dikirim ke worker (agar override di proses utama ikut terbawa)
+WORKER_CONFIG_NAMES = [
+    'BAND_GREEN_IDX', 'BAND_RED_IDX', 'BAND_NIR_IDX',
+    'THRESH_NDWI', 'MAX_NDVI', 'MAX_NIR_VALUE',
+    'MIN_LUAS', 'MAX_LUAS', 'MAX_LSI', 'MAX_RPOC',
+    'BUFFER_SMOOTH', 'SIMPLIFY_TOL', 'PREFILTER_COMPONENTS', 'MASK_CHUNK_PIXELS',
+]
 
 # ==========================================
 # 3. FUNGSI BANTUAN
 # ==========================================
 def calculate_lsi(geometry):
-    area = geometry.area
-    perimeter = geometry.length
-    if area <= 0: return 999
-    return perimeter / (4 * np.sqrt(area))
+    """LSI untuk 1 geometri atau array geometri (shapely 2.x)."""
+    area = shapely.area(geometry)
+    perimeter = shapely.length(geometry)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(area > 0, perimeter / (4 * np.sqrt(area)), 999)
 
 def calculate_rpoc(geometry):
-    perimeter_asli = geometry.length
-    hull = geometry.convex_hull
-    perimeter_hull = hull.length
-    if perimeter_hull <= 0: return 999
-    return perimeter_asli / perimeter_hull
+    """RPOC untuk 1 geometri atau array geometri (shapely 2.x)."""
+    perimeter_asli = shapely.length(geometry)
+    perimeter_hull = shapely.length(shapely.convex_hull(geometry))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(perimeter_hull > 0, perimeter_asli / perimeter_hull, 999)
 
-# ==========================================
-# 4. EKSEKUSI
-# ==========================================
-if not os.path.exists(output_dir): os.makedirs(output_dir)
-output_path = os.path.join(output_dir, output_shp_name)
+# --- PROFILING ---
+def peak_rss_mb(children=False):
+    """Puncak RSS proses ini / proses anak terbesar (MB), None jika tidak didukung OS."""
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: byte
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
 
-print(f"--- MULAI DETEKSI V3 (Target: RECALL NAIK) ---")
+class StageProfiler:
+    """Wall time, CPU time & kenaikan puncak RSS per tahap + counter.
 
-try:
-    with rasterio.open(input_tif) as src:
+    Dibuat per tile di worker lalu digabung (merge) di proses utama, jadi
+    waktu tahap = jumlah seluruh tile/worker. rss_growth_mb = berapa MB tahap itu
+    menaikkan puncak RSS proses (ru_maxrss) dihitung dari puncak saat tahap mulai,
+    dijumlah semua panggilan. 0 = tahap tidak melewati puncak sebelumnya; puncak
+    seluruh proses ada di info laporan (peak_rss_mb_main / _workers).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall, cpu, rss = time.perf_counter(), time.process_time(), peak_rss_mb()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rss_growth_mb': None})
+            record['calls'] += 1
+            record['wall_s'] += time.perf_counter() - wall
+            record['cpu_s'] += time.process_time() - cpu
+            if rss is not None: record['rss_growth_mb'] = (record['rss_growth_mb'] or 0) + peak_rss_mb() - rss
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def merge(self, other):
+        if other is None: return
+        for name, theirs in other.stages.items():
+            record = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rss_growth_mb': None})
+            for key in ('calls', 'wall_s', 'cpu_s'): record[key] += theirs[key]
+            if theirs['rss_growth_mb'] is not None:
+                record['rss_growth_mb'] = (record['rss_growth_mb'] or 0) + theirs['rss_growth_mb']
+        for name, value in other.counters.items(): self.count(name, value)
+
+def profile_stage(profiler, name):
+    """profiler.stage(name), atau tanpa apa-apa jika profiling mati (profiler None)."""
+    return profiler.stage(name) if profiler is not None else contextlib.nullcontext()
+
+def profile_path_for(output_path):
+    return os.path.splitext(output_path)[0] + '_profile.json'
+
+def is_reflectance(src):
+    """Cek tipe data (Reflectance 0-1 / Digital Number) tanpa membaca seluruh band."""
+    block_max = [np.max(src.read(BAND_NIR_IDX, window=win))
+                 for _, win in src.block_windows(BAND_NIR_IDX)]
+    max_val_img = np.max(block_max)
+    return max_val_img <= 1.0
+
+def work_dtype_for(band):
+    """DN integer (<= 16 bit) cukup float32 agar tetap exact; reflectance tetap float64."""
+    if band.dtype.kind in 'ui' and band.dtype.itemsize <= 2:
+        return np.float32
+    return np.float64
+
+def ratio_terms(a, b, num, den, scratch):
+    """num = a - b, den = a + b, siap dibandingkan tanpa pembagian (cross-multiply)."""
+    np.subtract(a, b, out=num)
+    np.add(a, b, out=den)
+
+    # Semantik lama: denominator 0 diganti 0.001
+    np.equal(den, 0, out=scratch)
+    if scratch.any(): den[scratch] = 0.001
+
+    # Denominator negatif: balik tanda num & den agar arah perbandingan tetap
+    np.less(den, 0, out=scratch)
+    if scratch.any():
+        np.negative(num, out=num, where=scratch)
+        np.negative(den, out=den, where=scratch)
+
+def ratio_threshold(num, den, thresh, compare, thr, out):
+    """out = compare(num / den, thresh).
+
+    Perkalian threshold * denominator selalu float64 agar kasus "pas di threshold"
+    (mis. 900/6000 == 0.15) hasilnya sama dengan pembagian float64 versi lama.
+    """
+    np.multiply(den, thresh, out=thr, dtype=np.float64)
+    compare(num, thr, out=out)
+
+def compute_water_mask(green, red, nir, current_max_nir, profiler=None, core_box=None, hot_rows=None):
+    """NDWI/NDVI/NIR -> masker uint8 (1 = kandidat air) dalam satu jalan per strip baris.
+
+    Buffer strip dipakai ulang sehingga tidak ada array index seukuran scene.
+    Jika profiler diberikan, piksel yang dibuang tiap filter dihitung di dalam
+    core_box = (row0, row1, col0, col1) saja (halo tidak dihitung dobel).
+    hot_rows (bool per baris, dari skrining kasar): strip tanpa baris panas langsung 0.
+    """
+    work_dtype = work_dtype_for(green)
+
+    height, width = green.shape
+    strip_rows = max(1, MASK_CHUNK_PIXELS // max(width, 1))
+    buf_shape = (min(strip_rows, height), width)
+
+    g   = np.empty(buf_shape, work_dtype)
+    r   = np.empty(buf_shape, work_dtype)
+    n   = np.empty(buf_shape, work_dtype)
+    num = np.empty(buf_shape, work_dtype)
+    den = np.empty(buf_shape, work_dtype)
+    thr = np.empty(buf_shape, np.float64)
+    mask    = np.empty(buf_shape, bool)
+    mask_b  = np.empty(buf_shape, bool)
+    scratch = np.empty(buf_shape, bool)
+
+    mask_uint8 = np.empty((height, width), np.uint8)
+    if core_box is None: core_box = (0, height, 0, width)
+    row0, row1, col0, col1 = core_box
+    # Sisa kandidat setelah tiap filter (berurutan): semua, NDWI, NDVI, NIR
+    remaining = [0, 0, 0, 0]
+    screened = 0
+
+    for row in range(0, height, strip_rows):
+        h = min(strip_rows, height - row)
+        gs, rs, ns = g[:h], r[:h], n[:h]
+        ms, mbs = mask[:h], mask_b[:h]
+        np.copyto(gs, green[row:row + h], casting='unsafe')
+        np.copyto(rs, red[row:row + h], casting='unsafe')
+        np.copyto(ns, nir[row:row + h], casting='unsafe')
+        counted = ms[max(row0 - row, 0):max(min(row1 - row, h), 0), col0:col1]
+        if hot_rows is not None and not hot_rows[row:row + h].any():
+            mask_uint8[row:row + h] = 0
+            screened += counted.size
+            continue
+
+        # mask_air: NDWI > THRESH_NDWI
+        ratio_terms(gs, ns, num[:h], den[:h], scratch[:h])
+        ratio_threshold(num[:h], den[:h], THRESH_NDWI, np.greater, thr[:h], ms)
+        if profiler is not None:
+            remaining[0] += counted.size
+            remaining[1] += np.count_nonzero(counted)
+        # mask_non_veg: NDVI < MAX_NDVI
+        ratio_terms(ns, rs, num[:h], den[:h], scratch[:h])
+        ratio_threshold(num[:h], den[:h], MAX_NDVI, np.less, thr[:h], mbs)
+        np.logical_and(ms, mbs, out=ms)
+        if profiler is not None: remaining[2] += np.count_nonzero(counted)
+        # mask_non_bright
+        np.less(ns, current_max_nir, out=mbs)
+        np.logical_and(ms, mbs, out=ms)
+        if profiler is not None: remaining[3] += np.count_nonzero(counted)
+
+        mask_uint8[row:row + h] = ms
+
+    if profiler is not None:
+        profiler.count('px_total', remaining[0] + screened)
+        profiler.count('px_screened', screened)
+        profiler.count('px_masked_ndwi', remaining[0] - remaining[1])
+        profiler.count('px_masked_ndvi', remaining[1] - remaining[2])
+        profiler.count('px_masked_nir', remaining[2] - remaining[3])
+        profiler.count('px_kandidat', remaining[3])
+    return mask_uint8
+
+def clean_water_mask(mask_uint8):
+    """Opening lalu Closing 3x3 untuk membuang noise."""
+    kernel = np.ones((3,3), np.uint8)
+    clean_mask = cv2.morphologyEx(mask_uint8, cv2.MORPH_OPEN, kernel)
+    clean_mask = cv2.morphologyEx(clean_mask, cv2.MORPH_CLOSE, kernel)
+    return clean_mask
+
+def empty_batch():
+    """Batch kolom kosong (hasil per tile disimpan sebagai array, bukan dict per poligon)."""
+    return {
+        'geometry': np.empty(0, dtype=object),
+        'area_m2': np.empty(0),
+        'LSI': np.empty(0),
+        'RPOC': np.empty(0),
+    }
+
+def shapes_to_polygons(mask, col_off=0, row_off=0):
+    """Vektorisasi piksel bernilai 1 -> array Polygon (koordinat piksel scene).
+
+    Koordinat semua ring dikumpulkan dulu, lalu Polygon dibuat sekaligus
+    lewat shapely.linearrings / shapely.polygons (tanpa shape() per objek).
+    """
+    coords = []
+    ring_len = []
+    ring_poly = []
+    n_poly = 0
+    for geom, value in rasterio.features.shapes(mask):
+        if value != 1: continue
+        for ring in geom['coordinates']:
+            coords.extend(ring)
+            ring_len.append(len(ring))
+            ring_poly.append(n_poly)
+        n_poly += 1
+
+    if n_poly == 0: return np.empty(0, dtype=object)
+
+    # Koordinat piksel lokal -> koordinat piksel scene (integer, exact)
+    xy = np.asarray(coords, dtype=float) + (col_off, row_off)
+    rings = shapely.linearrings(xy, indices=np.repeat(np.arange(len(ring_len)), ring_len))
+    return shapely.polygons(rings, indices=ring_poly)
+
+def smooth_polygons(raw_polys, transform):
+    """Double Buffer Smoothing untuk array poligon (koordinat piksel scene -> CRS)."""
+    # Bentuk kanonik (tanpa titik kolinear, awal ring tetap) agar hasil simplify
+    # sama persis baik poligon utuh dari 1 tile maupun hasil jahitan antar tile
+    raw_polys = shapely.normalize(shapely.simplify(raw_polys, 0))
+    t = transform
+    raw_polys = shapely.transform(
+        raw_polys, lambda xy: xy @ np.array([[t.a, t.d], [t.b, t.e]]) + (t.c, t.f))
+
+    # Buffer Smoothing Tetap Dipakai (Wajib untuk LSI)
+    # +2m lalu -2m
+    buffered = shapely.buffer(raw_polys, BUFFER_SMOOTH, quad_segs=16, join_style='round')
+    final_polys = shapely.simplify(
+        shapely.buffer(buffered, -BUFFER_SMOOTH, quad_segs=16, join_style='round'), SIMPLIFY_TOL)
+    return final_polys
+
+def polygon_metrics(final_polys, min_luas, max_luas):
+    """Luas, LSI, RPOC untuk poligon di dalam jendela luas. Return batch kolom."""
+    area = shapely.area(final_polys)
+    keep = (area >= min_luas) & (area <= max_luas)
+    final_polys, area = final_polys[keep], area[keep]
+    return {
+        'geometry': final_polys,
+        'area_m2': area,
+        'LSI': calculate_lsi(final_polys),
+        'RPOC': calculate_rpoc(final_polys),
+    }
+
+def filter_batch(batch, keep):
+    return {key: values[keep] for key, values in batch.items()}
+
+def smooth_and_filter(raw_polys, transform, profiler=None):
+    """Double Buffer Smoothing + Filter Geometri untuk array poligon. Return batch kolom."""
+    if len(raw_polys) == 0: return empty_batch()
+    with profile_stage(profiler, 'smooth'):
+        final_polys = smooth_polygons(raw_polys, transform)
+
+    with profile_stage(profiler, 'geometry_filter'):
+        batch = polygon_metrics(final_polys, MIN_LUAS, MAX_LUAS)
+        # Filter Geometri (LONGGAR)
+        lolos_lsi = batch['LSI'] <= MAX_LSI
+        keep = lolos_lsi & (batch['RPOC'] <= MAX_RPOC)
+
+    if profiler is not None:
+        # Ditolak per aturan, berurutan: luas -> LSI -> RPOC
+        area = shapely.area(final_polys)
+        profiler.count('rejected_area_min', np.count_nonzero(area < MIN_LUAS))
+        profiler.count('rejected_area_max', np.count_nonzero(area > MAX_LUAS))
+        profiler.count('rejected_lsi', np.count_nonzero(~lolos_lsi))
+        profiler.count('rejected_rpoc', np.count_nonzero(lolos_lsi & ~keep))
+    return filter_batch(batch, keep)
+
+def _component_perimeter(labels, n_labels, px_w, px_h):
+    """Keliling (meter) tiap komponen = jumlah sisi piksel yang berbatasan dengan label lain."""
+    perimeter = np.zeros(n_labels)
+    # Sisi vertikal (tetangga kiri-kanan) panjangnya = tinggi piksel
+    diff = labels[:, 1:] != labels[:, :-1]
+    perimeter += px_h * (np.bincount(labels[:, 1:][diff], minlength=n_labels) +
+                         np.bincount(labels[:, :-1][diff], minlength=n_labels))
+    perimeter += px_h * (np.bincount(labels[:, 0], minlength=n_labels) +
+                         np.bincount(labels[:, -1], minlength=n_labels))
+    # Sisi horizontal (tetangga atas-bawah) panjangnya = lebar piksel
+    diff = labels[1:] != labels[:-1]
+    perimeter += px_w * (np.bincount(labels[1:][diff], minlength=n_labels) +
+                         np.bincount(labels[:-1][diff], minlength=n_labels))
+    perimeter += px_w * (np.bincount(labels[0], minlength=n_labels) +
+                         np.bincount(labels[-1], minlength=n_labels))
+    return perimeter
+
+def prefilter_components(mask, transform, seam_sides=(False, False, False, False),
+                         min_luas=None, max_luas=None):
+    """Buang komponen (4-connected, sama dengan shapes) yang mustahil lolos filter luas.
+
+    - Batas atas luas: hasil smoothing selalu di dalam komponen + (BUFFER_SMOOTH +
+      SIMPLIFY_TOL) meter, jadi luas <= bbox diperbesar (rumus Steiner).
+    - Batas bawah luas: +2m/-2m (closing) hanya menambah luas; simplify paling
+      banyak memotong SIMPLIFY_TOL x keliling.
+    Komponen yang menyentuh sambungan tile belum utuh, jadi tidak dibuang.
+    Return (mask, jumlah komponen dibuang).
+    """
+    if min_luas is None: min_luas = MIN_LUAS
+    if max_luas is None: max_luas = MAX_LUAS
+    n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4, ltype=cv2.CV_32S)
+    if n_labels <= 1: return mask, 0
+
+    t = transform
+    px_w = math.hypot(t.a, t.d)
+    px_h = math.hypot(t.b, t.e)
+    px_area = abs(t.a * t.e - t.b * t.d)
+
+    left, top, width, height, count = [stats[:, i].astype(float) for i in range(5)]
+    margin = BUFFER_SMOOTH + SIMPLIFY_TOL
+    max_area = (width * height * px_area + margin * 2 * (width * px_w + height * px_h)
+                + math.pi * margin ** 2)
+    drop = max_area < min_luas
+
+    pixel_area = count * px_area
+    if np.any(pixel_area[1:] > max_luas):
+        # Sisi busur buffer (16 segmen per 1/4 lingkaran) bisa sedikit ke dalam
+        arc_error = 2 * BUFFER_SMOOTH * (1 - math.cos(math.pi / 64))
+        perimeter = _component_perimeter(labels, n_labels, px_w, px_h)
+        drop |= pixel_area - (SIMPLIFY_TOL + arc_error) * perimeter > max_luas
+
+    seam_left, seam_top, seam_right, seam_bottom = seam_sides
+    rows, cols = mask.shape
+    drop &= ~((seam_left & (left == 0)) | (seam_top & (top == 0)) |
+              (seam_right & (left + width == cols)) | (seam_bottom & (top + height == rows)))
+    drop[0] = False
+
+    n_drop = int(drop.sum())
+    if n_drop == 0: return mask, 0
+    keep = (~drop).astype(np.uint8)
+    keep[0] = 0
+    return keep[labels], n_drop
+
+def _align_to_block(size, block):
+    """Bulatkan ukuran tile ke kelipatan block GeoTIFF (kalau block lebih kecil)."""
+    if block >= size: return size
+    return int(math.ceil(size / block) * block)
+
+def iter_tile_windows(width, height, tile_size=TILE_SIZE, halo=TILE_HALO, block_shape=(1, 1)):
+    """Yield (core_window, read_window). Read window = core + halo, dipotong di tepi scene."""
+    if halo < MORPH_HALO:
+        raise ValueError(f"TILE_HALO minimal {MORPH_HALO} piksel agar Open/Close 3x3 tetap exact.")
+    if tile_size is None:
+        tile_h, tile_w = height, width
+    else:
+        tile_h = _align_to_block(tile_size, block_shape[0])
+        tile_w = _align_to_block(tile_size, block_shape[1])
+
+    for row_off in range(0, height, tile_h):
+        for col_off in range(0, width, tile_w):
+            core = Window(col_off, row_off, min(tile_w, width - col_off), min(tile_h, height - row_off))
+            r0 = max(0, row_off - halo)
+            c0 = max(0, col_off - halo)
+            r1 = min(height, row_off + core.height + halo)
+            c1 = min(width, col_off + core.width + halo)
+            yield core, Window(c0, r0, c1 - c0, r1 - r0)
+
+# --- SKRINING KASAR (COARSE-TO-FINE) ---
+def _cell_reduce(band, factor, reduce):
+    """reduce (np.fmin / np.fmax) per blok factor x factor; blok tepi yang tidak penuh
+    diisi ulang nilai tepi (min/max tidak berubah)."""
+    pad_h, pad_w = -band.shape[0] % factor, -band.shape[1] % factor
+    if pad_h or pad_w: band = np.pad(band, ((0, pad_h), (0, pad_w)), mode='edge')
+    rows = reduce.reduce(band.reshape(-1, factor, band.shape[1]), axis=1)
+    return reduce.reduce(rows.reshape(rows.shape[0], -1, factor), axis=2)
+
+def envelope_tile(src, window, factor):
+    """Min/max hijau, merah, NIR per sel factor x factor piksel di 1 window (NaN diabaikan)."""
+    cells = [_cell_reduce(band, factor, reduce)
+             for band in read_tile_bands(src, window) for reduce in (np.fmin, np.fmax)]
+    return window, np.stack(cells)
+
+def compute_envelope(input_path, src, factor=None, n_workers=N_WORKERS):
+    """Ringkasan kasar scene: (6, ceil(H/f), ceil(W/f)) = min/max hijau, merah, NIR per sel."""
+    if factor is None: factor = COARSE_FACTOR
+    size = factor * math.ceil((TILE_SIZE or max(src.width, src.height)) / factor)
+    tasks = [(Window(c, r, min(size, src.width - c), min(size, src.height - r)), factor)
+             for r in range(0, src.height, size) for c in range(0, src.width, size)]
+    envelope = None
+    for window, cells in iter_tile_results(input_path, src, tasks, n_workers, envelope_tile):
+        if envelope is None:
+            envelope = np.empty((6, math.ceil(src.height / factor), math.ceil(src.width / factor)), cells.dtype)
+        r, c = window.row_off // factor, window.col_off // factor
+        envelope[:, r:r + cells.shape[1], c:c + cells.shape[2]] = cells
+    return envelope
+
+def screen_cells(envelope, current_max_nir):
+    """Sel yang MUNGKIN berisi piksel lolos NDWI > THRESH_NDWI, NDVI < MAX_NDVI, NIR < max.
+
+    Untuk nilai >= 0, NDWI naik dengan hijau & turun dengan NIR, NDVI naik dengan NIR &
+    turun dengan merah. Jadi NDWI maksimum sel = NDWI(hijau max, NIR min) dan NDVI
+    minimum = NDVI(NIR min, merah max), dengan aturan denominator 0 -> 0.001 yang sama.
+    Sudut ini belum tentu 1 piksel nyata, jadi skrining hanya bisa meloloskan lebih
+    banyak sel. Sel dengan nilai negatif (monoton tidak berlaku) selalu dianggap panas.
+    """
+    g_min, g_max, r_min, r_max, n_min, n_max = envelope.astype(np.float64)
+    def ratio(a, b):
+        den = a + b
+        den[den == 0] = 0.001
+        return (a - b) / den
+    # Toleransi pembulatan (tes piksel memakai perkalian silang, bukan pembagian)
+    eps = 1e-9
+    with np.errstate(invalid='ignore'):
+        hot = ((ratio(g_max, n_min) > THRESH_NDWI - eps) &
+               (ratio(n_min, r_max) < MAX_NDVI + eps) &
+               (n_min < current_max_nir))
+        hot |= np.fmin(np.fmin(g_min, r_min), n_min) < 0
+    return hot
+
+def screen_tile(hot_cells, core, factor=None):
+    """Bagian core tile yang perlu diproses penuh (None = tile dilewati).
+
+    = bbox sel panas (termasuk sel tetangga di luar core) + margin 1 sel, dipotong
+    ke core. Open/Close 3x3 hanya bisa menambah piksel <= 1 px dari piksel kandidat,
+    jadi di luar area ini clean_mask pasti 0.
+    """
+    if factor is None: factor = COARSE_FACTOR
+    r0, c0 = max(core.row_off // factor - 1, 0), max(core.col_off // factor - 1, 0)
+    r1 = (core.row_off + core.height - 1) // factor + 2
+    c1 = (core.col_off + core.width - 1) // factor + 2
+    rows, cols = np.nonzero(hot_cells[r0:r1, c0:c1])
+    if len(rows) == 0: return None
+    top = max((r0 + rows.min() - 1) * factor, core.row_off)
+    left = max((c0 + cols.min() - 1) * factor, core.col_off)
+    bottom = min((r0 + rows.max() + 2) * factor, core.row_off + core.height)
+    right = min((c0 + cols.max() + 2) * factor, core.col_off + core.width)
+    if top >= bottom or left >= right: return None
+    return Window(left, top, right - left, bottom - top)
+
+def tile_hot_rows(hot_cells, read_win, factor=None):
+    """Per baris read window: apakah ada sel panas di kolom window ini."""
+    if factor is None: factor = COARSE_FACTOR
+    r0, c0 = read_win.row_off // factor, read_win.col_off // factor
+    r1 = (read_win.row_off + read_win.height - 1) // factor + 1
+    c1 = (read_win.col_off + read_win.width - 1) // factor + 1
+    rows = np.repeat(hot_cells[r0:r1, c0:c1].any(axis=1), factor)
+    start = read_win.row_off - r0 * factor
+    return rows[start:start + read_win.height]
+
+def read_tile_bands(src, read_win):
+    # DN mentah (tanpa cast float64), konversi dilakukan per strip di compute_water_mask
+    green = src.read(BAND_GREEN_IDX, window=read_win)
+    red   = src.read(BAND_RED_IDX, window=read_win)
+    nir   = src.read(BAND_NIR_IDX, window=read_win)
+    return green, red, nir
+
+def vectorize_tile(clean_mask, core, read_win, src, min_luas=None, max_luas=None, profiler=None):
+    """Masker bersih (core + halo) -> (poligon dalam tile, potongan sambungan, jumlah dibuang)."""
+    # Buang halo, vektorisasi hanya area inti tile
+    dr = core.row_off - read_win.row_off
+    dc = core.col_off - read_win.col_off
+    core_mask = np.ascontiguousarray(clean_mask[dr:dr + core.height, dc:dc + core.width])
+
+    # Sisi tile yang merupakan sambungan (bukan tepi scene)
+    seam_left   = core.col_off > 0
+    seam_top    = core.row_off > 0
+    seam_right  = core.col_off + core.width < src.width
+    seam_bottom = core.row_off + core.height < src.height
+
+    if profiler is not None: profiler.count('px_clean', np.count_nonzero(core_mask))
+
+    n_drop = 0
+    if PREFILTER_COMPONENTS:
+        with profile_stage(profiler, 'prefilter'):
+            core_mask, n_drop = prefilter_components(
+                core_mask, src.transform, (seam_left, seam_top, seam_right, seam_bottom),
+                min_luas, max_luas)
+        if profiler is not None: profiler.count('rejected_prefilter', n_drop)
+
+    with profile_stage(profiler, 'vectorize'):
+        raw_polys = shapes_to_polygons(core_mask, core.col_off, core.row_off)
+
+        minx, miny, maxx, maxy = shapely.bounds(raw_polys).T
+        on_seam = np.zeros(len(raw_polys), dtype=bool)
+        if seam_left:   on_seam |= minx <= core.col_off
+        if seam_top:    on_seam |= miny <= core.row_off
+        if seam_right:  on_seam |= maxx >= core.col_off + core.width
+        if seam_bottom: on_seam |= maxy >= core.row_off + core.height
+
+    return raw_polys[~on_seam], raw_polys[on_seam], n_drop
+
+def compute_indices(green, red, nir):
+    """NDWI & NDVI float32 (untuk cache/QA), denominator 0 -> 0.001 seperti dulu."""
+    work_dtype = work_dtype_for(green)
+    g, r, n = (band.astype(work_dtype) for band in (green, red, nir))
+    denom_ndwi = g + n
+    denom_ndwi[denom_ndwi == 0] = 0.001
+    denom_ndvi = n + r
+    denom_ndvi[denom_ndvi == 0] = 0.001
+    return ((g - n) / denom_ndwi).astype(np.float32), ((n - r) / denom_ndvi).astype(np.float32)
+
+def compute_filter_masks(green, red, nir, current_max_nir):
+    """Masker per filter (uint8, 1 = lolos) untuk QA, semantik sama dengan compute_water_mask."""
+    work_dtype = work_dtype_for(green)
+    g, r, n = (band.astype(work_dtype) for band in (green, red, nir))
+    num, den = np.empty_like(g), np.empty_like(g)
+    thr = np.empty(g.shape, np.float64)
+    scratch, passed = np.empty(g.shape, bool), np.empty(g.shape, bool)
+
+    masks = {}
+    ratio_terms(g, n, num, den, scratch)
+    ratio_threshold(num, den, THRESH_NDWI, np.greater, thr, passed)
+    masks['mask_ndwi'] = passed.astype(np.uint8)
+    ratio_terms(n, r, num, den, scratch)
+    ratio_threshold(num, den, MAX_NDVI, np.less, thr, passed)
+    masks['mask_ndvi'] = passed.astype(np.uint8)
+    masks['mask_nir'] = (n < current_max_nir).astype(np.uint8)
+    return masks
+
+def _core_of(array, core, read_win):
+    dr = core.row_off - read_win.row_off
+    dc = core.col_off - read_win.col_off
+    return np.ascontiguousarray(array[dr:dr + core.height, dc:dc + core.width])
+
+def process_tile(src, core, read_win, current_max_nir, rasters=(), profile=False, hot_rows=None):
+    """Index -> Filter -> Cleaning -> Vektorisasi untuk 1 tile.
+
+    Return (batch, seam_pieces, count_total, raster_tiles, profiler). Poligon yang
+    menyentuh sambungan tile dikembalikan mentah (koordinat piksel scene) untuk dijahit.
+    raster_tiles berisi area inti raster antara yang diminta lewat `rasters`
+    (nama di QA_RASTERS). profiler = StageProfiler tile ini (None jika profile=False).
+    hot_rows = hasil tile_hot_rows (skrining kasar), None = semua baris dihitung.
+    """
+    profiler = StageProfiler() if profile else None
+    with profile_stage(profiler, 'read'):
+        green, red, nir = read_tile_bands(src, read_win)
+    # Index & filter 1 tahap: compute_water_mask menghitung NDWI/NDVI & threshold sekaligus per
+    # strip (perkalian silang, tanpa array index), jadi tidak ada titik batas untuk diukur terpisah
+    with profile_stage(profiler, 'index_filter'):
+        dr = core.row_off - read_win.row_off
+        dc = core.col_off - read_win.col_off
+        mask_uint8 = compute_water_mask(green, red, nir, current_max_nir, profiler,
+                                        (dr, dr + core.height, dc, dc + core.width), hot_rows)
+    with profile_stage(profiler, 'morphology'):
+        clean_mask = clean_water_mask(mask_uint8)
+
+    raster_tiles = {}
+    if 'clean_mask' in rasters:
+        raster_tiles['clean_mask'] = _core_of(clean_mask, core, read_win)
+    if 'water_mask' in rasters:
+        raster_tiles['water_mask'] = _core_of(mask_uint8, core, read_win)
+    if 'ndwi' in rasters or 'ndvi' in rasters:
+        with profile_stage(profiler, 'qa_indices'):
+            ndwi, ndvi = compute_indices(green, red, nir)
+        raster_tiles['ndwi'] = _core_of(ndwi, core, read_win)
+        raster_tiles['ndvi'] = _core_of(ndvi, core, read_win)
+    if any(name in rasters for name in ('mask_ndwi', 'mask_ndvi', 'mask_nir')):
+        with profile_stage(profiler, 'qa_masks'):
+            for name, filter_mask in compute_filter_masks(green, red, nir, current_max_nir).items():
+                raster_tiles[name] = _core_of(filter_mask, core, read_win)
+
+    inner, seam_pieces, n_drop = vectorize_tile(clean_mask, core, read_win, src, profiler=profiler)
+    # Komponen yang dibuang pre-filter tetap dihitung sebagai kandidat awal
+    batch = smooth_and_filter(inner, src.transform, profiler)
+    return batch, seam_pieces, len(inner) + n_drop, raster_tiles, profiler
+
+def process_cached_tile(src, core, clean_mask_path, profile=False):
+    """Seperti process_tile, tapi clean_mask dibaca dari cache (tanpa index & morfologi)."""
+    profiler = StageProfiler() if profile else None
+    with profile_stage(profiler, 'cache_read'):
+        with rasterio.open(clean_mask_path) as mask_src:
+            clean_mask = mask_src.read(1, window=core)
+    inner, seam_pieces, n_drop = vectorize_tile(clean_mask, core, core, src, profiler=profiler)
+    batch = smooth_and_filter(inner, src.transform, profiler)
+    return batch, seam_pieces, len(inner) + n_drop, {}, profiler
+
+def merge_seam_pieces(seam_pieces):
+    """Jahit potongan poligon yang terbelah sambungan tile menjadi 1 tambak utuh."""
+    if len(seam_pieces) == 0: return np.empty(0, dtype=object)
+
+    # Union-Find atas pasangan potongan yang bersentuhan
+    parent = list(range(len(seam_pieces)))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tree = STRtree(seam_pieces)
+    left, right = tree.query(seam_pieces, predicate='intersects')
+    for i, j in zip(left, right):
+        ri, rj = find(i), find(j)
+        if ri != rj: parent[max(ri, rj)] = min(ri, rj)
+
+    groups = {}
+    for i in range(len(seam_pieces)):
+        groups.setdefault(find(i), []).append(seam_pieces[i])
+
+    # Sentuhan di sudut saja (diagonal) tetap terpisah, sama seperti 4-connectivity
+    merged = [shapely.get_parts(shapely.union_all(groups[root])) for root in sorted(groups)]
+    return np.concatenate(merged)
+
+# --- OUTPUT WRITER (STREAMING) ---
+OUTPUT_COLUMNS = ['area_m2', 'LSI', 'RPOC']
+
+def _batch_to_arrow(batch, schema, extra_columns=()):
+    import pyarrow as pa
+    n = len(batch['geometry'])
+    arrays = [pa.array(batch[col], pa.float64()) for col in OUTPUT_COLUMNS]
+    arrays.append(pa.array(['Tambak'] * n, pa.string()))
+    arrays += [pa.array(np.asarray(batch[col], dtype=object), pa.string()) for col in extra_columns]
+    arrays.append(pa.array(shapely.to_wkb(batch['geometry']), pa.binary()))
+    return pa.record_batch(arrays, schema=schema)
+
+def _arrow_schema(extra_columns=()):
+    import pyarrow as pa
+    fields = [(col, pa.float64()) for col in OUTPUT_COLUMNS]
+    fields += [('Ket', pa.string())] + [(col, pa.string()) for col in extra_columns]
+    fields += [('geometry', pa.binary())]
+    return pa.schema(fields)
+
+class GeoParquetWriter:
+    """GeoParquet (WKB), 1 row group per batch. Atribut tetap float64 penuh."""
+
+    def __init__(self, path, crs, extra_columns=()):
+        import pyarrow.parquet as pq
+        from pyproj import CRS
+        self.path = path
+        self.extra_columns = tuple(extra_columns)
+        self.schema = _arrow_schema(self.extra_columns)
+        self.crs_json = CRS.from_user_input(crs.to_wkt()).to_json_dict() if crs else None
+        self.bounds = None
+        self.geometry_types = set()
+        self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, batch):
+        if len(batch['geometry']) == 0: return
+        self._writer.write_batch(_batch_to_arrow(batch, self.schema, self.extra_columns))
+        self.geometry_types.update(shapely.get_type_id(batch['geometry']).tolist())
+        b = shapely.total_bounds(batch['geometry'])
+        self.bounds = b if self.bounds is None else np.r_[np.minimum(self.bounds[:2], b[:2]),
+                                                          np.maximum(self.bounds[2:], b[2:])]
+
+    def close(self):
+        type_names = {3: 'Polygon', 6: 'MultiPolygon'}
+        column_meta = {
+            'encoding': 'WKB',
+            'geometry_types': sorted(type_names[t] for t in self.geometry_types),
+            'crs': self.crs_json,
+        }
+        if self.bounds is not None: column_meta['bbox'] = [float(v) for v in self.bounds]
+        geo = {'version': '1.0.0', 'primary_column': 'geometry', 'columns': {'geometry': column_meta}}
+        self._writer.add_key_value_metadata({'geo': json.dumps(geo)})
+        self._writer.close()
+
+class FlatGeobufWriter:
+    """FlatGeobuf lewat 1 stream Arrow ke GDAL (append GDAL menulis ulang seluruh file)."""
+
+    def __init__(self, path, crs, extra_columns=()):
+        import pyarrow as pa
+        import pyogrio
+        self.path = path
+        self.extra_columns = tuple(extra_columns)
+        self.schema = _arrow_schema(self.extra_columns)
+        self._queue = queue.Queue(maxsize=4)
+        self._error = None
+        self._stream_done = False
+
+        def batches():
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    self._stream_done = True
+                    return
+                yield item
+
+        def run():
+            try:
+                pyogrio.write_arrow(
+                    pa.RecordBatchReader.from_batches(self.schema, batches()), path,
+                    driver='FlatGeobuf', geometry_name='geometry', geometry_type='Polygon',
+                    crs=crs.to_wkt() if crs else None)
+            except Exception as e:
+                self._error = e
+                # Kosongkan antrian agar write()/close() tidak macet
+                while not self._stream_done and self._queue.get() is not None: pass
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def write(self, batch):
+        if self._error is not None: raise self._error
+        if len(batch['geometry']) == 0: return
+        self._queue.put(_batch_to_arrow(batch, self.schema, self.extra_columns))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None: raise self._error
+
+class ShapefileWriter:
+    """Shapefile (legacy): append per batch, LSI/RPOC dibulatkan 3 desimal seperti dulu."""
+
+    def __init__(self, path, crs, extra_columns=()):
+        self.path = path
+        self.crs = crs
+        self.extra_columns = tuple(extra_columns)
+        self._mode = 'w'
+
+    def _frame(self, batch):
+        return gpd.GeoDataFrame({
+            'area_m2': np.asarray(batch['area_m2'], dtype=float),
+            'LSI': np.round(np.asarray(batch['LSI'], dtype=float), 3),
+            'RPOC': np.round(np.asarray(batch['RPOC'], dtype=float), 3),
+            'Ket': np.full(len(batch['geometry']), 'Tambak', dtype=object),
+            **{col: np.asarray(batch[col], dtype=object) for col in self.extra_columns}
+        }, geometry=gpd.GeoSeries(batch['geometry'], crs=self.crs), crs=self.crs)
+
+    def write(self, batch):
+        if len(batch['geometry']) == 0: return
+        self._frame(batch).to_file(self.path, mode=self._mode)
+        self._mode = 'a'
+
+    def close(self):
+        # Tanpa tambak sama sekali -> tetap buat shapefile kosong (skema saja), sama seperti parquet/fgb
+        if self._mode == 'w':
+            empty = {col: np.empty(0, dtype=object) for col in ['geometry'] + list(self.extra_columns)}
+            empty.update({col: np.empty(0) for col in OUTPUT_COLUMNS})
+            self._frame(empty).to_file(self.path, engine='pyogrio', geometry_type='Polygon')
+            self._mode = 'a'
+
+OUTPUT_WRITERS = {
+    'parquet': ('.parquet', GeoParquetWriter),
+    'fgb': ('.fgb', FlatGeobufWriter),
+    'shp': ('.shp', ShapefileWriter),
+}
+
+def output_path_for(directory, name, output_format=OUTPUT_FORMAT):
+    extension, _ = OUTPUT_WRITERS[output_format]
+    return os.path.join(directory, name + extension)
+
+def open_writer(path, crs, output_format=OUTPUT_FORMAT, extra_columns=()):
+    """Writer streaming. extra_columns = kolom teks tambahan yang ada di setiap batch."""
+    _, writer_cls = OUTPUT_WRITERS[output_format]
+    return writer_cls(path, crs, extra_columns)
+
+def read_output(path):
+    """Baca kembali hasil deteksi (format apa pun dari OUTPUT_WRITERS)."""
+    if path.endswith('.parquet'): return gpd.read_parquet(path)
+    return gpd.read_file(path)
+
+# --- CACHE DISK ---
+def file_fingerprint(path, sample_bytes=1 << 20):
+    """Identitas isi file: ukuran + mtime + hash sampel awal/tengah/akhir (tanpa baca seluruh file)."""
+    st = os.stat(path)
+    h = hashlib.sha256(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    with open(path, 'rb') as f:
+        for offset in (0, max(0, st.st_size // 2 - sample_bytes // 2), max(0, st.st_size - sample_bytes)):
+            f.seek(offset)
+            h.update(f.read(sample_bytes))
+    return h.hexdigest()
+
+class RasterCache:
+    """Cache disk content-addressed: 1 folder per key (GeoTIFF tiled + meta.json), eviction LRU."""
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(**parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:32]
+
+    def get(self, key):
+        """Return (folder, meta) atau None. Akses memperbarui waktu LRU."""
+        path = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path): return None
+        os.utime(meta_path)
+        with open(meta_path) as f:
+            return path, json.load(f)
+
+    def begin(self, key):
+        """Folder sementara; baru terlihat sebagai entri setelah commit()."""
+        tmp_path = os.path.join(self.cache_dir, f".{key}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        return tmp_path
+
+    def commit(self, key, tmp_path, meta):
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+        path = os.path.join(self.cache_dir, key)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Entri sama sudah dibuat proses lain
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=key)
+        return path
+
+    def abort(self, tmp_path):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def evict(self, keep=None, stale_seconds=24 * 3600):
+        """Hapus entri paling lama tidak dipakai sampai total ukuran <= max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.'):
+                # Sisa run yang mati di tengah jalan
+                if time.time() - os.path.getmtime(path) > stale_seconds:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            meta_path = os.path.join(path, 'meta.json')
+            if not os.path.exists(meta_path): continue
+            size = sum(os.path.getsize(os.path.join(root, f))
+                       for root, _, files in os.walk(path) for f in files)
+            entries.append((os.path.getmtime(meta_path), name, size))
+
+        total = sum(size for _, _, size in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes: break
+            if name == keep: continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
+
+def open_tiled_raster(path, src, dtype):
+    """GeoTIFF tiled + deflate seukuran scene, diisi per window."""
+    predictor = 3 if np.dtype(dtype).kind == 'f' else 2
+    return rasterio.open(
+        path, 'w', driver='GTiff', width=src.width, height=src.height, count=1,
+        dtype=dtype, crs=src.crs, transform=src.transform,
+        tiled=True, blockxsize=256, blockysize=256, compress='deflate', predictor=predictor)
+
+# --- RASTER QA (COG) ---
+# Raster QA float32 (index); lainnya uint8 (masker 0/1)
+QA_DTYPES = {'ndwi': np.float32, 'ndvi': np.float32}
+
+def qa_path_for(output_path, name):
+    return os.path.splitext(output_path)[0] + f'_{name}.tif'
+
+def write_cog(src_path, path, resampling='nearest'):
+    """GeoTIFF -> Cloud-Optimized GeoTIFF (tiled 512, deflate, overview internal).
+
+    Driver COG GDAL membaca sumber per blok, raster 1 m tidak dimuat utuh ke RAM.
+    """
+    rasterio.shutil.copy(src_path, path, driver='COG', compress='DEFLATE', predictor='YES',
+                         blocksize=512, overview_resampling=resampling, num_threads='ALL_CPUS',
+                         bigtiff='IF_SAFER')
+    return path
+
+def open_qa_rasters(output_path, src, names):
+    """GeoTIFF tiled sementara per raster QA (diisi per window, dikonversi ke COG di akhir)."""
+    return {name: open_tiled_raster(os.path.splitext(qa_path_for(output_path, name))[0] + '.tmp.tif',
+                                    src, QA_DTYPES.get(name, np.uint8))
+            for name in names}
+
+def finalize_qa_rasters(qa_files, output_path):
+    """Tutup file sementara -> COG + overview (index: average, masker: nearest)."""
+    paths = []
+    for name, raster_file in qa_files.items():
+        raster_file.close()
+        resampling = 'average' if name in QA_DTYPES else 'nearest'
+        paths.append(write_cog(raster_file.name, qa_path_for(output_path, name), resampling))
+        os.remove(raster_file.name)
+    return paths
+
+def discard_qa_rasters(qa_files):
+    for raster_file in qa_files.values():
+        raster_file.close()
+        if os.path.exists(raster_file.name): os.remove(raster_file.name)
+
+# --- WORKER PARALEL ---
+_worker_src = None
+
+def _init_worker(input_path, config):
+    """Dijalankan sekali per proses: buka raster & salin konfigurasi."""
+    global _worker_src
+    globals().update(config)
+    _worker_src = rasterio.open(input_path)
+
+def _run_tile_task(task):
+    tile_fn, args = task
+    return tile_fn(_worker_src, *args)
+
+def iter_tile_results(input_path, src, tasks, n_workers=N_WORKERS, tile_fn=None):
+    """Jalankan tile_fn(src, *args) untuk tiap task (serial / process pool).
+
+    Default tile_fn = process_tile dengan task (core, read_win, current_max_nir).
+    Hasil selalu urut sesuai task.
+    """
+    if tile_fn is None: tile_fn = process_tile
+    if n_workers is None: n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(tasks))
+
+    if n_workers <= 1:
+        for args in tasks:
+            yield tile_fn(src, *args)
+        return
+
+    config = {name: globals()[name] for name in WORKER_CONFIG_NAMES}
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(input_path, config)) as pool:
+        yield from pool.map(_run_tile_task, [(tile_fn, args) for args in tasks])
+
+def load_envelope(input_path, src, cache, scene_key, n_workers=N_WORKERS):
+    """Ringkasan kasar dari cache (per scene & COARSE_FACTOR), atau dihitung lalu disimpan."""
+    key = None
+    if cache is not None:
+        key = cache.make_key(kind='envelope', scene=scene_key, factor=COARSE_FACTOR)
+        hit = cache.get(key)
+        if hit: return np.load(os.path.join(hit[0], 'envelope.npy'))
+    envelope = compute_envelope(input_path, src, COARSE_FACTOR, n_workers)
+    if cache is not None:
+        tmp_path = cache.begin(key)
+        np.save(os.path.join(tmp_path, 'envelope.npy'), envelope)
+        cache.commit(key, tmp_path, {'kind': 'envelope', 'input': os.path.abspath(input_path),
+                                     'factor': COARSE_FACTOR})
+    return envelope
+
+def write_profile_report(path, profiler, info):
+    """Laporan JSON: info run + tahap (jumlah semua tile/worker) + counter."""
+    report = dict(info)
+    report['stages'] = {name: {key: (round(value, 4) if isinstance(value, float) else value)
+                               for key, value in record.items()}
+                        for name, record in profiler.stages.items()}
+    report['counters'] = dict(sorted(profiler.counters.items()))
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    return path
+
+def run_detection(input_path, output_path, output_format=OUTPUT_FORMAT):
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    profiler = StageProfiler() if PROFILE_REPORT else None
+    cache = RasterCache(CACHE_DIR) if CACHE_DIR else None
+
+    with rasterio.open(input_path) as src:
         transform = src.transform
         crs = src.crs
-        
-        green = src.read(BAND_GREEN_IDX).astype(float)
-        red   = src.read(BAND_RED_IDX).astype(float)
-        nir   = src.read(BAND_NIR_IDX).astype(float)
-        
+
+        # --- CEK CACHE ---
+        scene_hit = mask_hit = None
+        if cache is not None:
+            scene_key = cache.make_key(kind='scene', version=CACHE_VERSION,
+                                       file=file_fingerprint(input_path),
+                                       bands=[BAND_GREEN_IDX, BAND_RED_IDX, BAND_NIR_IDX])
+            scene_hit = cache.get(scene_key)
+
         # Cek Tipe Data
-        max_val_img = np.max(nir)
-        if max_val_img <= 1.0:
+        if scene_hit:
+            reflectance = scene_hit[1]['reflectance']
+        else:
+            with profile_stage(profiler, 'reflectance_check'):
+                reflectance = is_reflectance(src)
+        if reflectance:
             # Float 0-1
             current_max_nir = 0.35
             print("Mode: Reflectance (0-1)")
@@ -86,77 +1083,180 @@ try:
             current_max_nir = MAX_NIR_VALUE
             print(f"Mode: Digital Number (Max NIR Filter: {current_max_nir})")
 
-        # --- INDEXING ---
-        print("2. Menghitung Index...")
-        denom_ndwi = green + nir
-        denom_ndwi[denom_ndwi == 0] = 0.001 
-        ndwi = (green - nir) / denom_ndwi
-        
-        denom_ndvi = nir + red
-        denom_ndvi[denom_ndvi == 0] = 0.001
-        ndvi = (nir - red) / denom_ndvi
-        
-        # --- FILTERING ---
-        print(f"3. Applying Loose Filters (NDWI>{THRESH_NDWI}, NDVI<{MAX_NDVI})...")
-        
-        mask_air = (ndwi > THRESH_NDWI)
-        mask_non_veg = (ndvi < MAX_NDVI)
-        mask_non_bright = (nir < current_max_nir)
-        
-        final_mask_bool = mask_air & mask_non_veg & mask_non_bright
-        mask_uint8 = final_mask_bool.astype(np.uint8)
-
-        # --- CLEANING ---
-        print("4. Cleaning Noise...")
-        kernel = np.ones((3,3), np.uint8)
-        clean_mask = cv2.morphologyEx(mask_uint8, cv2.MORPH_OPEN, kernel)
-        clean_mask = cv2.morphologyEx(clean_mask, cv2.MORPH_CLOSE, kernel)
-
-        # --- VEKTORISASI & SMOOTHING ---
-        print("5. Vektorisasi & Smoothing...")
-        shapes = rasterio.features.shapes(clean_mask, transform=transform)
-        
-        polygons = []
+        # Raster QA selain clean_mask butuh band & semua piksel (tanpa cache mask / skrining)
+        qa_full = bool(set(QA_RASTERS) - {'clean_mask'})
+        if cache is not None:
+            mask_key = cache.make_key(kind='clean_mask', scene=scene_key, thresh_ndwi=THRESH_NDWI,
+                                      max_ndvi=MAX_NDVI, max_nir=current_max_nir)
+            if not qa_full: mask_hit = cache.get(mask_key)
+
+        windows = list(iter_tile_windows(src.width, src.height, TILE_SIZE, TILE_HALO,
+                                         src.block_shapes[0]))
+        n_workers = N_WORKERS if N_WORKERS is not None else (os.cpu_count() or 1)
+
+        # --- SKRINING KASAR: hanya area sel panas (+ margin) yang diproses 1 m ---
+        hot_cells = None
+        run_windows = windows
+        tile_rows = [None] * len(windows)
+        px_screened = 0
+        if COARSE_SCREEN and not mask_hit and not qa_full:
+            with profile_stage(profiler, 'coarse_screen'):
+                envelope = load_envelope(input_path, src, cache, scene_key if cache is not None else None, n_workers)
+                hot_cells = screen_cells(envelope, current_max_nir)
+                run_windows = []
+                for core, _ in windows:
+                    sub_core = screen_tile(hot_cells, core)
+                    px_screened += core.width * core.height
+                    if sub_core is None: continue
+                    px_screened -= sub_core.width * sub_core.height
+                    r0, c0 = max(0, sub_core.row_off - TILE_HALO), max(0, sub_core.col_off - TILE_HALO)
+                    r1 = min(src.height, sub_core.row_off + sub_core.height + TILE_HALO)
+                    c1 = min(src.width, sub_core.col_off + sub_core.width + TILE_HALO)
+                    run_windows.append((sub_core, Window(c0, r0, c1 - c0, r1 - r0)))
+                tile_rows = [tile_hot_rows(hot_cells, read_win) for _, read_win in run_windows]
+            print(f"   Skrining kasar {COARSE_FACTOR}x{COARSE_FACTOR} px: {hot_cells.mean():.1%} sel panas, "
+                  f"{px_screened / (src.width * src.height):.1%} area dilewati, "
+                  f"{len(windows) - len(run_windows)} dari {len(windows)} tile kosong")
+
+        # Raster antara yang perlu disimpan ke cache (hanya saat cache miss)
+        cache_rasters = {}
+        if mask_hit:
+            print(f"2. Cache clean_mask ditemukan -> langsung Vektorisasi "
+                  f"({len(windows)} tile, {min(n_workers, len(windows))} worker)...")
+            mask_path = os.path.join(mask_hit[0], 'clean_mask.tif')
+            tasks = [(core, mask_path, PROFILE_REPORT) for core, _ in windows]
+            tile_fn = process_cached_tile
+        else:
+            print(f"2. Index, Filter (NDWI>{THRESH_NDWI}, NDVI<{MAX_NDVI}) & Cleaning "
+                  f"per tile ({len(windows)} tile, {min(n_workers, len(windows))} worker)...")
+            if cache is not None:
+                cache_rasters['clean_mask'] = (mask_key, np.uint8)
+            rasters = tuple(dict.fromkeys(list(cache_rasters) + list(QA_RASTERS)))
+            tasks = [(core, read_win, current_max_nir, rasters, PROFILE_REPORT, rows)
+                     for (core, read_win), rows in zip(run_windows, tile_rows)]
+            tile_fn = process_tile
+
+        tmp_dirs = {}
+        raster_files = {}
+        for name, (key, dtype) in cache_rasters.items():
+            if key not in tmp_dirs: tmp_dirs[key] = cache.begin(key)
+            raster_files[name] = open_tiled_raster(os.path.join(tmp_dirs[key], name + '.tif'), src, dtype)
+        qa_files = open_qa_rasters(output_path, src, QA_RASTERS) if not mask_hit else {}
+
+        # Area yang dilewati skrining: clean_mask pasti 0 (blok GeoTIFF yang tidak ditulis = 0)
+        if profiler is not None and hot_cells is not None:
+            profiler.count('px_total', px_screened)
+            profiler.count('px_screened', px_screened)
+            profiler.count('tiles_screened', len(windows) - len(run_windows))
+
+        seam_pieces = []
         count_total = 0
         count_lolos = 0
-        
-        for geom, value in shapes:
-            if value == 1: 
-                raw_poly = shape(geom)
-                
-                # Buffer Smoothing Tetap Dipakai (Wajib untuk LSI)
-                # +2m lalu -2m
-                buffered_poly = raw_poly.buffer(2.0, join_style=1) 
-                final_poly = buffered_poly.buffer(-2.0, join_style=1).simplify(0.5)
-                
-                area = final_poly.area
-                count_total += 1
-                
-                if MIN_LUAS <= area <= MAX_LUAS:
-                    lsi_val = calculate_lsi(final_poly)
-                    rpoc_val = calculate_rpoc(final_poly)
-                    
-                    # Filter Geometri (LONGGAR)
-                    if lsi_val <= MAX_LSI and rpoc_val <= MAX_RPOC:
-                        polygons.append({
-                            'geometry': final_poly,
-                            'area_m2': area,
-                            'LSI': round(lsi_val, 3),
-                            'RPOC': round(rpoc_val, 3),
-                            'Ket': 'Tambak'
-                        })
-                        count_lolos += 1
+
+        # Hasil tiap tile langsung ditulis ke file (RAM tidak tumbuh dengan jumlah tambak)
+        writer = open_writer(output_path, crs, output_format)
+        try:
+            for (core, _), (tile_batch, tile_seams, tile_count, raster_tiles, tile_profile) in zip(
+                    run_windows, iter_tile_results(input_path, src, tasks, n_workers, tile_fn)):
+                with profile_stage(profiler, 'write'):
+                    writer.write(tile_batch)
+                count_lolos += len(tile_batch['geometry'])
+                seam_pieces.append(tile_seams)
+                count_total += tile_count
+                if profiler is not None: profiler.merge(tile_profile)
+                if raster_tiles:
+                    with profile_stage(profiler, 'cache_write'):
+                        for name, tile in raster_tiles.items():
+                            if name in raster_files: raster_files[name].write(tile, 1, window=core)
+                    with profile_stage(profiler, 'qa_write'):
+                        for name, tile in raster_tiles.items():
+                            if name in qa_files: qa_files[name].write(tile, 1, window=core)
+
+            # --- JAHIT POLIGON ANTAR TILE ---
+            seam_pieces = np.concatenate(seam_pieces) if seam_pieces else np.empty(0, dtype=object)
+            print(f"5. Menjahit {len(seam_pieces)} potongan di sambungan tile...")
+            with profile_stage(profiler, 'seam_merge'):
+                merged = merge_seam_pieces(seam_pieces)
+            count_total += len(merged)
+            merged_batch = smooth_and_filter(merged, transform, profiler)
+            with profile_stage(profiler, 'write'):
+                writer.write(merged_batch)
+            count_lolos += len(merged_batch['geometry'])
+        except BaseException:
+            for raster_file in raster_files.values(): raster_file.close()
+            for tmp_path in tmp_dirs.values(): cache.abort(tmp_path)
+            discard_qa_rasters(qa_files)
+            raise
+        finally:
+            with profile_stage(profiler, 'write'):
+                writer.close()
+
+        # --- SIMPAN CACHE ---
+        if raster_files:
+            with profile_stage(profiler, 'cache_write'):
+                for raster_file in raster_files.values(): raster_file.close()
+        for key, tmp_path in tmp_dirs.items():
+            cache.commit(key, tmp_path, {'kind': 'clean_mask', 'input': os.path.abspath(input_path),
+                                         'THRESH_NDWI': THRESH_NDWI, 'MAX_NDVI': MAX_NDVI,
+                                         'max_nir': current_max_nir})
+        if cache is not None and not scene_hit:
+            # Tetap simpan info mode (reflectance/DN) agar scan NIR tidak diulang
+            cache.commit(scene_key, cache.begin(scene_key),
+                         {'kind': 'scene', 'input': os.path.abspath(input_path),
+                          'reflectance': bool(reflectance)})
+
+        # --- RASTER QA (COG + OVERVIEW) ---
+        if QA_RASTERS:
+            with profile_stage(profiler, 'qa_cog'):
+                if mask_hit:
+                    qa_paths = [write_cog(mask_path, qa_path_for(output_path, 'clean_mask'))]
+                else:
+                    qa_paths = finalize_qa_rasters(qa_files, output_path)
+            print(f"   Raster QA (COG): {', '.join(os.path.basename(path) for path in qa_paths)}")
 
     # --- SIMPAN ---
     print(f"   Total Kandidat Awal: {count_total}")
     print(f"   Lolos Final: {count_lolos}")
 
-    if len(polygons) > 0:
-        gdf = gpd.GeoDataFrame(polygons, crs=crs)
-        gdf.to_file(output_path)
+    if profiler is not None:
+        profiler.count('count_total', count_total)
+        profiler.count('count_lolos', count_lolos)
+        profiler.count('seam_pieces', len(seam_pieces))
+        profiler.count('seam_merged', len(merged))
+        report_path = write_profile_report(profile_path_for(output_path), profiler, {
+            'input': os.path.abspath(input_path),
+            'output': os.path.abspath(output_path),
+            'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'wall_s': round(time.perf_counter() - start_wall, 4),
+            'cpu_s_main': round(time.process_time() - start_cpu, 4),
+            'peak_rss_mb_main': peak_rss_mb(),
+            'peak_rss_mb_workers': peak_rss_mb(children=True) if min(n_workers, len(windows)) > 1 else None,
+            'n_tiles': len(windows),
+            'n_workers': min(n_workers, len(windows)),
+            'mode': 'reflectance' if reflectance else 'dn',
+            'cache': 'off' if cache is None else ('hit' if mask_hit else 'miss'),
+            'config': {name: globals()[name] for name in WORKER_CONFIG_NAMES + ['TILE_SIZE', 'TILE_HALO',
+                                                                                 'COARSE_SCREEN', 'COARSE_FACTOR',
+                                                                                 'QA_RASTERS']},
+        })
+        print(f"   Laporan profiling: {report_path}")
+
+    if count_lolos > 0:
         print(f"\n[SUKSES] File V3 tersimpan di: {output_path}")
     else:
         print("\n[INFO] Tidak ada objek yang lolos filter.")
+    return count_total, count_lolos
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    output_path = output_path_for(output_dir, output_name, OUTPUT_FORMAT)
+
+    print(f"--- MULAI DETEKSI V3 (Target: RECALL NAIK) ---")
 
-except Exception as e:
-    print(f"\n[ERROR] Terjadi kesalahan: {e}")
\ No newline at end of file
+    try:
+        run_detection(input_tif, output_path)
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
@@ -0,0 +1,200 @@
+import importlib
+import itertools
+import csv
+import os
+import time
+import numpy as np
+import rasterio
+
+# Fungsi deteksi dipakai ulang dari script 03 (nama file diawali angka -> importlib)
+det = importlib.import_module("03_Local_S2DR3_HighRes_Detection")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+input_tif = det.input_tif
+output_dir = r"path/to/your/folder/sweep" # Ganti dengan lokasi file Anda
+output_name = "S2DR3_Tambak"
+OUTPUT_FORMAT = det.OUTPUT_FORMAT
+summary_csv_name = "sweep_summary.csv"
+# Poligon tambak referensi -> precision/recall/F1 per konfigurasi (script 13). None = tanpa evaluasi.
+reference_path = None
+
+# ==========================================
+# 2. GRID PARAMETER
+# ==========================================
+# Semua kombinasi (product) dijalankan. Scene hanya dibaca 1x dan NDWI/NDVI
+# dihitung 1x per tile; filter geometri hanya diterapkan ulang ke metrik yang sudah ada.
+SWEEP_GRID = {
+    'THRESH_NDWI':   [-0.10, 0.0],
+    'MAX_NDVI':      [0.25, 0.35],
+    'MAX_NIR_VALUE': [3500],
+    'MIN_LUAS':      [300],
+    'MAX_LUAS':      [150000],
+    'MAX_LSI':       [2.0, 2.5],
+    'MAX_RPOC':      [1.6, 1.8],
+}
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def expand_grid(grid):
+    """Dict list nilai -> list konfigurasi (dict)."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def spectral_key(config, reflectance):
+    """Kunci kombinasi spektral. Reflectance selalu pakai batas NIR 0.35 (sama dengan script 03)."""
+    max_nir = 0.35 if reflectance else config['MAX_NIR_VALUE']
+    return (config['THRESH_NDWI'], config['MAX_NDVI'], max_nir)
+
+def group_configs(configs, reflectance):
+    """Kelompokkan konfigurasi dengan masker sama. Pre-filter luas pakai jendela paling longgar."""
+    groups = {}
+    for idx, config in enumerate(configs):
+        groups.setdefault(spectral_key(config, reflectance), []).append(idx)
+
+    specs = []
+    for key, members in groups.items():
+        min_luas = min(configs[i]['MIN_LUAS'] for i in members)
+        max_luas = max(configs[i]['MAX_LUAS'] for i in members)
+        specs.append((key, min_luas, max_luas, members))
+    return specs
+
+def geometry_keep(batch, config):
+    return ((batch['area_m2'] >= config['MIN_LUAS']) & (batch['area_m2'] <= config['MAX_LUAS']) &
+            (batch['LSI'] <= config['MAX_LSI']) & (batch['RPOC'] <= config['MAX_RPOC']))
+
+def sweep_tile(src, core, read_win, group_specs):
+    """1 tile: baca band & hitung suku NDWI/NDVI sekali, lalu masker -> vektor -> metrik per grup."""
+    green, red, nir = det.read_tile_bands(src, read_win)
+    work_dtype = det.work_dtype_for(green)
+    g, r, n = (band.astype(work_dtype) for band in (green, red, nir))
+
+    scratch = np.empty(g.shape, bool)
+    num_ndwi, den_ndwi = np.empty_like(g), np.empty_like(g)
+    det.ratio_terms(g, n, num_ndwi, den_ndwi, scratch)
+    num_ndvi, den_ndvi = np.empty_like(g), np.empty_like(g)
+    det.ratio_terms(n, r, num_ndvi, den_ndvi, scratch)
+    thr = np.empty(g.shape, np.float64)
+
+    # Masker per nilai threshold di-cache (dipakai bersama antar kombinasi)
+    cache = {}
+    def cached(name, value, compute):
+        if (name, value) not in cache:
+            out = np.empty(g.shape, bool)
+            compute(value, out)
+            cache[(name, value)] = out
+        return cache[(name, value)]
+
+    results = []
+    for (thresh_ndwi, max_ndvi, max_nir), min_luas, max_luas, _ in group_specs:
+        mask_air = cached('ndwi', thresh_ndwi, lambda v, out: det.ratio_threshold(
+            num_ndwi, den_ndwi, v, np.greater, thr, out))
+        mask_non_veg = cached('ndvi', max_ndvi, lambda v, out: det.ratio_threshold(
+            num_ndvi, den_ndvi, v, np.less, thr, out))
+        mask_non_bright = cached('nir', max_nir, lambda v, out: np.less(n, v, out=out))
+
+        mask_uint8 = (mask_air & mask_non_veg & mask_non_bright).astype(np.uint8)
+        clean_mask = det.clean_water_mask(mask_uint8)
+        inner, seam_pieces, n_drop = det.vectorize_tile(
+            clean_mask, core, read_win, src, min_luas, max_luas)
+
+        if len(inner) > 0:
+            batch = det.polygon_metrics(det.smooth_polygons(inner, src.transform), min_luas, max_luas)
+        else:
+            batch = det.empty_batch()
+        results.append((batch, seam_pieces, len(inner) + n_drop))
+    return results
+
+def run_sweep(input_path, out_dir, grid=SWEEP_GRID, output_format=OUTPUT_FORMAT, ref_path=None):
+    configs = expand_grid(grid)
+    start = time.time()
+
+    with rasterio.open(input_path) as src:
+        reflectance = det.is_reflectance(src)
+        print("Mode: Reflectance (0-1)" if reflectance else "Mode: Digital Number")
+
+        group_specs = group_configs(configs, reflectance)
+        print(f"1. {len(configs)} konfigurasi -> {len(group_specs)} kombinasi spektral (masker)")
+
+        windows = list(det.iter_tile_windows(src.width, src.height, det.TILE_SIZE, det.TILE_HALO,
+                                             src.block_shapes[0]))
+        specs_for_tile = [(key, min_luas, max_luas, None) for key, min_luas, max_luas, _ in group_specs]
+        tasks = [(core, read_win, specs_for_tile) for core, read_win in windows]
+
+        paths = [det.output_path_for(out_dir, f"{output_name}_cfg{i:03d}", output_format)
+                 for i in range(len(configs))]
+        writers = [det.open_writer(path, src.crs, output_format) for path in paths]
+        count_total = [0] * len(group_specs)
+        count_lolos = [0] * len(configs)
+        seam_pieces = [[] for _ in group_specs]
+
+        def write_group(gi, batch):
+            for ci in group_specs[gi][3]:
+                kept = det.filter_batch(batch, geometry_keep(batch, configs[ci]))
+                writers[ci].write(kept)
+                count_lolos[ci] += len(kept['geometry'])
+
+        try:
+            print(f"2. Index & Vektorisasi per tile ({len(windows)} tile)...")
+            for tile_results in det.iter_tile_results(input_path, src, tasks, det.N_WORKERS,
+                                                      tile_fn=sweep_tile):
+                for gi, (batch, tile_seams, tile_count) in enumerate(tile_results):
+                    count_total[gi] += tile_count
+                    seam_pieces[gi].append(tile_seams)
+                    write_group(gi, batch)
+
+            print("3. Menjahit sambungan tile per kombinasi spektral...")
+            for gi, (_, min_luas, max_luas, _) in enumerate(group_specs):
+                merged = det.merge_seam_pieces(np.concatenate(seam_pieces[gi]))
+                count_total[gi] += len(merged)
+                if len(merged) == 0: continue
+                batch = det.polygon_metrics(det.smooth_polygons(merged, src.transform),
+                                            min_luas, max_luas)
+                write_group(gi, batch)
+        finally:
+            for writer in writers: writer.close()
+
+    # --- EVALUASI AKURASI (OPSIONAL) ---
+    accuracy_columns = ['precision', 'recall', 'f1', 'mean_iou', 'area_mae_pct']
+    accuracy = [{} for _ in configs]
+    if ref_path:
+        # Script 13 (geopandas) hanya di-import jika ada referensi
+        ev = importlib.import_module("13_Local_Accuracy_Eval")
+        print(f"4. Evaluasi terhadap referensi (IoU >= {ev.MIN_IOU})...")
+        reference = ev.nb.read_candidates(ref_path)
+        for ci in range(len(configs)):
+            metrics, _, _ = ev.evaluate(det.read_output(paths[ci]), reference)
+            accuracy[ci] = {name: (round(metrics[name], 4) if metrics[name] is not None else None)
+                            for name in accuracy_columns}
+
+    # --- RINGKASAN (1 baris per konfigurasi) ---
+    group_of = {ci: gi for gi, spec in enumerate(group_specs) for ci in spec[3]}
+    summary_path = os.path.join(out_dir, summary_csv_name)
+    with open(summary_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['config'] + list(grid) + ['count_total', 'count_lolos'] +
+                        (accuracy_columns if ref_path else []) + ['output'])
+        for ci, config in enumerate(configs):
+            writer.writerow([f"cfg{ci:03d}"] + [config[name] for name in grid] +
+                            [count_total[group_of[ci]], count_lolos[ci]] +
+                            [accuracy[ci][name] for name in accuracy_columns if ref_path] +
+                            [os.path.basename(paths[ci])])
+            score = f" | F1: {accuracy[ci]['f1']}" if ref_path else ""
+            print(f"   cfg{ci:03d} {config} -> Lolos: {count_lolos[ci]}{score}")
+
+    print(f"\n[SUKSES] Sweep selesai ({time.time() - start:.1f} s). Ringkasan: {summary_path}")
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    print(f"--- MULAI SWEEP THRESHOLD ---")
+
+    try:
+        run_sweep(input_tif, output_dir, ref_path=reference_path)
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
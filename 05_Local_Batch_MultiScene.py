@@ -0,0 +1,227 @@
+import importlib
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import rasterio
+
+# Fungsi deteksi dipakai ulang dari script 03 (nama file diawali angka -> importlib)
+det = importlib.import_module("03_Local_S2DR3_HighRes_Detection")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Folder delivery S2DR3 (dicari rekursif), mis. "T49LHL-55846db01-20251212T080403Z-3-001"
+scene_dir = r"path/to/your/s2dr3/folder" # Ganti dengan lokasi file Anda
+SCENE_PATTERN = "S2L2Ax10_*_MS.tif"
+output_dir = r"path/to/your/folder/batch" # Ganti dengan lokasi file Anda
+OUTPUT_FORMAT = det.OUTPUT_FORMAT
+manifest_name = "batch_manifest.json"
+catalogue_name = "S2DR3_Tambak_Katalog"
+
+# ==========================================
+# 2. KONFIGURASI PENJADWALAN
+# ==========================================
+# Jumlah scene yang diproses bersamaan (maksimal)
+MAX_SCENE_WORKERS = 4
+# Worker tile per scene (N_WORKERS di script 03). Total proses ~ MAX_SCENE_WORKERS x ini.
+SCENE_TILE_WORKERS = 1
+# Batas RAM untuk semua scene yang sedang berjalan. Scene baru hanya dimulai jika
+# perkiraan RAM-nya masih muat (minimal 1 scene selalu jalan).
+MEMORY_BUDGET_BYTES = 8 * 1024 ** 3
+# Perkiraan byte per piksel tile di luar band mentah (mask, clean_mask, label, buffer, dst.)
+EST_OVERHEAD_BYTES_PER_PIXEL = 24
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def discover_scenes(root, pattern=SCENE_PATTERN):
+    """Semua scene S2DR3 di bawah root (urut nama -> urut tanggal)."""
+    return sorted(glob.glob(os.path.join(root, '**', pattern), recursive=True))
+
+def scene_id(path, root=None):
+    """Kunci scene di manifest & nama file hasil: nama tile + hash folder relatif terhadap root.
+
+    Tile bernama sama dari folder delivery berbeda tidak saling menimpa.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    folder = os.path.dirname(os.path.relpath(path, root) if root else os.path.abspath(path))
+    digest = hashlib.sha1(folder.replace(os.sep, '/').encode()).hexdigest()[:8]
+    return f"{stem}_{digest}"
+
+def scene_date(path):
+    """Tanggal akuisisi dari nama tile, mis. ...-20240718_MS.tif -> 20240718."""
+    match = re.search(r'(\d{8})(?=_MS)', os.path.basename(path)) or re.search(r'(\d{8})', os.path.basename(path))
+    return match.group(1) if match else ''
+
+def estimate_scene_bytes(path):
+    """Perkiraan puncak RAM 1 scene dari header raster (tanpa membaca piksel)."""
+    with rasterio.open(path) as src:
+        itemsize = np.dtype(src.dtypes[0]).itemsize
+        if det.TILE_SIZE is None:
+            tile_pixels = src.width * src.height
+        else:
+            side = det.TILE_SIZE + 2 * det.TILE_HALO
+            tile_pixels = min(src.width, side) * min(src.height, side)
+    per_pixel = 3 * itemsize + EST_OVERHEAD_BYTES_PER_PIXEL
+    return tile_pixels * per_pixel * max(1, SCENE_TILE_WORKERS)
+
+def load_manifest(path):
+    if not os.path.exists(path): return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    """Tulis atomik (file sementara lalu rename) agar manifest tidak rusak saat proses mati."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def is_finished(entry):
+    if not entry or entry.get('status') != 'done': return False
+    return entry.get('count_lolos', 0) == 0 or os.path.exists(entry['output'])
+
+def run_scene(scene_path, output_path, log_path, config):
+    """Dijalankan di proses worker: deteksi 1 scene, log print ke file per scene."""
+    for name, value in config.items(): setattr(det, name, value)
+    start = time.time()
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log):
+        count_total, count_lolos = det.run_detection(scene_path, output_path, config['OUTPUT_FORMAT'])
+    return count_total, count_lolos, time.time() - start
+
+def build_catalogue(manifest, out_dir, output_format=OUTPUT_FORMAT):
+    """Gabungkan hasil semua scene 'done' ke 1 katalog (kolom tambahan: scene, date)."""
+    done = [(sid, entry) for sid, entry in sorted(manifest.items())
+            if entry.get('status') == 'done' and entry.get('count_lolos', 0) > 0]
+    if not done: return None, 0
+
+    path = det.output_path_for(out_dir, catalogue_name, output_format)
+    writer = None
+    total = 0
+    try:
+        for sid, entry in done:
+            gdf = det.read_output(entry['output'])
+            if writer is None:
+                crs = rasterio.crs.CRS.from_wkt(gdf.crs.to_wkt())
+                writer = det.open_writer(path, crs, output_format, extra_columns=('scene', 'date'))
+                catalogue_crs = gdf.crs
+            elif gdf.crs != catalogue_crs:
+                gdf = gdf.to_crs(catalogue_crs)
+            n = len(gdf)
+            writer.write({
+                'geometry': np.asarray(gdf.geometry.values),
+                'area_m2': gdf['area_m2'].to_numpy(float),
+                'LSI': gdf['LSI'].to_numpy(float),
+                'RPOC': gdf['RPOC'].to_numpy(float),
+                'scene': [sid] * n,
+                'date': [entry.get('date', '')] * n,
+            })
+            total += n
+    finally:
+        if writer is not None: writer.close()
+    return path, total
+
+def run_batch(root, out_dir, output_format=OUTPUT_FORMAT):
+    scene_out_dir = os.path.join(out_dir, 'scenes')
+    log_dir = os.path.join(out_dir, 'logs')
+    for folder in (scene_out_dir, log_dir): os.makedirs(folder, exist_ok=True)
+
+    manifest_path = os.path.join(out_dir, manifest_name)
+    manifest = load_manifest(manifest_path)
+
+    scenes = discover_scenes(root)
+    print(f"1. Ditemukan {len(scenes)} scene di {root}")
+
+    pending = []
+    for path in scenes:
+        sid = scene_id(path, root)
+        if is_finished(manifest.get(sid)):
+            continue
+        entry = manifest[sid] = {
+            'input': os.path.abspath(path),
+            'relpath': os.path.relpath(path, root),
+            'output': det.output_path_for(scene_out_dir, f"{sid}_Tambak", output_format),
+            'date': scene_date(path),
+            'status': 'pending',
+        }
+        try:
+            entry['est_bytes'] = estimate_scene_bytes(path)
+        except rasterio.errors.RasterioIOError as e:
+            entry.update(status='failed', error=str(e))
+            print(f"   [GAGAL] {sid}: {e}")
+            continue
+        pending.append(sid)
+    save_manifest(manifest_path, manifest)
+    n_skipped = sum(1 for path in scenes if manifest[scene_id(path, root)]['status'] == 'done')
+    print(f"   Sudah selesai (dilewati): {n_skipped} | Antri: {len(pending)}")
+
+    # Konfigurasi script 03 yang dibawa ke proses worker
+    config = {name: getattr(det, name) for name in det.WORKER_CONFIG_NAMES}
+    config.update(TILE_SIZE=det.TILE_SIZE, TILE_HALO=det.TILE_HALO, CACHE_DIR=det.CACHE_DIR,
+                  COARSE_SCREEN=det.COARSE_SCREEN, COARSE_FACTOR=det.COARSE_FACTOR, QA_RASTERS=det.QA_RASTERS,
+                  N_WORKERS=SCENE_TILE_WORKERS, OUTPUT_FORMAT=output_format)
+
+    print(f"2. Memproses (maks {MAX_SCENE_WORKERS} scene, budget RAM "
+          f"{MEMORY_BUDGET_BYTES / 1024 ** 3:.1f} GB)...")
+    running = {}
+    used_bytes = 0
+    with ProcessPoolExecutor(max_workers=MAX_SCENE_WORKERS) as pool:
+        while pending or running:
+            # Mulai scene baru selama slot & perkiraan RAM masih cukup
+            while pending and len(running) < MAX_SCENE_WORKERS:
+                sid = pending[0]
+                entry = manifest[sid]
+                if running and used_bytes + entry['est_bytes'] > MEMORY_BUDGET_BYTES: break
+                pending.pop(0)
+                log_path = os.path.join(log_dir, f"{sid}.log")
+                future = pool.submit(run_scene, entry['input'], entry['output'], log_path, config)
+                running[future] = sid
+                used_bytes += entry['est_bytes']
+                entry.update(status='running', started=time.strftime('%Y-%m-%dT%H:%M:%S'))
+                save_manifest(manifest_path, manifest)
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                sid = running.pop(future)
+                entry = manifest[sid]
+                used_bytes -= entry['est_bytes']
+                entry['finished'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+                try:
+                    count_total, count_lolos, seconds = future.result()
+                    entry.update(status='done', count_total=count_total, count_lolos=count_lolos,
+                                 seconds=round(seconds, 2))
+                    entry.pop('error', None)
+                    print(f"   [OK] {sid}: {count_lolos} tambak ({seconds:.1f} s)")
+                except Exception as e:
+                    entry.update(status='failed', error=str(e))
+                    print(f"   [GAGAL] {sid}: {e}")
+                save_manifest(manifest_path, manifest)
+
+    n_failed = sum(1 for entry in manifest.values() if entry.get('status') == 'failed')
+    print("3. Menggabungkan katalog...")
+    catalogue_path, total = build_catalogue(manifest, out_dir, output_format)
+    if catalogue_path:
+        print(f"\n[SUKSES] Katalog {total} tambak tersimpan di: {catalogue_path}")
+    else:
+        print("\n[INFO] Tidak ada tambak untuk katalog.")
+    if n_failed:
+        print(f"[INFO] {n_failed} scene gagal, jalankan ulang script ini untuk melanjutkan.")
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    print(f"--- MULAI BATCH MULTI-SCENE ---")
+
+    try:
+        run_batch(scene_dir, output_dir)
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
@@ -0,0 +1,255 @@
+import importlib
+import multiprocessing
+import contextlib
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import rasterio
+import shapely
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+# Fungsi deteksi dipakai ulang dari script 03 (nama file diawali angka -> importlib)
+det = importlib.import_module("03_Local_S2DR3_HighRes_Detection")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+bench_dir = r"path/to/your/folder/benchmark" # Ganti dengan lokasi file Anda
+results_name = "benchmark_results"
+
+# ==========================================
+# 2. KONFIGURASI BENCHMARK
+# ==========================================
+# Ukuran scene sintetis (piksel per sisi, 1 piksel = 1 m seperti S2DR3)
+SCENE_SIZES = [1024, 2048, 4096]
+# "dn" = uint16 Digital Number, "reflectance" = float32 0-1 (DN / 10000)
+INPUT_MODES = ['dn', 'reflectance']
+# Jumlah worker tile script 03 yang diuji (1 = serial, paling stabil untuk dibandingkan)
+BENCH_WORKERS = [1]
+BENCH_TILE_SIZE = det.TILE_SIZE
+SEED = 0
+
+# Scene dibagi sel CELL x CELL piksel, tiap sel berisi maksimal 1 objek
+# (jarak antar objek >= 2 x CELL_MARGIN, jadi tidak pernah menyatu).
+CELL = 96
+CELL_MARGIN = 8
+# Peluang isi sel. Tiap objek pengecoh hanya gagal di 1 aturan filter.
+CELL_CONTENT = {
+    'tambak': 0.45,        # Kolam persegi 20-80 m -> harus terdeteksi (ground truth)
+    'sawah': 0.15,         # Sawah tergenang bervegetasi -> ditolak NDVI
+    'tanah_terang': 0.10,  # Tanah basah terang -> ditolak NIR
+    'kolam_kecil': 0.10,   # Kolam < MIN_LUAS -> ditolak luas
+    'saluran': 0.10,       # Saluran keliling (cincin) -> ditolak LSI
+    'kosong': 0.10,
+}
+# Piksel noise acak (air di darat / darat di kolam), dibuang morfologi
+NOISE_FRACTION = 0.005
+NOISE_DN = 30
+
+# Nilai DN (green, red, nir) tiap tutupan
+DN_DARAT = ((700, 1100), (600, 900), (2600, 3200))
+DN_AIR = (1550, 900, 650)
+DN_SAWAH = (1700, 600, 1800)
+DN_TANAH_TERANG = (3600, 3000, 3800)
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def _fill(bands, rows, cols, values):
+    for band, value in zip(bands, values): band[rows, cols] = value
+
+def _place_object(bands, kind, y0, x0, rng, truth):
+    """Isi 1 sel (pojok kiri atas y0, x0 di strip) dengan objek `kind`."""
+    inner = CELL - 2 * CELL_MARGIN
+    y, x = y0 + CELL_MARGIN, x0 + CELL_MARGIN
+    if kind == 'tambak':
+        h, w = rng.integers(20, inner + 1, 2)
+        _fill(bands, slice(y, y + h), slice(x, x + w), DN_AIR)
+        truth.append((y, x, h, w))
+    elif kind == 'kolam_kecil':
+        h, w = rng.integers(6, 15, 2)
+        _fill(bands, slice(y, y + h), slice(x, x + w), DN_AIR)
+    elif kind == 'saluran':
+        side, width = inner, 4
+        _fill(bands, slice(y, y + side), slice(x, x + side), DN_AIR)
+        inner_rows, inner_cols = slice(y + width, y + side - width), slice(x + width, x + side - width)
+        for band, (low, high) in zip(bands, DN_DARAT):
+            band[inner_rows, inner_cols] = (low + high) // 2
+    elif kind in ('sawah', 'tanah_terang'):
+        h, w = rng.integers(30, inner + 1, 2)
+        _fill(bands, slice(y, y + h), slice(x, x + w), DN_SAWAH if kind == 'sawah' else DN_TANAH_TERANG)
+
+def generate_scene(path, size, mode, seed=SEED):
+    """Scene sintetis mirip S2DR3 (band 2 green, 3 red, 4 NIR), ditulis per strip sel.
+
+    Return list kotak tambak ground truth (row, col, height, width) dalam piksel.
+    Isi scene hanya bergantung pada (size, seed), jadi DN & reflectance identik.
+    """
+    rng = np.random.default_rng([seed, size])
+    kinds = list(CELL_CONTENT)
+    probs = np.array([CELL_CONTENT[k] for k in kinds], float)
+    dtype = 'uint16' if mode == 'dn' else 'float32'
+
+    truth = []
+    profile = dict(driver='GTiff', width=size, height=size, count=4, dtype=dtype,
+                   crs='EPSG:32749', transform=from_origin(500000, 9100000, 1, 1),
+                   tiled=True, blockxsize=256, blockysize=256, compress='deflate')
+    with rasterio.open(path, 'w', **profile) as dst:
+        for row_off in range(0, size, CELL):
+            h = min(CELL, size - row_off)
+            # Latar darat bervegetasi (NDWI jauh di bawah threshold)
+            bands = [rng.integers(low, high, (h, size)).astype(np.int32) for low, high in DN_DARAT]
+
+            strip_truth = []
+            if h == CELL:
+                for col_off in range(0, size - CELL + 1, CELL):
+                    kind = kinds[rng.choice(len(kinds), p=probs / probs.sum())]
+                    _place_object(bands, kind, 0, col_off, rng, strip_truth)
+            truth += [(row_off + int(y), int(x), int(ph), int(pw)) for y, x, ph, pw in strip_truth]
+
+            # Noise spektral + piksel salt & pepper
+            for band in bands: band += rng.normal(0, NOISE_DN, band.shape).astype(np.int32)
+            flip = rng.random((h, size)) < NOISE_FRACTION
+            is_water = bands[2] < 1000
+            for band, value in zip(bands, DN_AIR):
+                band[flip & ~is_water] = value
+            for band, (low, high) in zip(bands, DN_DARAT):
+                band[flip & is_water] = (low + high) // 2
+
+            green, red, nir = (np.clip(band, 1, 10000) for band in bands)
+            stack = np.stack([green, green, red, nir])  # Band 1 (blue) = salinan green
+            if mode == 'dn':
+                stack = stack.astype(np.uint16)
+            else:
+                stack = (stack / 10000).astype(np.float32)
+            dst.write(stack, window=Window(0, row_off, size, h))
+    return truth
+
+def truth_centroids(truth, transform):
+    """Titik tengah kotak ground truth dalam koordinat peta."""
+    rows = np.array([y + h / 2 for y, _, h, _ in truth])
+    cols = np.array([x + w / 2 for _, x, _, w in truth])
+    xs, ys = rasterio.transform.xy(transform, rows, cols, offset='ul')
+    return shapely.points(xs, ys)
+
+def truth_boxes(truth, transform):
+    """Kotak ground truth sebagai poligon dalam koordinat peta (referensi IoU)."""
+    box = np.array(truth, float).reshape(-1, 4)
+    x0, y0 = rasterio.transform.xy(transform, box[:, 0], box[:, 1], offset='ul')
+    x1, y1 = rasterio.transform.xy(transform, box[:, 0] + box[:, 2], box[:, 1] + box[:, 3], offset='ul')
+    return shapely.box(np.minimum(x0, x1), np.minimum(y0, y1), np.maximum(x0, x1), np.maximum(y0, y1))
+
+def check_ground_truth(output_path, scene_path, truth):
+    """Cocokkan tambak terdeteksi dengan ground truth (titik tengah di dalam poligon)."""
+    with rasterio.open(scene_path) as src:
+        points = truth_centroids(truth, src.transform)
+        boxes = truth_boxes(truth, src.transform)
+    detected = (np.asarray(det.read_output(output_path).geometry.values)
+                if os.path.exists(output_path) else np.empty(0, dtype=object))
+    pairs = shapely.STRtree(detected).query(points, predicate='within')
+    matched_truth = len(np.unique(pairs[0]))
+    matched_detected = len(np.unique(pairs[1]))
+    # Akurasi bentuk: pencocokan 1-1 berbasis IoU (script 13, di-import hanya jika ada ground truth)
+    ev = importlib.import_module("13_Local_Accuracy_Eval")
+    accuracy = ev.accuracy_metrics(detected, boxes, *ev.match_ponds(detected, boxes))
+    return {
+        'n_truth': len(truth),
+        'n_detected': len(detected),
+        'recall': matched_truth / len(truth) if len(truth) else 1.0,
+        'precision': matched_detected / len(detected) if len(detected) else 1.0,
+        'f1_iou': round(accuracy['f1'], 4),
+        'mean_iou': round(accuracy['mean_iou'], 4) if accuracy['mean_iou'] is not None else None,
+        'ok': len(detected) == len(truth) == matched_truth == matched_detected,
+    }
+
+def run_case(scene_path, output_path, n_workers, tile_size):
+    """Dijalankan di proses baru (spawn) agar puncak RSS terukur per kasus."""
+    det.CACHE_DIR = None  # Selalu ukur pipeline penuh (tanpa cache)
+    det.PROFILE_REPORT = True
+    det.N_WORKERS = n_workers
+    det.TILE_SIZE = tile_size
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        det.run_detection(scene_path, output_path, 'parquet')
+    with open(det.profile_path_for(output_path)) as f:
+        return json.load(f)
+
+def run_benchmark(out_dir, sizes=SCENE_SIZES, modes=INPUT_MODES, workers=BENCH_WORKERS):
+    scene_dir = os.path.join(out_dir, 'scenes')
+    result_dir = os.path.join(out_dir, 'results')
+    for folder in (scene_dir, result_dir): os.makedirs(folder, exist_ok=True)
+
+    print("1. Membuat scene sintetis...")
+    scenes = []
+    for size in sizes:
+        for mode in modes:
+            name = f"synthetic_{size}_{mode}_seed{SEED}"
+            scene_path = os.path.join(scene_dir, name + '.tif')
+            truth_path = os.path.join(scene_dir, name + '_truth.json')
+            if os.path.exists(scene_path) and os.path.exists(truth_path):
+                with open(truth_path) as f: truth = json.load(f)
+            else:
+                start = time.time()
+                truth = generate_scene(scene_path, size, mode)
+                with open(truth_path, 'w') as f: json.dump(truth, f)
+                print(f"   {name}: {len(truth)} tambak ground truth ({time.time() - start:.1f} s)")
+            scenes.append((name, size, mode, scene_path, truth))
+
+    print("2. Menjalankan deteksi per kasus...")
+    rows, reports = [], []
+    stage_names = []
+    spawn = multiprocessing.get_context('spawn')
+    for name, size, mode, scene_path, truth in scenes:
+        for n_workers in workers:
+            output_path = os.path.join(result_dir, f"{name}_w{n_workers}.parquet")
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                report = pool.submit(run_case, scene_path, output_path, n_workers, BENCH_TILE_SIZE).result()
+            check = check_ground_truth(output_path, scene_path, truth)
+
+            row = {'scene': name, 'size': size, 'mode': mode, 'workers': n_workers,
+                   'megapixels': round(size * size / 1e6, 2), 'wall_s': report['wall_s'],
+                   'peak_rss_mb': max(filter(None, [report['peak_rss_mb_main'], report['peak_rss_mb_workers']]),
+                                      default=None),
+                   **check}
+            base_columns = list(row)
+            for stage, record in report['stages'].items():
+                row[f"{stage}_s"] = round(record['wall_s'], 4)
+                if stage not in stage_names: stage_names.append(stage)
+            rows.append(row)
+            reports.append({'case': row, 'profile': report})
+            status = "OK" if check['ok'] else "SELISIH"
+            print(f"   {name} w{n_workers}: {report['wall_s']:.2f} s, RSS {row['peak_rss_mb'] or 0:.0f} MB, "
+                  f"terdeteksi {check['n_detected']}/{check['n_truth']} [{status}]")
+
+    # --- SIMPAN HASIL ---
+    csv_path = os.path.join(out_dir, results_name + '.csv')
+    columns = base_columns + [f"{stage}_s" for stage in stage_names]
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(out_dir, results_name + '.json'), 'w') as f:
+        json.dump(reports, f, indent=1)
+
+    n_fail = sum(1 for row in rows if not row['ok'])
+    if n_fail:
+        print(f"\n[INFO] {n_fail} kasus tidak cocok dengan ground truth. Hasil: {csv_path}")
+    else:
+        print(f"\n[SUKSES] Semua kasus cocok dengan ground truth. Hasil: {csv_path}")
+    return rows
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(bench_dir): os.makedirs(bench_dir)
+
+    print(f"--- MULAI BENCHMARK SINTETIS ---")
+
+    try:
+        run_benchmark(bench_dir)
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
@@ -0,0 +1,192 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Stack Sentinel-2 L2A (1 GeoTIFF per tanggal, mis. hasil download S2_SR_HARMONIZED dari GEE)
+scene_dir = r"path/to/your/s2_l2a/folder" # Ganti dengan lokasi file Anda
+SCENE_PATTERN = "*.tif"
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+output_name = "S2_NDWI_ZScore.tif"
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER
+# ==========================================
+# Band dicari lewat nama (deskripsi band GeoTIFF). Jika tidak ada nama, pakai index.
+BAND_NAMES = {'green': 'B3', 'nir': 'B8', 'scl': 'SCL'}
+BAND_INDEX = {'green': 3, 'nir': 8, 'scl': 15}
+# Kelas SCL yang dibuang (sama dengan mask_clouds_scl di script 01/02):
+# 3 bayangan awan, 8/9 awan, 10 cirrus, 11 salju
+SCL_MASK_CLASSES = (3, 8, 9, 10, 11)
+# Offset BOA L2A. Koleksi HARMONIZED di GEE sudah dikoreksi (0). File L2A mentah
+# processing baseline >= 04.00 perlu -1000 agar nilainya sama dengan GEE.
+BOA_ADD_OFFSET = 0
+# Batas atas z-score (mean + Z_SIGMA x stdDev), sama dengan z_score_cleaning
+Z_SIGMA = 2
+
+# Ukuran chunk spasial (piksel per sisi). RAM ~ CHUNK_SIZE^2 x ~60 byte, tidak
+# bergantung jumlah tanggal (stack waktu tidak pernah ditampung sekaligus).
+CHUNK_SIZE = 1024
+# Proses paralel per chunk. None = semua core, 1 = serial.
+N_WORKERS = None
+# Simpan juga band mean, stdDev, max & jumlah observasi valid (QA)
+WRITE_STATS_BANDS = False
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def resolve_band(src, key):
+    """Index band (1-based) dari nama deskripsi, fallback ke BAND_INDEX."""
+    if BAND_NAMES.get(key) in src.descriptions:
+        return src.descriptions.index(BAND_NAMES[key]) + 1
+    return BAND_INDEX[key]
+
+def open_aligned(path, ref):
+    """Buka scene; jika grid berbeda dari referensi, dibaca lewat WarpedVRT (nearest)."""
+    src = rasterio.open(path)
+    if (src.crs == ref['crs'] and src.transform == ref['transform'] and
+            (src.width, src.height) == (ref['width'], ref['height'])):
+        return src, src
+    vrt = WarpedVRT(src, crs=ref['crs'], transform=ref['transform'], width=ref['width'],
+                    height=ref['height'], resampling=Resampling.nearest,
+                    src_nodata=src.nodata if src.nodata is not None else 0, nodata=0)
+    return vrt, src
+
+def mask_clouds_scl(green, nir, scl):
+    """Reflectance (DN / 10000) + masker valid. Sama dengan mask_clouds_scl GEE.
+
+    SCL 0 (no data) dan piksel kosong (0) juga dibuang, seperti mask bawaan GEE.
+    """
+    valid = ~np.isin(scl, SCL_MASK_CLASSES) & (scl != 0) & (green != 0) & (nir != 0)
+    green = (green.astype(np.float64) + BOA_ADD_OFFSET) / 10000
+    nir = (nir.astype(np.float64) + BOA_ADD_OFFSET) / 10000
+    return green, nir, valid
+
+def compute_ndwi(green, nir, valid):
+    """normalizedDifference(['B3', 'B8']). Input negatif -> masked (perilaku GEE)."""
+    valid &= (green >= 0) & (nir >= 0) & (green + nir != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ndwi = ((green - nir) / (green + nir)).astype(np.float32)
+    return ndwi, valid
+
+class NdwiStats:
+    """Mean / varian (Welford) / max berjalan per piksel untuk 1 chunk."""
+
+    def __init__(self, shape):
+        self.count = np.zeros(shape, np.int32)
+        self.mean = np.zeros(shape, np.float64)
+        self.m2 = np.zeros(shape, np.float64)
+        self.max = np.full(shape, -np.inf, np.float64)
+
+    def update(self, ndwi, valid):
+        self.count += valid
+        delta = np.where(valid, ndwi - self.mean, 0.0)
+        self.mean += delta / np.maximum(self.count, 1)
+        self.m2 += delta * np.where(valid, ndwi - self.mean, 0.0)
+        np.fmax(self.max, np.where(valid, ndwi, -np.inf), out=self.max)
+
+    def std(self):
+        """Standar deviasi populasi (ee.Reducer.stdDev, bukan sampleStdDev)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self.m2 / self.count)
+
+def z_score_cleaning(stats):
+    """max NDWI dipotong di mean + Z_SIGMA x stdDev; tanpa observasi valid -> NaN."""
+    upper_limit = stats.mean + stats.std() * Z_SIGMA
+    cleaned = np.where(stats.max > upper_limit, upper_limit, stats.max)
+    return np.where(stats.count > 0, cleaned, np.nan).astype(np.float32)
+
+def iter_chunks(width, height, chunk_size=None):
+    if chunk_size is None: chunk_size = CHUNK_SIZE
+    for row_off in range(0, height, chunk_size):
+        for col_off in range(0, width, chunk_size):
+            yield Window(col_off, row_off, min(chunk_size, width - col_off),
+                         min(chunk_size, height - row_off))
+
+# --- WORKER ---
+_worker_stack = None
+
+def _init_worker(paths, ref):
+    """Dijalankan sekali per proses: buka semua scene (dibaca per window)."""
+    global _worker_stack
+    _worker_stack = []
+    for path in paths:
+        reader, src = open_aligned(path, ref)
+        _worker_stack.append((reader, src, [resolve_band(src, k) for k in ('green', 'nir', 'scl')]))
+
+def _close_worker():
+    for reader, src, _ in _worker_stack:
+        reader.close()
+        src.close()
+
+def process_chunk(window):
+    """1 chunk: semua tanggal dibaca berurutan & langsung diakumulasi (1 pass)."""
+    stats = NdwiStats((window.height, window.width))
+    for reader, _, (b_green, b_nir, b_scl) in _worker_stack:
+        green, nir, scl = reader.read([b_green, b_nir, b_scl], window=window)
+        ndwi, valid = compute_ndwi(*mask_clouds_scl(green, nir, scl))
+        stats.update(ndwi, valid)
+
+    bands = [z_score_cleaning(stats)]
+    if WRITE_STATS_BANDS:
+        bands += [stats.mean.astype(np.float32), stats.std().astype(np.float32),
+                  np.where(stats.count > 0, stats.max, np.nan).astype(np.float32),
+                  stats.count.astype(np.float32)]
+    return window, np.stack(bands)
+
+def run_composite(paths, output_path, n_workers=N_WORKERS):
+    if not paths: raise ValueError("Tidak ada scene Sentinel-2 untuk dikomposit.")
+    with rasterio.open(paths[0]) as first:
+        ref = {'crs': first.crs, 'transform': first.transform,
+               'width': first.width, 'height': first.height}
+
+    band_names = ['NDWI_clean'] + (['NDWI_mean', 'NDWI_stdDev', 'NDWI_max', 'count']
+                                   if WRITE_STATS_BANDS else [])
+    profile = dict(driver='GTiff', width=ref['width'], height=ref['height'], count=len(band_names),
+                   dtype='float32', crs=ref['crs'], transform=ref['transform'], nodata=np.nan,
+                   tiled=True, blockxsize=256, blockysize=256, compress='deflate', predictor=3)
+
+    windows = list(iter_chunks(ref['width'], ref['height']))
+    if n_workers is None: n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(windows))
+    print(f"2. Reduksi temporal {len(paths)} tanggal ({len(windows)} chunk, {n_workers} worker)...")
+
+    with rasterio.open(output_path, 'w', **profile) as dst:
+        dst.descriptions = tuple(band_names)
+        if n_workers <= 1:
+            _init_worker(paths, ref)
+            try:
+                for window, data in map(process_chunk, windows): dst.write(data, window=window)
+            finally:
+                _close_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(paths, ref)) as pool:
+                for window, data in pool.map(process_chunk, windows):
+                    dst.write(data, window=window)
+    return output_path
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    print(f"--- MULAI KOMPOSIT NDWI Z-SCORE (LOKAL) ---")
+
+    try:
+        start = time.time()
+        paths = sorted(glob.glob(os.path.join(scene_dir, SCENE_PATTERN)))
+        print(f"1. Ditemukan {len(paths)} scene Sentinel-2 di {scene_dir}")
+        output_path = run_composite(paths, os.path.join(output_dir, output_name))
+        print(f"\n[SUKSES] NDWI bersih tersimpan di: {output_path} ({time.time() - start:.1f} s)")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
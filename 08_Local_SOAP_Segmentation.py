@@ -0,0 +1,241 @@
+import importlib
+import os
+import time
+import cv2
+import numpy as np
+import rasterio
+import rasterio.features
+import shapely
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+# Writer & metrik bentuk dipakai ulang dari script 03 (nama file diawali angka -> importlib)
+det = importlib.import_module("03_Local_S2DR3_HighRes_Detection")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# NDWI bersih hasil script 07 (z-score) & (opsional) VV Sentinel-1 tahunan yang sudah dihaluskan (dB)
+ndwi_tif = r"path/to/your/folder/S2_NDWI_ZScore.tif" # Ganti dengan lokasi file Anda
+s1_tif = None # mis. r"path/to/your/folder/S1_VV_Annual_Smooth.tif"
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+output_name = "SOAP_Kandidat"
+OUTPUT_FORMAT = det.OUTPUT_FORMAT
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER (SAMA DENGAN SCRIPT 01/02)
+# ==========================================
+# Hybrid seeding: NDWI >= 0 ATAU VV < -13.5 dB, lalu buang komponen < 10 piksel (8-connected)
+THRESH_NDWI_OPTIK = 0.0
+THRESH_VV_RADAR = -13.5
+MIN_SEED_PIXELS = 10
+
+# Iterasi SOAP: focal_min kernel persegi (radius piksel) -> Canny -> akumulasi tepi
+SOAP_RADII = (1.5, 2.0, 2.5)
+CANNY_THRESHOLD = 0.1
+CANNY_SIGMA = 1.0
+
+# Filter bentuk & luas kandidat
+MAX_LSI = 3.0
+MAX_RPOC = 1.8
+MIN_LUAS = 300
+MAX_LUAS = 500000
+
+# True = hanya komponen yang terpotong tepi baru yang dilabel & divektorisasi ulang.
+# False = tiap iterasi vektorisasi seluruh area lalu duplikat dibuang (perilaku GEE, lambat).
+INCREMENTAL = True
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def square_kernel_size(radius):
+    """Kernel persegi GEE (units='pixels'): offset |dx|, |dy| <= radius -> sisi 2*floor(r)+1."""
+    return 2 * int(np.floor(radius)) + 1
+
+def focal_min_square(image, size):
+    """focal_min kernel persegi. NaN (masked) diabaikan; tepi scene tidak ikut dihitung."""
+    if size <= 1: return image
+    filled = np.where(np.isnan(image), np.inf, image).astype(np.float32)
+    eroded = cv2.erode(filled, np.ones((size, size), np.uint8),
+                       borderType=cv2.BORDER_CONSTANT, borderValue=np.inf)
+    return np.where(np.isinf(eroded), np.nan, eroded).astype(np.float32)
+
+def canny_edges(image, threshold=CANNY_THRESHOLD, sigma=CANNY_SIGMA):
+    """Canny 1 threshold (seperti ee.Algorithms.CannyEdgeDetector): Gaussian -> gradien
+    -> non-maximum suppression -> magnitudo > threshold. Return masker tepi (bool).
+    """
+    valid = ~np.isnan(image)
+    smooth = cv2.GaussianBlur(np.where(valid, image, 0).astype(np.float32), (0, 0), sigma)
+    # Sobel / 8 = turunan per piksel (satuan NDWI per piksel)
+    gx = cv2.Sobel(smooth, cv2.CV_32F, 1, 0, ksize=3) / 8
+    gy = cv2.Sobel(smooth, cv2.CV_32F, 0, 1, ksize=3) / 8
+    magnitude = np.hypot(gx, gy)
+
+    # Arah gradien dibulatkan ke 0/45/90/135 derajat, bandingkan dengan 2 tetangga searah
+    angle = (np.rad2deg(np.arctan2(gy, gx)) + 180) % 180
+    direction = ((angle + 22.5) // 45).astype(np.int8) % 4
+    padded = np.pad(magnitude, 1)
+    h, w = magnitude.shape
+    neighbor = lambda dy, dx: padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+    is_max = np.zeros((h, w), bool)
+    for d, (dy, dx) in enumerate([(0, 1), (1, 1), (1, 0), (1, -1)]):
+        sel = direction == d
+        is_max |= sel & (magnitude >= neighbor(dy, dx)) & (magnitude >= neighbor(-dy, -dx))
+    return is_max & (magnitude > threshold) & valid
+
+def build_hybrid_mask(ndwi, vv=None):
+    """Masker bibit: NDWI >= 0 (optik) ATAU VV < -13.5 (radar), komponen >= 10 piksel."""
+    with np.errstate(invalid='ignore'):
+        mask = ndwi >= THRESH_NDWI_OPTIK
+        if vv is not None: mask |= vv < THRESH_VV_RADAR
+    n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+        mask.astype(np.uint8), connectivity=8, ltype=cv2.CV_32S)
+    keep = stats[:, cv2.CC_STAT_AREA] >= MIN_SEED_PIXELS
+    keep[0] = False
+    return keep[labels]
+
+def label_segments(segments):
+    """Komponen 4-connected (reduceToVectors eightConnected=False)."""
+    n_labels, labels = cv2.connectedComponents(segments.astype(np.uint8), connectivity=4, ltype=cv2.CV_32S)
+    return labels, n_labels - 1
+
+def vectorize_labels(labels, transform):
+    """Label > 0 -> array Polygon (CRS peta), hanya di bbox area berlabel."""
+    rows = np.flatnonzero(labels.any(axis=1))
+    cols = np.flatnonzero(labels.any(axis=0))
+    if len(rows) == 0: return np.empty(0, dtype=object)
+    win = Window(cols[0], rows[0], cols[-1] - cols[0] + 1, rows[-1] - rows[0] + 1)
+    crop = np.ascontiguousarray(labels[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1])
+
+    coords, ring_len, ring_poly = [], [], []
+    n_poly = 0
+    for geom, _ in rasterio.features.shapes(crop, mask=crop > 0, connectivity=4,
+                                            transform=rasterio.windows.transform(win, transform)):
+        for ring in geom['coordinates']:
+            coords.extend(ring)
+            ring_len.append(len(ring))
+            ring_poly.append(n_poly)
+        n_poly += 1
+    rings = shapely.linearrings(np.asarray(coords, dtype=float),
+                                indices=np.repeat(np.arange(len(ring_len)), ring_len))
+    return shapely.polygons(rings, indices=ring_poly)
+
+def dedup_polygons(polys, iteration):
+    """Buang kandidat identik (poligon sama persis dari iterasi berbeda), simpan iterasi pertama."""
+    wkb = shapely.to_wkb(shapely.normalize(polys))
+    _, first = np.unique(wkb, return_index=True)
+    first = np.sort(first)
+    return polys[first], iteration[first]
+
+def soap_segmentation(ndwi, seed_mask, transform, radii=SOAP_RADII, incremental=None):
+    """Segmentasi SOAP (script 01/02). Return (poligon kandidat unik, iterasi ke-).
+
+    Tepi terakumulasi hanya bertambah, jadi komponen yang tidak tersentuh tepi baru
+    identik dengan iterasi sebelumnya: tidak perlu dilabel/divektorisasi ulang.
+    focal_min kernel lebih besar = erosi lanjutan dari hasil kernel sebelumnya.
+    """
+    if incremental is None: incremental = INCREMENTAL
+    accumulated_edges = np.zeros(ndwi.shape, bool)
+    morph, prev_size = ndwi, 1
+    labels = None
+    polys, iteration = [], []
+
+    for i, radius in enumerate(radii):
+        size = square_kernel_size(radius)
+        new_edges = None
+        if size != prev_size or i == 0:
+            # Min persegi size = min persegi (size - prev_size + 1) dari hasil sebelumnya
+            morph = focal_min_square(morph, size - prev_size + 1)
+            prev_size = size
+            edges = canny_edges(morph)
+            new_edges = edges & ~accumulated_edges
+            accumulated_edges |= edges
+        print(f"   Iterasi ke-{i+1} (kernel {size}x{size})...")
+
+        if labels is None or not incremental:
+            labels, _ = label_segments(seed_mask & ~accumulated_edges)
+            new_polys = vectorize_labels(labels, transform)
+        else:
+            if new_edges is None: continue  # Kernel sama -> tepi & segmen identik
+            changed = np.unique(labels[new_edges & (labels > 0)])
+            if len(changed) == 0: continue
+            lut = np.zeros(labels.max() + 1, bool)
+            lut[changed] = True
+            region = lut[labels]
+            region_labels, n_new = label_segments(region & ~accumulated_edges)
+            new_polys = vectorize_labels(region_labels, transform)
+            # Label komponen baru disambung setelah label lama
+            labels[region] = 0
+            labels = np.where(region_labels > 0, region_labels + labels.max(), labels)
+        polys.append(new_polys)
+        iteration.append(np.full(len(new_polys), i + 1))
+        print(f"      {len(new_polys)} poligon divektorisasi")
+
+    polys = np.concatenate(polys) if polys else np.empty(0, dtype=object)
+    iteration = np.concatenate(iteration) if iteration else np.empty(0, int)
+    return dedup_polygons(polys, iteration)
+
+def filter_candidates(polys, iteration):
+    """Metrik bentuk hanya untuk kandidat unik, lalu filter LSI/RPOC & luas."""
+    area = shapely.area(polys)
+    lsi = det.calculate_lsi(polys)
+    rpoc = det.calculate_rpoc(polys)
+    keep = (lsi <= MAX_LSI) & (rpoc <= MAX_RPOC) & (area >= MIN_LUAS) & (area <= MAX_LUAS)
+    return {
+        'geometry': polys[keep],
+        'area_m2': area[keep],
+        'LSI': lsi[keep],
+        'RPOC': rpoc[keep],
+        'iterasi': iteration[keep].astype(str),
+    }
+
+def read_aligned(path, ref):
+    """Band 1 raster, di-resample (nearest) ke grid referensi jika perlu."""
+    with rasterio.open(path) as src:
+        if src.crs == ref.crs and src.transform == ref.transform and src.shape == ref.shape:
+            data = src.read(1, masked=True)
+        else:
+            with WarpedVRT(src, crs=ref.crs, transform=ref.transform, width=ref.width,
+                           height=ref.height, resampling=Resampling.nearest) as vrt:
+                data = vrt.read(1, masked=True)
+    return data.astype(np.float32).filled(np.nan)
+
+def run_soap(ndwi_path, output_path, vv_path=None, output_format=OUTPUT_FORMAT):
+    start = time.time()
+    with rasterio.open(ndwi_path) as ref:
+        ndwi = ref.read(1, masked=True).astype(np.float32).filled(np.nan)
+        transform, crs = ref.transform, ref.crs
+        vv = read_aligned(vv_path, ref) if vv_path else None
+
+    print("1. Membuat Masker Hybrid (Bibit Tambak)...")
+    seed_mask = build_hybrid_mask(ndwi, vv)
+
+    print(f"2. Segmentasi Iteratif SOAP ({'inkremental' if INCREMENTAL else 'penuh'})...")
+    polys, iteration = soap_segmentation(ndwi, seed_mask, transform)
+    print(f"   Kandidat unik: {len(polys)}")
+
+    print("3. Filter Bentuk & Luas...")
+    batch = filter_candidates(polys, iteration)
+    writer = det.open_writer(output_path, crs, output_format, extra_columns=('iterasi',))
+    try:
+        writer.write(batch)
+    finally:
+        writer.close()
+    print(f"   Lolos: {len(batch['geometry'])} ({time.time() - start:.1f} s)")
+    return len(polys), len(batch['geometry'])
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    output_path = det.output_path_for(output_dir, output_name, OUTPUT_FORMAT)
+
+    print(f"--- MULAI SEGMENTASI SOAP (LOKAL) ---")
+
+    try:
+        run_soap(ndwi_tif, output_path, s1_tif)
+        print(f"\n[SUKSES] Kandidat tersimpan di: {output_path}")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
@@ -0,0 +1,86 @@
+import os
+import time
+import numpy as np
+import geopandas as gpd
+import shapely
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Kandidat tambak dari script 01/02 (SHP hasil ekspor GEE) atau script 03 (parquet/fgb/shp)
+input_path = r"path/to/your/folder/S2DR3_Tambak.parquet" # Ganti dengan lokasi file Anda
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+output_suffix = "_Tetangga"
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER (SAMA DENGAN "FILTER TETANGGA" SCRIPT 01/02)
+# ==========================================
+# withinDistance(100) -> jarak antar geometri (meter)
+NEIGHBOR_DISTANCE = 100
+# near_num >= 2 (diri sendiri + minimal 1 teman)
+MIN_NEAR_NUM = 2
+# Jumlah poligon per query ke index (membatasi RAM pasangan sementara)
+NEIGHBOR_BATCH = 50000
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def to_metric_crs(gdf):
+    """Jarak harus dalam meter: CRS geografis (mis. EPSG:4326 dari GEE) -> UTM terdekat."""
+    if gdf.crs is None or not gdf.crs.is_geographic: return gdf
+    return gdf.to_crs(gdf.estimate_utm_crs())
+
+def count_neighbors(geoms, distance=None, batch_size=None):
+    """near_num tiap poligon = jumlah poligon berjarak <= distance (termasuk diri sendiri).
+
+    STRtree dibangun sekaligus (bulk-loaded); pasangan hasil query per batch langsung
+    dijumlahkan (bincount), daftar tetangga tidak pernah disimpan.
+    """
+    if distance is None: distance = NEIGHBOR_DISTANCE
+    if batch_size is None: batch_size = NEIGHBOR_BATCH
+    tree = shapely.STRtree(geoms)
+    counts = np.zeros(len(geoms), np.int64)
+    for start in range(0, len(geoms), batch_size):
+        batch = geoms[start:start + batch_size]
+        idx, _ = tree.query(batch, predicate='dwithin', distance=distance)
+        counts[start:start + len(batch)] += np.bincount(idx, minlength=len(batch))
+    return counts
+
+def neighbor_filter(gdf, distance=None, min_near=None):
+    """Tambah kolom near_num lalu buang poligon yang terisolasi (near_num < min_near)."""
+    if min_near is None: min_near = MIN_NEAR_NUM
+    geoms = np.asarray(to_metric_crs(gdf).geometry.values)
+    gdf = gdf.copy()
+    gdf['near_num'] = count_neighbors(geoms, distance)
+    return gdf[gdf['near_num'] >= min_near]
+
+def read_candidates(path):
+    if path.endswith('.parquet'): return gpd.read_parquet(path)
+    return gpd.read_file(path)
+
+def write_candidates(gdf, path):
+    if path.endswith('.parquet'):
+        gdf.to_parquet(path, compression='zstd')
+    else:
+        gdf.to_file(path)
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    stem, extension = os.path.splitext(os.path.basename(input_path))
+    output_path = os.path.join(output_dir, stem + output_suffix + extension)
+
+    print(f"--- MULAI FILTER TETANGGA ---")
+
+    try:
+        start = time.time()
+        candidates = read_candidates(input_path)
+        print(f"1. Kandidat: {len(candidates)}")
+        result = neighbor_filter(candidates)
+        print(f"2. Lolos (near_num >= {MIN_NEAR_NUM}, jarak {NEIGHBOR_DISTANCE} m): {len(result)}")
+        write_candidates(result, output_path)
+        print(f"\n[SUKSES] File tersimpan di: {output_path} ({time.time() - start:.1f} s)")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
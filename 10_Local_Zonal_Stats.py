@@ -0,0 +1,200 @@
+import importlib
+import os
+import time
+import numpy as np
+import rasterio
+import rasterio.features
+import shapely
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+# Baca/tulis kandidat dipakai ulang dari script 09 (nama file diawali angka -> importlib)
+nb = importlib.import_module("09_Local_Neighbor_Filter")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+input_path = r"path/to/your/folder/SOAP_Kandidat.parquet" # Ganti dengan lokasi file Anda
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+output_suffix = "_Zonal"
+
+# Kolom -> (raster, reducer). Raster pertama = grid referensi (label image).
+# Raster None dilewati. Reducer: 'median' atau ('fraction', kelas).
+ZONAL_RASTERS = {
+    'median_ndwi': (r"path/to/your/folder/S2_NDWI_ZScore.tif", 'median'),          # calculate_median_values
+    'median_vv':   (r"path/to/your/folder/S1_VV_Annual_Smooth.tif", 'median'),     # calculate_median_values (VV tahunan, focal_median 15 m)
+    'crop_pct':    (r"path/to/your/folder/ESA_WorldCover_10m.tif", ('fraction', 40)),  # calculate_crop_overlap
+}
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER
+# ==========================================
+# Ukuran window baca (piksel per sisi) untuk scene besar
+WINDOW_SIZE = 2048
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def non_overlapping_layers(geoms):
+    """Bagi poligon ke lapisan tanpa tumpang tindih (pewarnaan greedy).
+
+    Kandidat SOAP bisa saling menimpa (induk & pecahannya), sedangkan 1 label
+    image hanya bisa menyimpan 1 label per piksel. Poligon yang hanya bersentuhan
+    tepi tetap di lapisan yang sama.
+    """
+    layer = np.zeros(len(geoms), np.int32)
+    left, right = shapely.STRtree(geoms).query(geoms, predicate='intersects')
+    pair = (left < right)
+    left, right = left[pair], right[pair]
+    overlap = ~shapely.touches(geoms[left], geoms[right])
+    left, right = left[overlap], right[overlap]
+    if len(left) == 0: return layer
+
+    order = np.argsort(right, kind='stable')
+    left, right = left[order], right[order]
+    bounds = np.searchsorted(right, np.arange(len(geoms) + 1))
+    for i in np.unique(right):
+        used = set(layer[left[bounds[i]:bounds[i + 1]]])
+        layer[i] = next(k for k in range(len(used) + 1) if k not in used)
+    return layer
+
+def open_aligned(path, ref):
+    """Raster dibaca di grid referensi (WarpedVRT nearest jika grid berbeda)."""
+    src = rasterio.open(path)
+    if src.crs == ref.crs and src.transform == ref.transform and src.shape == ref.shape:
+        return src, src
+    vrt = WarpedVRT(src, crs=ref.crs, transform=ref.transform, width=ref.width,
+                    height=ref.height, resampling=Resampling.nearest)
+    return vrt, src
+
+def iter_windows(width, height, size=None):
+    if size is None: size = WINDOW_SIZE
+    for row_off in range(0, height, size):
+        for col_off in range(0, width, size):
+            yield Window(col_off, row_off, min(size, width - col_off), min(size, height - row_off))
+
+def grouped_median(labels, values, n):
+    """Median per label (label 0..n-1) dari pasangan (label, nilai) sekaligus (1 sort)."""
+    result = np.full(n, np.nan)
+    if len(labels) == 0: return result
+    order = np.lexsort((values, labels))
+    values = values[order]
+    counts = np.bincount(labels, minlength=n)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    has = counts > 0
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    result[has] = (values[lo] + values[hi]) / 2
+    return result
+
+def flush_medians(pairs, medians, last_row, row_off):
+    """Median poligon yang window terakhirnya sudah terbaca; sisa pasangan tetap di buffer."""
+    labels_list, values_list = pairs
+    if not labels_list: return
+    labels, values = np.concatenate(labels_list), np.concatenate(values_list)
+    done = last_row[labels] <= row_off
+    if done.any():
+        finished = np.unique(labels[done])
+        medians[finished] = grouped_median(labels[done], values[done], len(medians))[finished]
+    labels_list[:] = [labels[~done]]
+    values_list[:] = [values[~done]]
+
+def accumulate_window(window, ids, ref, geoms, layer, readers, rasters, pairs, hits, totals):
+    """Piksel 1 window -> pasangan (label, nilai) median & hitungan fraksi per poligon."""
+    n = len(geoms)
+    win_transform = rasterio.windows.transform(window, ref.transform)
+    data = {}
+    for col, (reader, _) in readers.items():
+        band = reader.read(1, window=window, masked=True)
+        valid = ~np.ma.getmaskarray(band)
+        if band.dtype.kind == 'f': valid &= ~np.isnan(band.data)
+        data[col] = (band.data, valid)
+
+    for k in np.unique(layer[ids]):
+        members = ids[layer[ids] == k]
+        labels = rasterio.features.rasterize(
+            zip(geoms[members], members + 1), out_shape=(window.height, window.width),
+            transform=win_transform, fill=0, dtype='int32')
+        inside = labels > 0
+        if not inside.any(): continue
+        for col, (_, reducer) in rasters.items():
+            values, valid = data[col]
+            sel = inside & valid
+            label_ids = labels[sel] - 1
+            if reducer == 'median':
+                pairs[col][0].append(label_ids)
+                pairs[col][1].append(values[sel].astype(np.float64))
+            else:
+                totals[col] += np.bincount(label_ids, minlength=n)
+                hits[col] += np.bincount(label_ids, weights=values[sel] == reducer[1], minlength=n)
+
+def zonal_stats(gdf, rasters=None):
+    """Semua statistik zonal untuk semua poligon dalam 1 sapuan raster per window.
+
+    Piksel ikut poligon jika pusat piksel di dalamnya; piksel nodata/NaN diabaikan
+    (sama dengan masker reduceRegion). Return dict kolom -> array nilai.
+    """
+    if rasters is None: rasters = ZONAL_RASTERS
+    rasters = {col: spec for col, spec in rasters.items() if spec[0]}
+    if not rasters: raise ValueError("Tidak ada raster untuk statistik zonal.")
+    n = len(gdf)
+
+    ref_path = next(iter(rasters.values()))[0]
+    with rasterio.open(ref_path) as ref:
+        geoms = np.asarray(gdf.to_crs(ref.crs).geometry.values)
+        layer = non_overlapping_layers(geoms)
+        tree = shapely.STRtree(geoms)
+        readers = {col: open_aligned(path, ref) for col, (path, _) in rasters.items()}
+
+        # Baris window terakhir yang menyentuh tiap poligon: setelah baris itu selesai dibaca,
+        # median poligon langsung dihitung & pasangannya dibuang (buffer hanya ~1 baris window)
+        windows = [(w, tree.query(shapely.box(*rasterio.windows.bounds(w, ref.transform))))
+                   for w in iter_windows(ref.width, ref.height)]
+        last_row = np.full(n, -1)
+        for window, ids in windows: last_row[ids] = window.row_off
+
+        # Pasangan (label, nilai) median ditampung sementara; fraksi cukup dihitung (bincount)
+        medians = {col: np.full(n, np.nan) for col, (_, reducer) in rasters.items() if reducer == 'median'}
+        pairs = {col: ([], []) for col in medians}
+        hits = {col: np.zeros(n) for col, (_, reducer) in rasters.items() if reducer != 'median'}
+        totals = {col: np.zeros(n) for col in hits}
+        try:
+            for window, ids in windows:
+                if len(ids):
+                    accumulate_window(window, ids, ref, geoms, layer, readers, rasters, pairs, hits, totals)
+                if window.col_off + window.width == ref.width:
+                    for col in medians: flush_medians(pairs[col], medians[col], last_row, window.row_off)
+        finally:
+            for reader, src in readers.values():
+                reader.close()
+                if src is not reader: src.close()
+
+    result = {}
+    for col, (_, reducer) in rasters.items():
+        if reducer == 'median':
+            result[col] = medians[col]
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[col] = hits[col] / totals[col]
+    return result
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    stem, extension = os.path.splitext(os.path.basename(input_path))
+    output_path = os.path.join(output_dir, stem + output_suffix + extension)
+
+    print(f"--- MULAI STATISTIK ZONAL ---")
+
+    try:
+        start = time.time()
+        candidates = nb.read_candidates(input_path)
+        print(f"1. Kandidat: {len(candidates)} | Statistik: {', '.join(c for c, s in ZONAL_RASTERS.items() if s[0])}")
+        for col, values in zonal_stats(candidates).items(): candidates[col] = values
+        nb.write_candidates(candidates, output_path)
+        print(f"\n[SUKSES] File tersimpan di: {output_path} ({time.time() - start:.1f} s)")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
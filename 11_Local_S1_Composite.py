@@ -0,0 +1,274 @@
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Stack Sentinel-1 GRD (1 GeoTIFF per tanggal, mis. hasil download COPERNICUS/S1_GRD dari GEE).
+# Tanggal dibaca dari nama file (YYYYMMDD, mis. S1A_IW_GRDH_1SDV_20240805T...).
+scene_dir = r"path/to/your/s1_grd/folder" # Ganti dengan lokasi file Anda
+SCENE_PATTERN = "*.tif"
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+
+# Output -> (tanggal mulai, tanggal akhir, radius focal_median meter). Tanggal akhir
+# eksklusif seperti filterDate GEE.
+COMPOSITES = {
+    'S1_VV_Annual_Smooth.tif': ('2024-01-01', '2024-12-31', 15), # s1_annual -> seeding VV < -13.5
+    'S1_VV_Dry_Smooth.tif':    ('2024-08-01', '2024-10-31', 10), # s1_dry -> "rice killer" dry_vv <= -13
+}
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER
+# ==========================================
+# Band VV dicari lewat nama deskripsi, fallback ke index
+BAND_NAME = 'VV'
+BAND_INDEX = 1
+# S1_GRD di GEE sudah dalam dB. False = input linear (sigma0), dikonversi 10*log10.
+INPUT_IS_DB = True
+
+# 'exact'     : median persis (stack semua tanggal per chunk -> RAM naik dengan jumlah tanggal)
+# 'histogram' : median perkiraan dari histogram per piksel (RAM tetap, error <= HIST_BIN_DB / 2)
+MEDIAN_MODE = 'histogram'
+HIST_RANGE_DB = (-50.0, 10.0)
+HIST_BIN_DB = 0.1
+
+# Ukuran chunk spasial (piksel per sisi). Mode histogram: RAM ~ CHUNK_SIZE^2 x jumlah bin x 2 byte
+# (256 px, 600 bin -> ~80 MB), tidak bergantung jumlah tanggal.
+CHUNK_SIZE = 256
+# Focal median: stack (offset kernel x piksel) dipotong per beberapa baris agar paling banyak
+# FOCAL_MAX_VALUES nilai float32 (4M -> ~16 MB), berapa pun ukuran kernel & chunk.
+FOCAL_MAX_VALUES = 4_000_000
+# Proses paralel per chunk. None = semua core, 1 = serial.
+N_WORKERS = None
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def scene_date(path):
+    """Tanggal akuisisi 'YYYY-MM-DD' dari nama file (None jika tidak ada)."""
+    match = re.search(r'(20\d{2})(\d{2})(\d{2})', os.path.basename(path))
+    return '-'.join(match.groups()) if match else None
+
+def select_scenes(paths, start, end):
+    """Scene dengan start <= tanggal < end (filterDate)."""
+    return [p for p in paths if scene_date(p) and start <= scene_date(p) < end]
+
+def resolve_band(src):
+    if BAND_NAME in src.descriptions: return src.descriptions.index(BAND_NAME) + 1
+    return BAND_INDEX
+
+def open_aligned(path, ref):
+    """Buka scene; jika grid berbeda dari referensi, dibaca lewat WarpedVRT (nearest)."""
+    src = rasterio.open(path)
+    if (src.crs == ref['crs'] and src.transform == ref['transform'] and
+            (src.width, src.height) == (ref['width'], ref['height'])):
+        return src, src
+    vrt = WarpedVRT(src, crs=ref['crs'], transform=ref['transform'], width=ref['width'],
+                    height=ref['height'], resampling=Resampling.nearest)
+    return vrt, src
+
+def read_vv(reader, band, window):
+    """VV (dB, float32) 1 window; nodata / nilai tidak valid -> NaN."""
+    data = reader.read(band, window=window, masked=True)
+    vv = data.astype(np.float32).filled(np.nan)
+    if not INPUT_IS_DB:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vv = np.where(vv > 0, 10 * np.log10(vv), np.nan).astype(np.float32)
+    vv[~np.isfinite(vv)] = np.nan
+    return vv
+
+def exact_median(stack):
+    """Median persis per piksel (rata-rata 2 nilai tengah jika genap), NaN diabaikan."""
+    out = np.full(stack.shape[1:], np.nan, np.float32)
+    has = (~np.isnan(stack)).any(axis=0)
+    out[has] = np.nanmedian(stack[:, has], axis=0)
+    return out
+
+class VVHistogram:
+    """Histogram dB per piksel untuk 1 chunk; median dihitung dari hitungan kumulatif.
+
+    Nilai di luar HIST_RANGE_DB masuk bin ujung. Nilai ke-k = titik tengah bin tempat
+    hitungan kumulatif mencapai k, jadi error median <= lebar bin / 2.
+    """
+
+    def __init__(self, shape):
+        self.lo, self.hi = HIST_RANGE_DB
+        self.width = HIST_BIN_DB
+        self.n_bins = int(np.ceil((self.hi - self.lo) / self.width))
+        self.shape = shape
+        self.hist = np.zeros((self.n_bins, shape[0] * shape[1]), np.uint16)
+        self.count = np.zeros(shape[0] * shape[1], np.int32)
+
+    def update(self, vv):
+        vv = vv.ravel()
+        pixels = np.flatnonzero(~np.isnan(vv))
+        bins = np.clip(((vv[pixels] - self.lo) / self.width).astype(np.int64), 0, self.n_bins - 1)
+        # Tiap piksel muncul sekali per tanggal -> index unik, tidak perlu np.add.at
+        self.hist[bins, pixels] += 1
+        self.count[pixels] += 1
+
+    def _rank_value(self, rank):
+        """Nilai ke-rank (1-based) per piksel (titik tengah bin)."""
+        value = np.full(self.count.shape, np.nan)
+        cum = np.zeros(self.count.shape, np.int32)
+        todo = np.flatnonzero(self.count > 0)
+        for b in range(self.n_bins):
+            if len(todo) == 0: break
+            cum[todo] += self.hist[b, todo]
+            hit = cum[todo] >= rank[todo]
+            if hit.any():
+                value[todo[hit]] = self.lo + (b + 0.5) * self.width
+                todo = todo[~hit]
+        return value
+
+    def median(self):
+        lower = self._rank_value((self.count + 1) // 2)
+        upper = self._rank_value(self.count // 2 + 1)
+        return ((lower + upper) / 2).astype(np.float32).reshape(self.shape)
+
+def pixel_size_m(crs, transform, height):
+    """Ukuran piksel (x, y) dalam meter; CRS geografis diperkirakan di lintang tengah."""
+    res_x, res_y = abs(transform.a), abs(transform.e)
+    if crs is None or not crs.is_geographic: return res_x, res_y
+    lat = np.deg2rad(transform.f + transform.e * height / 2)
+    return res_x * 111320 * np.cos(lat), res_y * 110574
+
+def circular_offsets(radius_m, res_x, res_y):
+    """Offset (dy, dx) kernel lingkaran (units='meters'): jarak pusat piksel <= radius."""
+    ry, rx = int(radius_m // res_y), int(radius_m // res_x)
+    dy, dx = np.mgrid[-ry:ry + 1, -rx:rx + 1]
+    inside = (dy * res_y) ** 2 + (dx * res_x) ** 2 <= radius_m ** 2
+    return list(zip(dy[inside], dx[inside]))
+
+def focal_median_circle(image, offsets, max_values=None):
+    """focal_median kernel lingkaran. NaN (masked) & luar scene diabaikan.
+
+    Offset kernel diambil sebagai view bergeser dari 1 array ber-padding, lalu nanmedian
+    per potongan baris (tanpa loop per piksel); stack per potongan <= max_values nilai.
+    """
+    if max_values is None: max_values = FOCAL_MAX_VALUES
+    halo = max(max(abs(dy), abs(dx)) for dy, dx in offsets)
+    if halo == 0: return image
+    h, w = image.shape
+    padded = np.pad(image, halo, constant_values=np.nan)
+    out = np.empty((h, w), np.float32)
+    rows = max(1, max_values // (len(offsets) * w))
+    for r0 in range(0, h, rows):
+        n = min(rows, h - r0)
+        stack = np.stack([padded[halo + dy + r0:halo + dy + r0 + n, halo + dx:halo + dx + w]
+                          for dy, dx in offsets])
+        out[r0:r0 + n] = exact_median(stack)
+    return out
+
+def iter_chunks(width, height, halo, chunk_size=None):
+    """(core window, read window = core + halo, dipotong di batas scene)."""
+    if chunk_size is None: chunk_size = CHUNK_SIZE
+    for row_off in range(0, height, chunk_size):
+        for col_off in range(0, width, chunk_size):
+            core = Window(col_off, row_off, min(chunk_size, width - col_off),
+                          min(chunk_size, height - row_off))
+            r0, c0 = max(row_off - halo, 0), max(col_off - halo, 0)
+            r1 = min(row_off + core.height + halo, height)
+            c1 = min(col_off + core.width + halo, width)
+            yield core, Window(c0, r0, c1 - c0, r1 - r0)
+
+# --- WORKER ---
+_worker_stack = None
+_worker_offsets = None
+_worker_mode = None
+
+def _init_worker(paths, ref, offsets, mode):
+    """Dijalankan sekali per proses: buka semua scene (dibaca per window)."""
+    global _worker_stack, _worker_offsets, _worker_mode
+    _worker_stack = []
+    for path in paths:
+        reader, src = open_aligned(path, ref)
+        _worker_stack.append((reader, src, resolve_band(src)))
+    _worker_offsets, _worker_mode = offsets, mode
+
+def _close_worker():
+    for reader, src, _ in _worker_stack:
+        reader.close()
+        if src is not reader: src.close()
+
+def process_chunk(windows):
+    """Median temporal di read window (core + halo), lalu focal median, potong ke core."""
+    core, read_win = windows
+    shape = (read_win.height, read_win.width)
+    if _worker_mode == 'exact':
+        composite = exact_median(np.stack([read_vv(reader, band, read_win)
+                                           for reader, _, band in _worker_stack]))
+    else:
+        hist = VVHistogram(shape)
+        for reader, _, band in _worker_stack:
+            hist.update(read_vv(reader, band, read_win))
+        composite = hist.median()
+
+    smooth = focal_median_circle(composite, _worker_offsets)
+    r, c = core.row_off - read_win.row_off, core.col_off - read_win.col_off
+    return core, smooth[r:r + core.height, c:c + core.width]
+
+def run_composite(paths, output_path, radius_m, mode=None, n_workers=N_WORKERS):
+    """Median VV (exact/histogram) + focal_median(radius_m, 'circle', 'meters') -> GeoTIFF."""
+    if mode is None: mode = MEDIAN_MODE
+    if mode not in ('exact', 'histogram'): raise ValueError(f"MEDIAN_MODE tidak dikenal: {mode}")
+    if not paths: raise ValueError("Tidak ada scene Sentinel-1 untuk dikomposit.")
+    with rasterio.open(paths[0]) as first:
+        ref = {'crs': first.crs, 'transform': first.transform,
+               'width': first.width, 'height': first.height}
+
+    offsets = circular_offsets(radius_m, *pixel_size_m(ref['crs'], ref['transform'], ref['height']))
+    halo = max(max(abs(dy), abs(dx)) for dy, dx in offsets)
+    profile = dict(driver='GTiff', width=ref['width'], height=ref['height'], count=1,
+                   dtype='float32', crs=ref['crs'], transform=ref['transform'], nodata=np.nan,
+                   tiled=True, blockxsize=256, blockysize=256, compress='deflate', predictor=3)
+
+    windows = list(iter_chunks(ref['width'], ref['height'], halo))
+    if n_workers is None: n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(windows))
+    print(f"   {len(paths)} tanggal, median {mode}, kernel {len(offsets)} piksel "
+          f"({len(windows)} chunk, {n_workers} worker)")
+
+    with rasterio.open(output_path, 'w', **profile) as dst:
+        dst.descriptions = ('VV',)
+        if n_workers <= 1:
+            _init_worker(paths, ref, offsets, mode)
+            try:
+                for core, data in map(process_chunk, windows): dst.write(data, 1, window=core)
+            finally:
+                _close_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(paths, ref, offsets, mode)) as pool:
+                for core, data in pool.map(process_chunk, windows):
+                    dst.write(data, 1, window=core)
+    return output_path
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    print(f"--- MULAI KOMPOSIT SENTINEL-1 VV (LOKAL) ---")
+
+    try:
+        start = time.time()
+        paths = sorted(glob.glob(os.path.join(scene_dir, SCENE_PATTERN)))
+        print(f"1. Ditemukan {len(paths)} scene Sentinel-1 di {scene_dir}")
+        for i, (name, (date_start, date_end, radius)) in enumerate(COMPOSITES.items(), 2):
+            print(f"{i}. {name} ({date_start} s/d {date_end}, focal_median {radius} m)...")
+            output_path = run_composite(select_scenes(paths, date_start, date_end),
+                                        os.path.join(output_dir, name), radius)
+            print(f"   Tersimpan: {output_path}")
+        print(f"\n[SUKSES] Komposit Sentinel-1 selesai ({time.time() - start:.1f} s)")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
@@ -0,0 +1,318 @@
+import importlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import geopandas as gpd
+import rasterio
+import shapely
+
+# Pipeline per tile dari script 03, tanggal scene dari script 05, penulis layer dari script 09
+det = importlib.import_module("03_Local_S2DR3_HighRes_Detection")
+bt = importlib.import_module("05_Local_Batch_MultiScene")
+nb = importlib.import_module("09_Local_Neighbor_Filter")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Scene tanggal terbaru untuk area yang sama (tanggal dibaca dari nama tile, mis. ...-20240818_MS.tif)
+input_tif = r"path/to/your/folder/S2L2Ax10_T49LHL-55846db01-20240818_MS.tif" # Ganti dengan lokasi file Anda
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+# Hasil: <output_name>_<tanggal> (layer tambak) & <output_name>_<tanggal>_diff (perubahan)
+output_name = "S2DR3_Tambak"
+OUTPUT_FORMAT = det.OUTPUT_FORMAT
+# State run sebelumnya (clean_mask, poligon per tile, potongan sambungan, manifest)
+state_dir = os.path.join(output_dir, "incremental_state")
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER
+# ==========================================
+# Tile dianggap tidak berubah jika jumlah piksel clean_mask yang berbeda dari state
+# <= batas ini: poligonnya dibawa dari run sebelumnya tanpa vektorisasi ulang.
+# 0 = hasil identik dengan run penuh script 03.
+CHANGE_TOLERANCE_PX = 0
+# Diff: tambak lama & baru dianggap 1 tambak yang berubah bentuk (reshaped) jika IoU >= batas ini
+RESHAPE_MIN_IOU = 0.5
+# Tambak lama yang >= fraksi ini luasnya masuk ke 1 tambak baru -> merged (ditautkan ke tambak baru).
+# Sebaliknya tambak baru yang >= fraksi ini luasnya di dalam 1 tambak lama -> split.
+LINK_MIN_OVERLAP = 0.5
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def state_signature(src, current_max_nir):
+    """Grid tile & parameter yang harus sama agar hasil run sebelumnya boleh dipakai ulang."""
+    # Ukuran strip masker hanya mengatur RAM (hasil identik) -> tidak ikut signature
+    signature = {name: getattr(det, name) for name in det.WORKER_CONFIG_NAMES if name != 'MASK_CHUNK_PIXELS'}
+    signature.update(width=src.width, height=src.height, transform=list(src.transform)[:6],
+                     crs=src.crs.to_wkt() if src.crs else None, block_shape=list(src.block_shapes[0]),
+                     TILE_SIZE=det.TILE_SIZE, TILE_HALO=det.TILE_HALO, max_nir=current_max_nir)
+    return json.loads(json.dumps(signature))
+
+def load_state(path):
+    manifest_path = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_path): return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def process_incremental_tile(src, core, read_win, current_max_nir, prev_mask_path, tolerance):
+    """clean_mask tile baru dibandingkan dengan state. Berubah -> vektorisasi & smoothing.
+
+    Return (core, jumlah piksel berbeda (None tanpa state), hasil). hasil None = tile
+    tidak berubah (poligon lama dipakai), selain itu (core_mask, batch, seam_pieces, count).
+    """
+    green, red, nir = det.read_tile_bands(src, read_win)
+    clean_mask = det.clean_water_mask(det.compute_water_mask(green, red, nir, current_max_nir))
+    dr, dc = core.row_off - read_win.row_off, core.col_off - read_win.col_off
+    core_mask = np.ascontiguousarray(clean_mask[dr:dr + core.height, dc:dc + core.width])
+
+    n_diff = None
+    if prev_mask_path:
+        with rasterio.open(prev_mask_path) as prev:
+            n_diff = int(np.count_nonzero(prev.read(1, window=core) != core_mask))
+        if n_diff <= tolerance: return core, n_diff, None
+
+    inner, seam_pieces, n_drop = det.vectorize_tile(clean_mask, core, read_win, src)
+    batch = det.smooth_and_filter(inner, src.transform)
+    return core, n_diff, (core_mask, batch, seam_pieces, len(inner) + n_drop)
+
+def concat_batches(batches):
+    if not batches: return det.empty_batch()
+    return {key: np.concatenate([b[key] for b in batches]) for key in batches[0]}
+
+def frame_to_batch(gdf):
+    batch = {col: gdf[col].to_numpy() for col in det.OUTPUT_COLUMNS}
+    batch['geometry'] = np.asarray(gdf.geometry.values, dtype=object)
+    return batch
+
+def best_pair(owner, score, n, candidates):
+    """Per tambak 0..n-1: index pasangan (dari candidates) dengan skor terbesar, -1 jika tidak ada."""
+    best = np.full(n, -1)
+    order = candidates[np.lexsort((-score[candidates], owner[candidates]))]
+    first = np.unique(owner[order], return_index=True)[1]
+    best[owner[order[first]]] = order[first]
+    return best
+
+def diff_ponds(prev, new, crs, min_iou=None, min_overlap=None):
+    """Perubahan tambak lama -> baru. Tiap tambak yang tidak persis sama muncul di 1 baris:
+
+    - reshaped : pasangan 1-1 dengan IoU >= min_iou (geometri baru, prev_id & new_id)
+    - merged   : tambak lama yang sebagian besar masuk ke 1 tambak baru (geometri lama,
+                 new_id = tambak gabungan), dan tambak gabungan itu sendiri jika tidak reshaped
+    - split    : pecahan baru yang sebagian besar di dalam 1 tambak lama (geometri baru,
+                 prev_id = tambak asal), dan tambak asal itu sendiri jika tidak reshaped
+    - added / removed : tambak baru / lama tanpa pasangan di atas
+
+    prev_id / new_id = urutan baris di layer lama / baru (-1 = tidak ada), geom_from = asal
+    geometri ('prev' / 'new'). Tambak dengan geometri persis sama tidak ditulis.
+    """
+    if min_iou is None: min_iou = RESHAPE_MIN_IOU
+    if min_overlap is None: min_overlap = LINK_MIN_OVERLAP
+    prev_key = shapely.to_wkb(shapely.normalize(prev))
+    new_key = shapely.to_wkb(shapely.normalize(new))
+    prev_set, new_set = set(prev_key), set(new_key)
+    prev_ids = np.flatnonzero(np.array([k not in new_set for k in prev_key], bool))
+    new_ids = np.flatnonzero(np.array([k not in prev_set for k in new_key], bool))
+    prev, new = prev[prev_ids], new[new_ids]
+
+    new_idx, prev_idx = shapely.STRtree(prev).query(new, predicate='intersects')
+    inter = shapely.area(shapely.intersection(new[new_idx], prev[prev_idx]))
+    keep = inter > 0  # Hanya bersentuhan tepi -> bukan pasangan
+    new_idx, prev_idx, inter = new_idx[keep], prev_idx[keep], inter[keep]
+    new_area, prev_area = shapely.area(new), shapely.area(prev)
+    iou = inter / (new_area[new_idx] + prev_area[prev_idx] - inter)
+
+    # Pencocokan 1-1 (greedy, IoU terbesar dulu); nilai = index pasangan, -1 = belum cocok
+    match_new, match_prev = np.full(len(new), -1), np.full(len(prev), -1)
+    for k in np.argsort(-iou, kind='stable'):
+        if iou[k] < min_iou: break
+        if match_new[new_idx[k]] >= 0 or match_prev[prev_idx[k]] >= 0: continue
+        match_new[new_idx[k]] = match_prev[prev_idx[k]] = k
+
+    # Sisa tambak lama -> tambak baru yang paling banyak menampungnya (merged), dan sebaliknya (split)
+    merged_pair = best_pair(prev_idx, inter, len(prev), np.flatnonzero(inter >= min_overlap * prev_area[prev_idx]))
+    split_pair = best_pair(new_idx, inter, len(new), np.flatnonzero(inter >= min_overlap * new_area[new_idx]))
+    merged_pair[match_prev >= 0] = -1
+    split_pair[match_new >= 0] = -1
+    merge_target = np.zeros(len(new), bool)
+    merge_target[new_idx[merged_pair[merged_pair >= 0]]] = True
+    split_source = np.zeros(len(prev), bool)
+    split_source[prev_idx[split_pair[split_pair >= 0]]] = True
+
+    free_new = np.flatnonzero((match_new < 0) & (split_pair < 0))
+    free_prev = np.flatnonzero((match_prev < 0) & (merged_pair < 0))
+    reshaped = np.flatnonzero(match_new >= 0)
+    split_new = np.flatnonzero(split_pair >= 0)
+    merged_prev = np.flatnonzero(merged_pair >= 0)
+    # (status, geom_from, index lama, index baru, index pasangan); -1 = tidak ada
+    groups = [
+        ('reshaped', 'new', prev_idx[match_new[reshaped]], reshaped, match_new[reshaped]),
+        ('split', 'new', prev_idx[split_pair[split_new]], split_new, split_pair[split_new]),
+        ('merged', 'prev', merged_prev, new_idx[merged_pair[merged_prev]], merged_pair[merged_prev]),
+    ]
+    for status, target in (('merged', merge_target[free_new]), ('added', ~merge_target[free_new])):
+        none = np.full(target.sum(), -1)
+        groups.append((status, 'new', none, free_new[target], none))
+    for status, source in (('split', split_source[free_prev]), ('removed', ~split_source[free_prev])):
+        none = np.full(source.sum(), -1)
+        groups.append((status, 'prev', free_prev[source], none, none))
+
+    # Elemen tambahan di ujung array -> index -1 menghasilkan -1 / NaN / None
+    prev_ids, new_ids = np.r_[prev_ids, -1], np.r_[new_ids, -1]
+    prev_area, new_area, iou = np.r_[prev_area, np.nan], np.r_[new_area, np.nan], np.r_[iou, np.nan]
+    p = np.concatenate([g[2] for g in groups])
+    n = np.concatenate([g[3] for g in groups])
+    k = np.concatenate([g[4] for g in groups])
+    from_new = np.concatenate([np.full(len(g[3]), g[1] == 'new') for g in groups])
+    geometry = np.empty(len(p), dtype=object)
+    geometry[from_new] = new[n[from_new]]
+    geometry[~from_new] = prev[p[~from_new]]
+    return gpd.GeoDataFrame({
+        'status': np.concatenate([np.full(len(g[2]), g[0], dtype=object) for g in groups]),
+        'geom_from': np.where(from_new, 'new', 'prev').astype(object),
+        'prev_id': prev_ids[p],
+        'new_id': new_ids[n],
+        'area_prev': prev_area[p],
+        'area_new': new_area[n],
+        'iou': iou[k],
+    }, geometry=geometry, crs=crs)
+
+def save_state(path, tmp_path, manifest):
+    """Ganti state lama dengan yang baru (folder sementara -> rename)."""
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    old_path = path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path): os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def run_incremental(input_path, output_path, diff_path, state_path=None, tolerance=None,
+                    output_format=OUTPUT_FORMAT):
+    """Deteksi scene baru dengan memakai ulang hasil tile yang tidak berubah.
+
+    Return (jumlah tile, tile diproses ulang, count_total, count_lolos, ringkasan diff).
+    """
+    if state_path is None: state_path = state_dir
+    if tolerance is None: tolerance = CHANGE_TOLERANCE_PX
+    state = load_state(state_path)
+
+    with rasterio.open(input_path) as src:
+        transform, crs = src.transform, src.crs
+        current_max_nir = 0.35 if det.is_reflectance(src) else det.MAX_NIR_VALUE
+        signature = state_signature(src, current_max_nir)
+        usable = state is not None and state['signature'] == signature
+        if state is None:
+            print("1. Belum ada state -> semua tile diproses (run penuh)")
+        elif not usable:
+            print("1. Grid / parameter berbeda dari run sebelumnya -> semua tile diproses ulang")
+        else:
+            print(f"1. State run sebelumnya: {state['date'] or state['scene']}")
+
+        prev_mask_path = os.path.join(state_path, 'clean_mask.tif') if usable else None
+        # Poligon lama tetap dipakai untuk diff walau grid / parameter berubah
+        prev_polys = gpd.read_parquet(os.path.join(state_path, 'polygons.parquet')) if state else None
+        prev_seams = gpd.read_parquet(os.path.join(state_path, 'seams.parquet')) if usable else None
+
+        windows = list(det.iter_tile_windows(src.width, src.height, det.TILE_SIZE, det.TILE_HALO,
+                                             src.block_shapes[0]))
+        tasks = [(core, read_win, current_max_nir, prev_mask_path, tolerance) for core, read_win in windows]
+
+        tmp_path = state_path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        print(f"2. Membandingkan clean_mask per tile ({len(windows)} tile, toleransi {tolerance} px)...")
+        inner_batches, inner_tiles, seam_pieces, seam_tiles = [], [], [], []
+        tile_counts, n_changed = [], 0
+        prev_mask = rasterio.open(prev_mask_path) if prev_mask_path else None
+        try:
+            with det.open_tiled_raster(os.path.join(tmp_path, 'clean_mask.tif'), src, np.uint8) as mask_out:
+                for tile_id, (core, n_diff, result) in enumerate(det.iter_tile_results(
+                        input_path, src, tasks, det.N_WORKERS, process_incremental_tile)):
+                    if result is None:
+                        # Tidak berubah: mask, poligon & potongan sambungan lama dibawa
+                        mask_out.write(prev_mask.read(1, window=core), 1, window=core)
+                        batch = frame_to_batch(prev_polys[prev_polys['tile'] == tile_id])
+                        pieces = np.asarray(prev_seams.geometry.values[prev_seams['tile'] == tile_id], dtype=object)
+                        count = state['tile_counts'][tile_id]
+                    else:
+                        core_mask, batch, pieces, count = result
+                        mask_out.write(core_mask, 1, window=core)
+                        n_changed += 1
+                    inner_batches.append(batch)
+                    inner_tiles.append(np.full(len(batch['geometry']), tile_id))
+                    seam_pieces.append(pieces)
+                    seam_tiles.append(np.full(len(pieces), tile_id))
+                    tile_counts.append(count)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        finally:
+            if prev_mask is not None: prev_mask.close()
+        print(f"   Tile berubah (divektorisasi ulang): {n_changed} dari {len(windows)}")
+
+    print("3. Menjahit potongan di sambungan tile...")
+    inner = concat_batches(inner_batches)
+    seam_pieces = np.concatenate(seam_pieces) if seam_pieces else np.empty(0, dtype=object)
+    merged = det.merge_seam_pieces(seam_pieces)
+    merged_batch = det.smooth_and_filter(merged, transform)
+    count_total = sum(tile_counts) + len(merged)
+    count_lolos = len(inner['geometry']) + len(merged_batch['geometry'])
+
+    writer = det.open_writer(output_path, crs, output_format)
+    try:
+        writer.write(inner)
+        writer.write(merged_batch)
+    finally:
+        writer.close()
+
+    print("4. Diff terhadap run sebelumnya...")
+    new_geoms = np.concatenate([inner['geometry'], merged_batch['geometry']])
+    prev_geoms = (np.asarray(prev_polys.geometry.values, dtype=object) if prev_polys is not None
+                  else np.empty(0, dtype=object))
+    diff = diff_ponds(prev_geoms, new_geoms, crs)
+    # Jumlah tambak per status (merged = tambak lama yang bergabung, split = pecahan baru)
+    subject = np.where(diff['status'] == 'merged', 'prev', np.where(diff['status'] == 'split', 'new', diff['geom_from']))
+    counted = diff['status'][diff['geom_from'] == subject]
+    summary = {status: int((counted == status).sum()) for status in ('added', 'removed', 'reshaped', 'merged', 'split')}
+    nb.write_candidates(diff, diff_path)
+    print(f"   Baru: {summary['added']} | Hilang: {summary['removed']} | Berubah bentuk: {summary['reshaped']} | "
+          f"Bergabung: {summary['merged']} | Terpecah: {summary['split']}")
+
+    # State baru: poligon final per tile (tile -1 = hasil jahitan) & potongan sambungan mentah
+    all_polys = concat_batches([inner, merged_batch])
+    polys = gpd.GeoDataFrame({col: all_polys[col] for col in det.OUTPUT_COLUMNS},
+                             geometry=all_polys['geometry'], crs=crs)
+    polys.insert(0, 'tile', np.r_[np.concatenate(inner_tiles) if inner_tiles else np.empty(0, int),
+                                  np.full(len(merged_batch['geometry']), -1)])
+    polys.to_parquet(os.path.join(tmp_path, 'polygons.parquet'))
+    gpd.GeoDataFrame({'tile': np.concatenate(seam_tiles) if seam_tiles else np.empty(0, int)},
+                     geometry=seam_pieces).to_parquet(os.path.join(tmp_path, 'seams.parquet'))
+    save_state(state_path, tmp_path, {
+        'scene': os.path.abspath(input_path),
+        'date': bt.scene_date(input_path),
+        'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'signature': signature,
+        'tile_counts': tile_counts,
+    })
+    return len(windows), n_changed, count_total, count_lolos, summary
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    date = bt.scene_date(input_tif)
+    output_path = det.output_path_for(output_dir, f"{output_name}_{date}", OUTPUT_FORMAT)
+    diff_path = det.output_path_for(output_dir, f"{output_name}_{date}_diff", OUTPUT_FORMAT)
+
+    print(f"--- MULAI DETEKSI INKREMENTAL ({date}) ---")
+
+    try:
+        start = time.time()
+        n_tiles, n_changed, count_total, count_lolos, _ = run_incremental(input_tif, output_path, diff_path)
+        print(f"   Total Kandidat Awal: {count_total} | Lolos Final: {count_lolos}")
+        print(f"\n[SUKSES] Layer: {output_path}\n          Diff : {diff_path} ({time.time() - start:.1f} s)")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
@@ -0,0 +1,195 @@
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import geopandas as gpd
+import shapely
+
+# Baca/tulis layer & CRS metrik dipakai ulang dari script 09 (nama file diawali angka -> importlib)
+nb = importlib.import_module("09_Local_Neighbor_Filter")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Hasil deteksi (script 03/04/08/...) & poligon tambak referensi (digitasi manual / survei)
+detected_path = r"path/to/your/folder/S2DR3_Tambak.parquet" # Ganti dengan lokasi file Anda
+reference_path = r"path/to/your/folder/Tambak_Referensi.shp" # Ganti dengan lokasi file Anda
+output_dir = r"path/to/your/folder" # Ganti dengan lokasi file Anda
+output_suffix = "_Evaluasi"
+# Layer per poligon (status TP/FP/FN + IoU) untuk dicek di GIS. False = hanya laporan JSON.
+WRITE_MATCHES = True
+
+# ==========================================
+# 2. KONFIGURASI PARAMETER
+# ==========================================
+# Pasangan deteksi-referensi dianggap cocok (TP) jika IoU >= MIN_IOU.
+# Dengan MIN_IOU >= 0.5 tiap poligon paling banyak punya 1 pasangan yang lolos
+# (poligon dalam 1 layer tidak saling tumpang tindih), jadi pencocokan 1-1 pasti optimal.
+MIN_IOU = 0.5
+# Irisan geometri pasangan dihitung per potongan di thread (shapely 2 melepas GIL).
+# None = semua core, 1 = serial.
+N_THREADS = None
+PAIR_CHUNK = 20000
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+def intersection_area(left, right, n_threads=None):
+    """Luas irisan pasangan left[i] & right[i], dipotong per PAIR_CHUNK pasangan."""
+    if n_threads is None: n_threads = N_THREADS or os.cpu_count() or 1
+    chunks = [slice(i, i + PAIR_CHUNK) for i in range(0, len(left), PAIR_CHUNK)]
+    if n_threads <= 1 or len(chunks) <= 1:
+        return shapely.area(shapely.intersection(left, right))
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        parts = pool.map(lambda chunk: shapely.area(shapely.intersection(left[chunk], right[chunk])), chunks)
+        return np.concatenate(list(parts))
+
+def candidate_pairs(detected, reference, min_iou):
+    """Pasangan (deteksi, referensi) yang mungkin mencapai min_iou + IoU-nya.
+
+    Index spasial (STRtree) -> pasangan yang bbox-nya bersentuhan. Batas atas IoU dari
+    luas & irisan bbox membuang sebagian besar pasangan sebelum irisan geometri exact.
+    """
+    det_idx, ref_idx = shapely.STRtree(reference).query(detected, predicate='intersects')
+    det_area, ref_area = shapely.area(detected), shapely.area(reference)
+    a_d, a_r = det_area[det_idx], ref_area[ref_idx]
+
+    det_box, ref_box = shapely.bounds(detected)[det_idx], shapely.bounds(reference)[ref_idx]
+    box_w = np.minimum(det_box[:, 2], ref_box[:, 2]) - np.maximum(det_box[:, 0], ref_box[:, 0])
+    box_h = np.minimum(det_box[:, 3], ref_box[:, 3]) - np.maximum(det_box[:, 1], ref_box[:, 1])
+    upper = np.minimum(np.clip(box_w, 0, None) * np.clip(box_h, 0, None), np.minimum(a_d, a_r))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        possible = upper / (a_d + a_r - upper) >= min_iou
+    det_idx, ref_idx, a_d, a_r = det_idx[possible], ref_idx[possible], a_d[possible], a_r[possible]
+
+    inter = intersection_area(detected[det_idx], reference[ref_idx])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = inter / (a_d + a_r - inter)
+    keep = iou >= min_iou
+    return det_idx[keep], ref_idx[keep], iou[keep]
+
+def match_ponds(detected, reference, min_iou=None):
+    """Pencocokan 1-1 berbasis IoU (greedy, IoU terbesar dulu).
+
+    Return (match_ref, match_iou): per deteksi indeks referensi pasangannya
+    (-1 = tidak cocok / FP) dan IoU-nya (NaN jika tidak cocok).
+    """
+    if min_iou is None: min_iou = MIN_IOU
+    match_ref = np.full(len(detected), -1)
+    match_iou = np.full(len(detected), np.nan)
+    if len(detected) == 0 or len(reference) == 0: return match_ref, match_iou
+
+    det_idx, ref_idx, iou = candidate_pairs(detected, reference, min_iou)
+    if len(np.unique(det_idx)) == len(det_idx) and len(np.unique(ref_idx)) == len(ref_idx):
+        # Tanpa rebutan pasangan (umum untuk IoU >= 0.5) -> langsung 1-1
+        match_ref[det_idx] = ref_idx
+        match_iou[det_idx] = iou
+        return match_ref, match_iou
+
+    ref_used = np.zeros(len(reference), bool)
+    for k in np.argsort(-iou, kind='stable'):
+        d, r = det_idx[k], ref_idx[k]
+        if match_ref[d] >= 0 or ref_used[r]: continue
+        match_ref[d] = r
+        match_iou[d] = iou[k]
+        ref_used[r] = True
+    return match_ref, match_iou
+
+def accuracy_metrics(detected, reference, match_ref, match_iou):
+    """Precision, recall, F1, IoU rata-rata & error luas dari hasil match_ponds."""
+    tp = int(np.count_nonzero(match_ref >= 0))
+    fp, fn = len(detected) - tp, len(reference) - tp
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    det_area, ref_area = shapely.area(detected), shapely.area(reference)
+    matched = match_ref >= 0
+    pair_det, pair_ref = det_area[matched], ref_area[match_ref[matched]]
+    rel_error = (pair_det - pair_ref) / pair_ref if tp else np.empty(0)
+    total_ref = float(ref_area.sum())
+    return {
+        'n_detected': len(detected), 'n_reference': len(reference),
+        'tp': tp, 'fp': fp, 'fn': fn,
+        'precision': precision, 'recall': recall, 'f1': f1,
+        'mean_iou': float(np.mean(match_iou[matched])) if tp else None,
+        # Error luas per pasangan TP (relatif terhadap referensi; + = deteksi lebih luas)
+        'area_bias_pct': float(100 * np.mean(rel_error)) if tp else None,
+        'area_mae_pct': float(100 * np.mean(np.abs(rel_error))) if tp else None,
+        # Error luas total layer (semua deteksi vs semua referensi)
+        'total_area_detected_m2': float(det_area.sum()),
+        'total_area_reference_m2': total_ref,
+        'total_area_error_pct': float(100 * (det_area.sum() - total_ref) / total_ref) if total_ref else None,
+    }
+
+def align_layers(detected_gdf, reference_gdf):
+    """Referensi ke CRS deteksi; CRS geografis -> UTM agar luas dalam m2."""
+    detected_gdf = nb.to_metric_crs(detected_gdf)
+    if reference_gdf.crs is not None and detected_gdf.crs is not None and reference_gdf.crs != detected_gdf.crs:
+        reference_gdf = reference_gdf.to_crs(detected_gdf.crs)
+    return detected_gdf, nb.to_metric_crs(reference_gdf)
+
+def evaluate(detected_gdf, reference_gdf, min_iou=None):
+    """Layer deteksi vs referensi -> (metrik, match_ref, match_iou). Dipakai juga oleh script 04/06."""
+    detected_gdf, reference_gdf = align_layers(detected_gdf, reference_gdf)
+    detected = np.asarray(detected_gdf.geometry.values, dtype=object)
+    reference = np.asarray(reference_gdf.geometry.values, dtype=object)
+    match_ref, match_iou = match_ponds(detected, reference, min_iou)
+    metrics = accuracy_metrics(detected, reference, match_ref, match_iou)
+    metrics['min_iou'] = MIN_IOU if min_iou is None else min_iou
+    return metrics, match_ref, match_iou
+
+def match_layer(detected_gdf, reference_gdf, match_ref, match_iou):
+    """Deteksi (TP/FP) + referensi yang tidak terdeteksi (FN) dalam 1 layer (input sudah align_layers)."""
+    matched = match_ref >= 0
+    found = np.zeros(len(reference_gdf), bool)
+    found[match_ref[matched]] = True
+    missed = np.flatnonzero(~found)
+    return gpd.GeoDataFrame({
+        'status': np.r_[np.where(matched, 'TP', 'FP'), np.full(len(missed), 'FN')],
+        'det_id': np.r_[np.arange(len(detected_gdf)), np.full(len(missed), -1)],
+        'ref_id': np.r_[match_ref, missed],
+        'iou': np.r_[match_iou, np.full(len(missed), np.nan)],
+    }, geometry=np.r_[np.asarray(detected_gdf.geometry.values, dtype=object),
+                      np.asarray(reference_gdf.geometry.values, dtype=object)[missed]],
+       crs=detected_gdf.crs)
+
+def evaluate_files(det_path, ref_path, min_iou=None, match_path=None):
+    detected_gdf, reference_gdf = align_layers(nb.read_candidates(det_path), nb.read_candidates(ref_path))
+    metrics, match_ref, match_iou = evaluate(detected_gdf, reference_gdf, min_iou)
+    if match_path:
+        nb.write_candidates(match_layer(detected_gdf, reference_gdf, match_ref, match_iou), match_path)
+    return metrics
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    stem, extension = os.path.splitext(os.path.basename(detected_path))
+    report_path = os.path.join(output_dir, stem + output_suffix + '.json')
+    match_path = os.path.join(output_dir, stem + output_suffix + extension) if WRITE_MATCHES else None
+
+    print(f"--- MULAI EVALUASI AKURASI (IoU >= {MIN_IOU}) ---")
+
+    try:
+        start = time.time()
+        metrics = evaluate_files(detected_path, reference_path, MIN_IOU, match_path)
+        metrics.update(detected=os.path.abspath(detected_path), reference=os.path.abspath(reference_path))
+        with open(report_path, 'w') as f:
+            json.dump(metrics, f, indent=1)
+
+        print(f"   Deteksi: {metrics['n_detected']} | Referensi: {metrics['n_reference']}")
+        print(f"   TP: {metrics['tp']} | FP: {metrics['fp']} | FN: {metrics['fn']}")
+        print(f"   Precision: {metrics['precision']:.3f} | Recall: {metrics['recall']:.3f} | F1: {metrics['f1']:.3f}")
+        if metrics['tp']:
+            print(f"   IoU rata-rata: {metrics['mean_iou']:.3f} | Error luas per tambak: "
+                  f"bias {metrics['area_bias_pct']:+.1f}%, MAE {metrics['area_mae_pct']:.1f}%")
+        if metrics['total_area_error_pct'] is not None:
+            print(f"   Error luas total: {metrics['total_area_error_pct']:+.1f}%")
+        print(f"\n[SUKSES] Laporan: {report_path} ({time.time() - start:.1f} s)")
+        if match_path: print(f"          Layer TP/FP/FN: {match_path}")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
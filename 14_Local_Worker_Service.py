@@ -0,0 +1,228 @@
+import importlib
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+# Fungsi deteksi dipakai ulang dari script 03 (nama file diawali angka -> importlib)
+det = importlib.import_module("03_Local_S2DR3_HighRes_Detection")
+
+# ==========================================
+# 1. KONFIGURASI FILE
+# ==========================================
+# Folder hasil untuk job tanpa "output" (<nama input>_Tambak.<format>)
+output_dir = r"path/to/your/folder/service" # Ganti dengan lokasi file Anda
+
+# ==========================================
+# 2. KONFIGURASI SERVICE
+# ==========================================
+# Socket lokal (hanya localhost). Protokol: 1 job JSON per baris, hasil dikirim balik
+# 1 JSON per baris segera setelah job selesai (urutan selesai, bukan urutan kirim).
+HOST = "127.0.0.1"
+PORT = 8765
+# Jumlah job yang berjalan bersamaan (1 proses worker per job, import & GDAL tetap hangat)
+MAX_JOBS = os.cpu_count() or 1
+# Batas job yang diterima tapi belum selesai (semua koneksi). Jika penuh, service berhenti
+# membaca socket sampai ada slot (backpressure), jadi antrian & RAM tidak tumbuh tanpa batas.
+MAX_PENDING = 4 * MAX_JOBS
+# Deteksi kecil di tiap worker saat start (rasterio/GDAL, cv2, shapely, pyarrow terpanggil sekali)
+WARMUP = True
+
+# Konfigurasi script 03 yang boleh diisi per job lewat "config"
+JOB_CONFIG_NAMES = det.WORKER_CONFIG_NAMES + [
+    'TILE_SIZE', 'TILE_HALO', 'COARSE_SCREEN', 'COARSE_FACTOR', 'QA_RASTERS', 'CACHE_DIR', 'PROFILE_REPORT',
+]
+# Default per job di service: crop AOI kecil -> tile serial, tanpa cache & laporan profiling
+JOB_DEFAULTS = {'N_WORKERS': 1, 'CACHE_DIR': None, 'PROFILE_REPORT': False}
+
+# ==========================================
+# 3. FUNGSI
+# ==========================================
+# Konfigurasi awal script 03 (direset sebelum tiap job agar override job lain tidak terbawa)
+BASE_CONFIG = {name: getattr(det, name) for name in JOB_CONFIG_NAMES}
+BASE_CONFIG.update(JOB_DEFAULTS)
+
+_jobs_done = 0
+
+def validate_job(job):
+    """Pesan error (str) atau None jika job valid."""
+    if not isinstance(job, dict): return "Job harus berupa objek JSON"
+    if not job.get('input') or not isinstance(job['input'], str): return "Field 'input' wajib diisi (path file)"
+    config = job.get('config') or {}
+    if not isinstance(config, dict): return "Field 'config' harus berupa objek JSON"
+    unknown = set(config) - set(JOB_CONFIG_NAMES)
+    if unknown: return f"Konfigurasi tidak dikenal: {sorted(unknown)}"
+    output_format = job.get('format', det.OUTPUT_FORMAT)
+    if not isinstance(output_format, str) or output_format not in det.OUTPUT_WRITERS:
+        return f"Format output tidak dikenal: {output_format}"
+    if job.get('output') is not None and not isinstance(job['output'], str): return "Field 'output' harus berupa path file"
+    return None
+
+def run_job(job, received):
+    """Dijalankan di proses worker: 1 job deteksi + waktu (antri, jalan, total)."""
+    global _jobs_done
+    started = time.time()
+    config = dict(BASE_CONFIG)
+    config.update(job.get('config') or {})
+    for name, value in config.items(): setattr(det, name, value)
+
+    output_format = job.get('format', det.OUTPUT_FORMAT)
+    output_path = job.get('output') or det.output_path_for(
+        output_dir, os.path.splitext(os.path.basename(job['input']))[0] + '_Tambak', output_format)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            count_total, count_lolos = det.run_detection(job['input'], output_path, output_format)
+        result = {'status': 'done', 'output': output_path, 'count_total': count_total, 'count_lolos': count_lolos}
+    except Exception as e:
+        result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+    finished = time.time()
+    _jobs_done += 1
+
+    result.update(id=job.get('id'), worker={'pid': os.getpid(), 'jobs': _jobs_done}, timings={
+        'queue_s': round(started - received, 4),
+        'run_s': round(finished - started, 4),
+        'total_s': round(finished - received, 4),
+    })
+    return result
+
+def warmup_scene(path, size=64):
+    """Scene DN kecil berisi 1 tambak untuk memanaskan seluruh pipeline."""
+    bands = np.empty((4, size, size), np.uint16)
+    bands[:] = np.array([800, 800, 700, 2500], np.uint16)[:, None, None]
+    bands[1:, 16:48, 16:48] = np.array([1500, 800, 300], np.uint16)[:, None, None]
+    with rasterio.open(path, 'w', driver='GTiff', width=size, height=size, count=4, dtype='uint16',
+                       crs='EPSG:32749', transform=from_origin(500000, 9100000, 1, 1)) as dst:
+        dst.write(bands)
+
+def init_worker():
+    """Dijalankan sekali per proses worker: modul sudah ter-import, lalu 1 deteksi pemanasan."""
+    # Ctrl+C ditangani proses utama (pool ditutup rapi), worker tidak ikut berhenti di tengah job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not WARMUP: return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scene_path = os.path.join(tmp_dir, 'warmup.tif')
+        warmup_scene(scene_path)
+        for name, value in BASE_CONFIG.items(): setattr(det, name, value)
+        with contextlib.redirect_stdout(io.StringIO()):
+            det.run_detection(scene_path, os.path.join(tmp_dir, 'warmup.parquet'))
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """1 koneksi: baca job per baris, kirim hasil per baris begitu job selesai."""
+
+    def handle(self):
+        service = self.server
+        send_lock = threading.Lock()
+        # Dilepas setelah hasil job terkirim (callback future jalan sesudah wait() selesai)
+        sent = threading.Semaphore(0)
+
+        def send(message):
+            with send_lock:
+                try:
+                    self.wfile.write((json.dumps(message) + '\n').encode())
+                    self.wfile.flush()
+                except OSError:
+                    pass  # Klien sudah menutup koneksi; job tetap selesai
+
+        def finished(future, job):
+            service.slots.release()
+            try:
+                send(future.result())
+            except Exception as e:
+                send({'id': job.get('id'), 'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+            sent.release()
+
+        n_jobs = 0
+        for line in self.rfile:
+            if not line.strip(): continue
+            received = time.time()
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                send({'status': 'failed', 'error': f"JSON tidak valid: {e}"})
+                continue
+            if isinstance(job, dict) and job.get('cmd') == 'ping':
+                send({'status': 'pong', 'max_jobs': service.max_jobs, 'max_pending': service.max_pending})
+                continue
+            job_id = job.get('id') if isinstance(job, dict) else None
+            # 1 job bermasalah hanya menghasilkan balasan 'failed', koneksi & job lain tetap jalan
+            try:
+                error = validate_job(job)
+            except Exception as e:
+                error = f"Job tidak valid: {type(e).__name__}: {e}"
+            if error:
+                send({'id': job_id, 'status': 'failed', 'error': error})
+                continue
+
+            service.slots.acquire()
+            try:
+                future = service.pool.submit(run_job, job, received)
+            except Exception as e:
+                service.slots.release()
+                send({'id': job_id, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+                continue
+            future.add_done_callback(lambda f, job=job: finished(f, job))
+            n_jobs += 1
+        # Klien selesai mengirim: tunggu semua hasil koneksi ini terkirim sebelum menutup
+        for _ in range(n_jobs): sent.acquire()
+
+class WorkerService(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, max_jobs=None, max_pending=None):
+        self.max_jobs = max_jobs or MAX_JOBS
+        self.max_pending = max_pending or MAX_PENDING
+        self.pool = ProcessPoolExecutor(max_workers=self.max_jobs, initializer=init_worker)
+        # Semua worker dipanaskan sekarang, bukan saat job pertama datang
+        wait([self.pool.submit(time.sleep, 0) for _ in range(self.max_jobs)])
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        super().__init__(address, JobHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+def submit_jobs(jobs, host=HOST, port=PORT):
+    """Klien: kirim job (dict) ke service, yield hasil sesuai urutan selesai."""
+    jobs = list(jobs)
+    with socket.create_connection((host, port)) as sock:
+        def sender():
+            with sock.makefile('w') as writer:
+                for job in jobs: writer.write(json.dumps(job) + '\n')
+            sock.shutdown(socket.SHUT_WR)
+
+        thread = threading.Thread(target=sender, daemon=True)
+        thread.start()
+        with sock.makefile('r') as reader:
+            for line in reader: yield json.loads(line)
+        thread.join()
+
+# ==========================================
+# 4. EKSEKUSI
+# ==========================================
+if __name__ == "__main__":
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    print(f"--- MULAI WORKER SERVICE ({HOST}:{PORT}, {MAX_JOBS} job paralel) ---")
+
+    try:
+        start = time.time()
+        with WorkerService((HOST, PORT)) as service:
+            print(f"   Worker siap ({time.time() - start:.1f} s). Kirim job JSON per baris, Ctrl+C untuk berhenti.")
+            print('   Contoh: {"id": "aoi-1", "input": "crop.tif", "config": {"THRESH_NDWI": -0.1}}')
+            service.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SUKSES] Service dihentikan.")
+    except Exception as e:
+        print(f"\n[ERROR] Terjadi kesalahan: {e}")
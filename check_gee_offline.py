@@ -0,0 +1,117 @@
+"""Cek offline alur script 01/02 dengan backend fake_ee (tanpa koneksi GEE).
+
+Script 01 & 02 dijalankan utuh dengan TAMBAK_EE_BACKEND=fake, lalu log panggilan
+fake_ee.CALLS dicek:
+- tidak ada getInfo() (PRINT_COUNT mati -> tidak ada panggilan blocking ke server)
+- reduceRegions tepat 1x per raster yang direduksi, tanpa reduceRegion per fitur
+- task ekspor dimulai lalu di-polling lewat gee_backend.wait_for_task sampai COMPLETED
+- CompositeCache tidak memulai ekspor ulang untuk asset yang masih diekspor
+
+Jalankan: python check_gee_offline.py
+"""
+import contextlib
+import io
+import os
+import runpy
+import sys
+import time
+from collections import Counter
+
+os.environ['TAMBAK_EE_BACKEND'] = 'fake'
+import fake_ee
+import gee_backend
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Script -> jumlah reduceRegions yang diharapkan (1 per raster)
+SCRIPTS = {
+    # dry_vv (S1 kemarau) + crop_pct (WorldCover)
+    '01_GEE_Hybrid_DrySeason_Validation.py': 2,
+    # median_ndwi & median_vv (1 image 2 band) + crop_pct (WorldCover)
+    '02_GEE_Spatial_Temporal_Analysis.py': 2,
+}
+
+
+def run_script(name):
+    """Jalankan 1 script dengan fake_ee. Jeda polling dicatat, tidak benar-benar ditunggu.
+
+    Return (Counter panggilan ee, daftar jeda polling, output print script).
+    """
+    fake_ee.reset()
+    sleeps = []
+    real_sleep = time.sleep
+    time.sleep = sleeps.append
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            script = runpy.run_path(os.path.join(SCRIPT_DIR, name), run_name='__main__')
+    finally:
+        time.sleep = real_sleep
+    return fake_ee.call_counts(), sleeps, output.getvalue(), script
+
+
+def check_script(name, n_reduce):
+    """Daftar pelanggaran (kosong = lolos)."""
+    calls, sleeps, output, script = run_script(name)
+    errors = []
+    if script['PRINT_COUNT']:
+        errors.append("PRINT_COUNT aktif, cek getInfo hanya berlaku jika mati")
+    if calls['getInfo']:
+        errors.append(f"getInfo dipanggil {calls['getInfo']}x")
+    if calls['Image.reduceRegions'] != n_reduce:
+        errors.append(f"reduceRegions {calls['Image.reduceRegions']}x, diharapkan {n_reduce}x")
+    per_feature = calls['Image.reduceRegion'] + calls['Feature.reduceRegion']
+    if per_feature:
+        errors.append(f"reduceRegion per fitur dipanggil {per_feature}x")
+
+    tasks = [task for task in fake_ee.TASKS if task.kind == 'table']
+    if len(tasks) != 1 or not tasks[0].started:
+        errors.append(f"Diharapkan 1 task ekspor tabel yang dimulai, ada {len(tasks)}")
+    elif script['WAIT_FOR_EXPORT']:
+        # wait_for_task: status() sampai COMPLETED, jeda POLL_SECONDS di antara polling
+        polls = fake_ee.TASK_POLLS_TO_COMPLETE + 1
+        if calls['Task.status'] != polls or tasks[0].state() != 'COMPLETED':
+            errors.append(f"Task ekspor di-polling {calls['Task.status']}x, diharapkan {polls}x sampai COMPLETED")
+        if sleeps != [script['POLL_SECONDS']] * (polls - 1):
+            errors.append(f"Jeda polling {sleeps}, diharapkan {polls - 1}x {script['POLL_SECONDS']} s")
+    if errors: errors.append("Output script:\n" + output)
+    return errors
+
+
+def check_composite_cache():
+    """Run berulang saat ekspor cache masih berjalan -> hanya 1 Export.image."""
+    fake_ee.reset()
+    errors = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(3):
+            cache = gee_backend.CompositeCache(fake_ee, 'projects/offline/assets/cache', None, wait=False)
+            cache.image('s1_annual', lambda: fake_ee.Image('S1'), {'radius': 15})
+        exports = [task for task in fake_ee.TASKS if task.kind == 'image']
+        if len(exports) != 1:
+            errors.append(f"CompositeCache memulai {len(exports)} ekspor untuk asset yang sama, diharapkan 1")
+        cache = gee_backend.CompositeCache(fake_ee, 'projects/offline/assets/cache', None, wait=True, poll_seconds=0)
+        cache.image('s1_annual', lambda: fake_ee.Image('S1'), {'radius': 15})
+    asset_id = exports[0].asset_id if exports else None
+    if asset_id not in fake_ee.ASSETS:
+        errors.append(f"Asset cache {asset_id} tidak selesai setelah wait=True")
+    return errors
+
+
+if __name__ == "__main__":
+    print("--- MULAI CEK OFFLINE SCRIPT GEE (fake_ee) ---")
+
+    failed = 0
+    checks = [(name, lambda name=name, n=n: check_script(name, n)) for name, n in SCRIPTS.items()]
+    checks.append(('CompositeCache', check_composite_cache))
+    for name, check in checks:
+        try:
+            errors = check()
+        except Exception as e:
+            errors = [f"{type(e).__name__}: {e}"]
+        print(f"   {name}: {'OK' if not errors else 'GAGAL'}")
+        for error in errors: print(f"      - {error}")
+        failed += bool(errors)
+
+    if failed:
+        print(f"\n[ERROR] {failed} cek gagal.")
+        sys.exit(1)
+    print("\n[SUKSES] Semua cek offline lolos.")
@@ -0,0 +1,194 @@
+"""Pengganti `ee` lokal (offline) untuk menguji alur script 01/02 tanpa koneksi GEE.
+
+Setiap panggilan (ee.Image(...), .filterDate(...), .reduceRegions(...), dst.) hanya
+dicatat sebagai simpul ekspresi, tidak ada yang dihitung. Fungsi Python yang
+dioper ke .map() langsung dipanggil sekali dengan placeholder, jadi kesalahan di
+dalam lambda tetap ketahuan. Task ekspor selesai setelah TASK_POLLS_TO_COMPLETE
+kali status() dan asset hasil ekspor tercatat di ASSETS (cache dianggap ada).
+
+Dipilih lewat gee_backend.load_ee('fake') atau env TAMBAK_EE_BACKEND=fake.
+"""
+from collections import Counter
+
+IS_FAKE = True
+
+# Log semua operasi (urutan panggilan) & asset yang "ada" di server
+CALLS = []
+ASSETS = set()
+TASKS = []
+# Jumlah status() sebelum task berstatus COMPLETED
+TASK_POLLS_TO_COMPLETE = 2
+
+
+class EEException(Exception):
+    pass
+
+
+def reset():
+    """Kosongkan log panggilan, asset & task."""
+    CALLS.clear()
+    ASSETS.clear()
+    TASKS.clear()
+
+
+def call_counts():
+    """Jumlah panggilan per operasi, mis. {'Image.reduceRegions': 2, 'getInfo': 0}."""
+    return Counter(CALLS)
+
+
+class _Node:
+    """Objek server palsu (Image, FeatureCollection, Filter, Number, ...)."""
+
+    def __init__(self, kind, op, args=(), kwargs=None):
+        self.kind = kind
+        self.op = op
+        self.args = args
+        self.kwargs = kwargs or {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'): raise AttributeError(name)
+        return lambda *args, **kwargs: _call(self.kind, name, args, kwargs)
+
+    def getInfo(self):
+        # Panggilan blocking ke server -> dicatat agar bisa dicek (harus 0 di jalur batch)
+        CALLS.append('getInfo')
+        return None
+
+    def __repr__(self):
+        return f"<fake_ee.{self.kind} {self.op}>"
+
+
+def _call(kind, name, args, kwargs):
+    CALLS.append(f"{kind}.{name}")
+    for value in list(args) + list(kwargs.values()):
+        # .map(fungsi) / .iterate(fungsi): jalankan sekali dengan elemen placeholder
+        if callable(value) and not isinstance(value, (_Node, _Namespace)):
+            value(_Node(_ELEMENT_KIND.get(kind, kind), 'placeholder'))
+    if kind in ('Reducer', 'Filter'): return _Node(kind, name, args, kwargs)
+    return _Node(_RESULT_KIND.get(name, kind), name, args, kwargs)
+
+
+# Jenis elemen untuk .map() & jenis hasil beberapa operasi (cukup untuk nama di log)
+_ELEMENT_KIND = {'ImageCollection': 'Image', 'FeatureCollection': 'Feature'}
+_RESULT_KIND = {
+    'first': 'Image', 'median': 'Image', 'mean': 'Image', 'max': 'Image', 'reduce': 'Image',
+    'reduceToVectors': 'FeatureCollection', 'reduceRegions': 'FeatureCollection',
+    'apply': 'FeatureCollection',
+    'geometry': 'Geometry', 'area': 'Number', 'perimeter': 'Number', 'size': 'Number',
+    'get': 'Object',
+}
+
+
+class _Namespace:
+    """ee.Image, ee.Filter, ee.Reducer, ... : bisa dipanggil & punya fungsi statis."""
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def __call__(self, *args, **kwargs):
+        return _call(self.kind, '__init__', args, kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('__'): raise AttributeError(name)
+        return lambda *args, **kwargs: _call(self.kind, name, args, kwargs)
+
+
+Image = _Namespace('Image')
+ImageCollection = _Namespace('ImageCollection')
+Feature = _Namespace('Feature')
+FeatureCollection = _Namespace('FeatureCollection')
+Geometry = _Namespace('Geometry')
+Projection = _Namespace('Projection')
+Filter = _Namespace('Filter')
+Reducer = _Namespace('Reducer')
+Join = _Namespace('Join')
+List = _Namespace('List')
+Number = _Namespace('Number')
+Algorithms = _Namespace('Algorithms')
+
+
+def Initialize(*args, **kwargs):
+    CALLS.append('Initialize')
+
+
+def Authenticate(*args, **kwargs):
+    CALLS.append('Authenticate')
+
+
+# --- TASK EKSPOR ---
+class _Task:
+    def __init__(self, kind, description, asset_id=None):
+        self.kind = kind
+        self.description = description
+        self.asset_id = asset_id
+        self.id = f"FAKE_TASK_{len(TASKS) + 1}"
+        self.polls = 0
+        self.started = False
+        TASKS.append(self)
+
+    def start(self):
+        CALLS.append(f"Export.{self.kind}.start")
+        self.started = True
+
+    def state(self):
+        if not self.started: return 'UNSUBMITTED'
+        if self.polls >= TASK_POLLS_TO_COMPLETE: return 'COMPLETED'
+        return 'READY' if self.polls == 0 else 'RUNNING'
+
+    def status(self):
+        CALLS.append('Task.status')
+        state = self.state()
+        self.polls += 1
+        if state == 'COMPLETED' and self.asset_id: ASSETS.add(self.asset_id)
+        return {'id': self.id, 'state': state, 'description': self.description}
+
+
+class _Exporter:
+    def __init__(self, kind):
+        self.kind = kind
+
+    def _task(self, description='myExportTask', assetId=None, **kwargs):
+        CALLS.append(f"Export.{self.kind}")
+        return _Task(self.kind, description, assetId)
+
+    def toDrive(self, collection=None, description='myExportTask', **kwargs):
+        return self._task(description)
+
+    def toAsset(self, *args, description='myExportTask', assetId=None, **kwargs):
+        return self._task(description, assetId)
+
+
+class _Export:
+    table = _Exporter('table')
+    image = _Exporter('image')
+
+
+class batch:
+    Export = _Export
+
+
+# --- ee.data ---
+class data:
+    @staticmethod
+    def getAsset(asset_id):
+        CALLS.append('data.getAsset')
+        if asset_id not in ASSETS: raise EEException(f"Asset '{asset_id}' not found.")
+        return {'id': asset_id, 'name': asset_id}
+
+    @staticmethod
+    def getTaskList():
+        # Hanya membaca status (tidak memajukan task), seperti daftar task di server
+        CALLS.append('data.getTaskList')
+        return [{'id': task.id, 'state': task.state(), 'description': task.description}
+                for task in TASKS if task.started]
+
+    @staticmethod
+    def getTaskStatus(task_id):
+        CALLS.append('data.getTaskStatus')
+        return [task.status() for task in TASKS if task.id == task_id]
+
+    @staticmethod
+    def createAsset(value, path=None, **kwargs):
+        CALLS.append('data.createAsset')
+        ASSETS.add(path)
+        return {'id': path, 'type': value.get('type')}
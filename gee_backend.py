@@ -0,0 +1,176 @@
+"""Lapisan klien GEE bersama untuk script 01/02.
+
+- load_ee / initialize : backend `ee` bisa diganti (earthengine-api asli, fake_ee
+  untuk uji offline, atau modul lain dengan API yang sama).
+- CompositeCache       : komposit antara (ndwi_clean, s1_annual, s1_dry) disimpan
+  sebagai asset GEE; run berikutnya langsung memakai asset tanpa membangun ulang.
+- export_table / wait_for_task : ekspor sebagai task server (Drive/Asset) dengan
+  polling status, menggantikan getInfo() + geemap.ee_to_shp di sisi klien.
+"""
+import hashlib
+import importlib
+import json
+import os
+import time
+
+# Backend default; bisa ditimpa env TAMBAK_EE_BACKEND ('earthengine', 'fake', atau nama modul)
+DEFAULT_BACKEND = 'earthengine'
+# Status task yang berarti gagal / selesai
+TASK_FAILED_STATES = ('FAILED', 'CANCELLED', 'CANCEL_REQUESTED')
+# Status task yang masih berjalan di server (belum selesai/gagal)
+TASK_ACTIVE_STATES = ('READY', 'RUNNING')
+
+
+def load_ee(backend=None):
+    """Modul `ee` sesuai backend."""
+    if backend is None: backend = os.environ.get('TAMBAK_EE_BACKEND', DEFAULT_BACKEND)
+    if backend == 'earthengine': return importlib.import_module('ee')
+    if backend == 'fake': return importlib.import_module('fake_ee')
+    return importlib.import_module(backend)
+
+
+def is_fake(ee):
+    return getattr(ee, 'IS_FAKE', False)
+
+
+def initialize(ee):
+    try:
+        ee.Initialize()
+        print("Berhasil terhubung ke Google Earth Engine.")
+    except Exception:
+        ee.Authenticate()
+        ee.Initialize()
+        print("Berhasil terhubung setelah autentikasi.")
+
+
+def asset_exists(ee, asset_id):
+    try:
+        ee.data.getAsset(asset_id)
+        return True
+    except ee.EEException:
+        return False
+
+
+def require_asset_root(asset_root, purpose):
+    """Folder asset wajib diisi (string 'projects/<project>/assets/...') -> tanpa garis miring di akhir."""
+    if not isinstance(asset_root, str) or not asset_root.strip('/'):
+        raise ValueError(f"ASSET_ROOT belum diisi (mis. 'projects/your-project/assets/tambak'), "
+                         f"wajib untuk {purpose}")
+    return asset_root.rstrip('/')
+
+
+def ensure_folder(ee, folder):
+    """Buat folder asset jika belum ada."""
+    if not asset_exists(ee, folder):
+        ee.data.createAsset({'type': 'FOLDER'}, folder)
+
+
+def wait_for_task(task, poll_seconds=30, timeout=None):
+    """Polling status task sampai COMPLETED. Gagal/dibatalkan/timeout -> exception."""
+    start = time.time()
+    last_state = None
+    while True:
+        status = task.status()
+        state = status.get('state')
+        if state == 'COMPLETED': return status
+        if state in TASK_FAILED_STATES:
+            raise RuntimeError(f"Task {status.get('description')} {state}: {status.get('error_message', '')}")
+        if state != last_state:
+            print(f"   Task {status.get('description')}: {state}")
+            last_state = state
+        if timeout is not None and time.time() - start > timeout:
+            raise TimeoutError(f"Task {status.get('description')} belum selesai setelah {timeout} s")
+        time.sleep(poll_seconds)
+
+
+class ServerTask:
+    """Task yang sudah ada di server (dari getTaskList), status() sama seperti ee.batch.Task."""
+
+    def __init__(self, ee, task_id):
+        self.ee = ee
+        self.id = task_id
+
+    def status(self):
+        return self.ee.data.getTaskStatus(self.id)[0]
+
+
+def cache_key(params):
+    """Hash pendek parameter komposit (area, tanggal, radius, ...) untuk nama asset."""
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:10]
+
+
+class CompositeCache:
+    """Cache komposit antara sebagai asset GEE (Export.image.toAsset).
+
+    Nama asset = <asset_root>/<nama>_<hash parameter>, jadi parameter yang berubah
+    otomatis membuat asset baru. wait=False: run ini tetap memakai komposit lazy
+    (ekspor berjalan di server), asset dipakai mulai run berikutnya. Ekspor yang
+    masih berjalan dari run sebelumnya (deskripsi task sama) tidak dimulai ulang.
+    asset_root None -> cache nonaktif (komposit selalu dibangun); nilai lain yang bukan
+    path asset (mis. string kosong) -> ValueError.
+    """
+
+    def __init__(self, ee, asset_root, region, scale=10, crs=None, wait=False, poll_seconds=30):
+        self.ee = ee
+        self.asset_root = require_asset_root(asset_root, "cache komposit") if asset_root is not None else None
+        self.region = region
+        self.scale = scale
+        self.crs = crs
+        self.wait = wait
+        self.poll_seconds = poll_seconds
+        self.tasks = []
+        self._running = None
+        if asset_root: ensure_folder(ee, asset_root)
+
+    def running_exports(self):
+        """Task aktif di server (deskripsi -> id task), diambil sekali per run."""
+        if self._running is None:
+            self._running = {task['description']: task['id'] for task in self.ee.data.getTaskList()
+                             if task.get('state') in TASK_ACTIVE_STATES}
+        return self._running
+
+    def image(self, name, build, params):
+        if not self.asset_root: return build()
+        asset_id = f"{self.asset_root}/{name}_{cache_key(params)}"
+        if asset_exists(self.ee, asset_id):
+            print(f"   [CACHE] {name} dipakai dari asset {asset_id}")
+            return self.ee.Image(asset_id)
+
+        # Deskripsi unik per asset tujuan -> ekspor yang masih berjalan bisa dikenali lagi
+        description = f"cache_{name}_{cache_key(asset_id)}"
+        task_id = self.running_exports().get(description)
+        if task_id:
+            print(f"   [CACHE] {name} masih diekspor ke asset {asset_id} (task {task_id}), tidak diulang")
+            if not self.wait: return build()
+            wait_for_task(ServerTask(self.ee, task_id), self.poll_seconds)
+            return self.ee.Image(asset_id)
+
+        image = build()
+        task = self.ee.batch.Export.image.toAsset(
+            image=image, description=description, assetId=asset_id, region=self.region,
+            scale=self.scale, crs=self.crs, maxPixels=1e13)
+        task.start()
+        self.tasks.append(task)
+        self.running_exports()[description] = task.id
+        print(f"   [CACHE] {name} diekspor ke asset {asset_id}")
+        if not self.wait: return image
+        wait_for_task(task, self.poll_seconds)
+        return self.ee.Image(asset_id)
+
+
+def export_table(ee, collection, name, selectors, target='drive', folder=None, asset_root=None):
+    """Mulai task ekspor tabel (tidak menunggu). target: 'drive' (SHP) atau 'asset'."""
+    if target == 'drive':
+        task = ee.batch.Export.table.toDrive(
+            collection=collection, description=name, folder=folder, fileNamePrefix=name,
+            fileFormat='SHP', selectors=list(selectors))
+    elif target == 'asset':
+        asset_root = require_asset_root(asset_root, "EXPORT_TARGET = 'asset'")
+        task = ee.batch.Export.table.toAsset(
+            collection=collection.select(list(selectors)), description=name,
+            assetId=f"{asset_root}/{name}")
+    else:
+        raise ValueError(f"Target ekspor tidak dikenal: {target}")
+    task.start()
+    return task